@@ -0,0 +1,50 @@
+"""
+load / dump throughput of the json backends on the real cache (`cache/events/*.json`) and the `data/` files
+    python benchmark_json.py
+"""
+
+import json
+import time
+
+from utils import cache_dir, data_dir, orjson
+
+
+def measure(name: str, fn, items: list, n_bytes: int, n_repetitions: int = 3):
+    durations = []
+    for _ in range(n_repetitions):
+        t_start = time.perf_counter()
+        for item in items:
+            fn(item)
+        durations.append(time.perf_counter() - t_start)
+    duration = min(durations)
+    print(f"\t{name:<32} {duration:8.3f} s  {n_bytes / 1e6 / duration:8.1f} MB/s")
+
+
+def benchmark(files: list, title: str):
+    if not files:
+        print(f"{title}: no files")
+        return
+    raw = [p.read_bytes() for p in files]
+    n_bytes = sum(len(b) for b in raw)
+    print(f"\n{title}: {len(files)} files, {n_bytes / 1e6:.1f} MB")
+
+    print("load")
+    measure("json.loads", json.loads, raw, n_bytes)
+    if orjson is not None:
+        measure("orjson.loads", orjson.loads, raw, n_bytes)
+
+    data = [json.loads(b) for b in raw]
+    print("dump")
+    measure("json.dumps(indent=4)", lambda d: json.dumps(d, indent=4), data, n_bytes)
+    measure("json.dumps(compact)", lambda d: json.dumps(d, separators=(",", ":")), data, n_bytes)
+    if orjson is not None:
+        measure("orjson.dumps", lambda d: orjson.dumps(d, option=orjson.OPT_NON_STR_KEYS), data, n_bytes)
+        n_bytes_compact = sum(len(orjson.dumps(d, option=orjson.OPT_NON_STR_KEYS)) for d in data)
+        print(f"\tcompact size: {n_bytes_compact / 1e6:.1f} MB ({n_bytes_compact / n_bytes:.0%} of the files on disk)")
+
+
+if __name__ == '__main__':
+    if orjson is None:
+        print("orjson not installed (pip install orjson): only the stdlib json is measured")
+    benchmark(sorted(p for p in (cache_dir / "events").glob("*.json") if p.stem.isnumeric()), "cache/events")
+    benchmark(sorted(data_dir.glob("*.json")), "data")
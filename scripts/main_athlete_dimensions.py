@@ -3,8 +3,8 @@ import re
 from matplotlib import pyplot as plt
 import numpy as np
 import pandas as pd
-from utils import cache_dir, res_dir, add_watermark
-from utils_itu import get_athlete_info, get_request
+from utils import res_dir, add_watermark
+from utils_itu import get_athletes_info, get_request
 
 # todo: is it the correct way to set the math fonts?
 plt.rcParams["font.family"] = "monospace"  # todo: set in global config
@@ -13,17 +13,9 @@ plt.rcParams['mathtext.fontset'] = 'cm'  # "stix
 
 
 def get_rankings(ranking_id: int):
-    saving_path = cache_dir / "rankings" / f"rankings_{ranking_id}.csv"
-    saving_path.parent.mkdir(parents=True, exist_ok=True)
-    # check if ranking_id has already been retrieved and saved
-    if saving_path.exists():
-        df = pd.read_csv(saving_path)
-        return df
-
     url_suffix = f"rankings/{ranking_id}"
     res = get_request(url_suffix=url_suffix)
     df = pd.DataFrame(res["rankings"])
-    df.to_csv(saving_path)
     return df
 
 
@@ -62,26 +54,8 @@ def main():
     df.athlete_id = df.athlete_id.astype(int)
     print(df.athlete_id)
 
-    infos = []
-
-    for athlete_id in df.athlete_id:
-        print(athlete_id)
-        res = get_athlete_info(athlete_id=athlete_id)
-        if res is None:
-            print(f"ERROR: no data found for {athlete_id = }")
-            continue
-        infos.append(res)
-        print(res["athlete_first"])
-        print(res["athlete_last"])
-        print(res["weight"])
-        print(res["height"])
-        print("---")
-        # url = "https://api.triathlon.org/v1/athletes/athlete_id/stats"
-        # url_suffix = f"athletes/{athlete_id}"
-        # res = get_request(url_suffix=url_suffix)
-        # print(res)
-
-    df_infos = pd.DataFrame(infos)
+    # url = "https://api.triathlon.org/v1/athletes/athlete_id/stats"
+    df_infos = get_athletes_info(df.athlete_id)
     print(df_infos.columns)
     print(df_infos.weight)
 
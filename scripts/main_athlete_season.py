@@ -13,9 +13,10 @@ import numpy as np
 import pandas as pd
 from scipy.stats import norm
 
-from utils import json_load, json_dump, res_dir, interpolate_colors, cache_dir, data_dir, country_emojis, add_watermark, \
+from utils import json_load, json_dump, res_dir, interpolate_colors, data_dir, country_emojis, add_watermark, \
     load_config
-from utils_itu import get_request, category_mapping
+from utils_figures import CachedFigure, get_fingerprint
+from utils_itu import category_mapping, get_athlete_info, get_athlete_results, prefetch_athlete_results
 
 plt.rcParams["font.family"] = "monospace"  # todo: set in global config
 plt.rcParams['mathtext.default'] = 'rm'
@@ -104,33 +105,18 @@ def update_athletes(years_to_update: list):
     for _suffix in ["m", "w"]:
         years_id_rankings = json_load(data_dir / f"years_id_rankings_{_suffix}.json")
         for year in years_to_update:
-            for i_athlete, athlete_info in enumerate(years_id_rankings[str(year)]):
-                print(f"updating #{i_athlete} {athlete_info} ...")
-                athlete_id = athlete_info[0]
-                url_suffix = f"athletes/{athlete_id}/results?per_page=1000"
-                athlete_results_res = get_request(url_suffix)
-
-                athlete_results_file = cache_dir / f"athletes_results/{athlete_id}.json"
-                athlete_results_file.parent.mkdir(parents=True, exist_ok=True)
-                json_dump(athlete_results_res, athlete_results_file)
+            athlete_ids = [athlete_info[0] for athlete_info in years_id_rankings[str(year)]]
+            print(f"updating {len(athlete_ids)} athletes of {year} ({_suffix}) ...")
+            prefetch_athlete_results(athlete_ids, overwrite=True)
 
 
 def get_athlete_seasons(athlete_ids):
     all_dfs = []
-    i_athlete = 0
+    athlete_ids = athlete_ids[:100]
+    prefetch_athlete_results(athlete_ids)
     for athlete_id in athlete_ids:
-        i_athlete += 1
-        if i_athlete > 100:
-            break
         print(f"{athlete_id}: {athlete_ids_mapping[athlete_id]}")
-        athlete_results_file = cache_dir / f"athletes_results/{athlete_id}.json"
-        if athlete_results_file.exists():
-            athlete_results_res = json_load(athlete_results_file)
-        else:
-            url_suffix = f"athletes/{athlete_id}/results?per_page=1000"
-            athlete_results_res = get_request(url_suffix)
-            athlete_results_file.parent.mkdir(parents=True, exist_ok=True)
-            json_dump(athlete_results_res, athlete_results_file)
+        athlete_results_res = get_athlete_results(athlete_id)
 
         if athlete_results_res is None:
             print(f"ERROR: no data found for {athlete_id = }")
@@ -180,10 +166,15 @@ def get_athlete_seasons(athlete_ids):
 
 
 def plot_athlete_seasons(years_dfs):
+    figure_inputs = get_fingerprint(locals(), years, ranking_len, suffix)
     n_years = len(years)
     for year in years:
         assert len(years_dfs[year]) == ranking_len
 
+    figure = CachedFigure(res_dir / f"athlete_season_duration_{suffix}.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
     fig, axes = plt.subplots(
         nrows=ranking_len + 2,
         ncols=n_years,
@@ -325,7 +316,7 @@ def plot_athlete_seasons(years_dfs):
 
     plt.tight_layout()
     add_watermark(fig, y=0.98, x=0.1)
-    plt.savefig(str(res_dir / f"athlete_season_duration_{suffix}.png"), dpi=300)
+    figure.save()
 
     plt.show()
 
@@ -443,17 +434,11 @@ def plot_end_of_career():
             all_ids |= set(athlete_ids)
 
     print(f"{len(all_ids):,} athletes")
+    prefetch_athlete_results(all_ids)
     athletes_infos = []
     for athlete_id in all_ids:
         print(f"{athlete_id}: {athlete_ids_mapping[athlete_id]}")
-        athlete_results_file = cache_dir / f"athletes_results/{athlete_id}.json"
-        if athlete_results_file.exists():
-            athlete_results_res = json_load(athlete_results_file)
-        else:
-            url_suffix = f"athletes/{athlete_id}/results?per_page=1000"
-            athlete_results_res = get_request(url_suffix)
-            athlete_results_file.parent.mkdir(parents=True, exist_ok=True)
-            json_dump(athlete_results_res, athlete_results_file)
+        athlete_results_res = get_athlete_results(athlete_id)
 
         if athlete_results_res is None:
             print(f"ERROR: no data found for {athlete_id = }")
@@ -481,14 +466,7 @@ def plot_end_of_career():
         if y_last_race > year_limit:
             continue
 
-        athlete_file = cache_dir / f"athletes/{athlete_id}.json"
-        if athlete_file.exists():
-            athlete_info = json_load(athlete_file)
-        else:
-            url_suffix = f"athletes/{athlete_id}"
-            athlete_info = get_request(url_suffix)
-            athlete_file.parent.mkdir(parents=True, exist_ok=True)
-            json_dump(athlete_info, athlete_file)
+        athlete_info = get_athlete_info(athlete_id)
 
         yob = athlete_info["athlete_yob"]  # todo
         age = y_last_race - yob
@@ -504,6 +482,7 @@ def plot_end_of_career():
             }
         )
     df = pd.DataFrame(athletes_infos)
+    figure_inputs = get_fingerprint(df)
 
     df.sort_values(by="age", inplace=True)
 
@@ -551,6 +530,10 @@ def plot_end_of_career():
     print(f"Male mean = {age_mean_male:.1f}y std = {age_std_male:.1f}y")
     print(f"Female mean = {age_mean_female:.1f}y std = {age_std_female:.1f}y")
 
+    figure = CachedFigure(res_dir / "ages_of_last_race.png", inputs=[figure_inputs])
+    if figure.up_to_date():
+        return
+
     # plot df[age] distribution
     fig = plt.figure(figsize=(10, 10))
     bins = np.arange(int(min(df["age"]))-1, int(max(df["age"]))+1, 1)
@@ -585,7 +568,7 @@ def plot_end_of_career():
               f"\n2) have not raced since {year_limit}.")
     plt.tight_layout()
     add_watermark(fig)
-    plt.savefig(res_dir / "ages_of_last_race.png")
+    figure.save()
     plt.show()
 
 
@@ -598,6 +581,11 @@ def main():
 
     years_nocs = {}
 
+    # warm the cache once for the union of all rankings: the loop below only reads from disk
+    prefetch_athlete_results([
+        a_id for year in years for a_id, _, _ in years_id_rankings[str(year)][:100]
+    ])
+
     for year in years:
         print(year)
 
@@ -4,8 +4,9 @@ import pandas as pd
 from scipy.stats import chisquare
 
 from utils_countries import convert_country_alpha2_to_continent, convert_country_alpha2_to_country_name
-from utils import json_load, reference_month_of_birth_path, cache_dir, res_dir, add_watermark
-from utils_itu import get_request, get_athlete_info
+from utils import json_load, reference_month_of_birth_path, res_dir, add_watermark
+from utils_figures import CachedFigure, get_fingerprint
+from utils_itu import get_request, get_athletes_info
 
 # todo: is it the correct way to set the math fonts?
 plt.rcParams["font.family"] = "monospace"  # todo: set in global config
@@ -14,17 +15,9 @@ plt.rcParams['mathtext.fontset'] = 'cm'  # "stix
 
 
 def get_rankings(ranking_id: int):
-    saving_path = cache_dir / "rankings" / f"rankings_{ranking_id}.csv"
-    saving_path.parent.mkdir(parents=True, exist_ok=True)
-    # check if ranking_id has already been retrieved and saved
-    if saving_path.exists():
-        df = pd.read_csv(saving_path)
-        return df
-
     url_suffix = f"rankings/{ranking_id}"
     res = get_request(url_suffix=url_suffix)
     df = pd.DataFrame(res["rankings"])
-    df.to_csv(saving_path)
     return df
 
 
@@ -68,6 +61,198 @@ def run_chi_square_test(
     print(f"{'--- ' * 12}\n")
 
 
+def plot_age(df, age_min: int, age_max: int):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "age.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
+    fig = plt.figure(figsize=(12, 12))
+
+    # plot histogram of athlete_age column. todo: exercise: can it be modelled? skewness?
+    athlete_age = df["athlete_age"].value_counts().sort_index()
+    # add missing ages with 0 as value
+    athlete_age = athlete_age.reindex(range(0, max(athlete_age.index.max(), age_max) + 1), fill_value=0)
+    athlete_age.plot.bar(color="deepskyblue")
+    plt.axvline(age_min, linestyle="dotted", color="navy", label="kept interval")
+    plt.axvline(age_max, linestyle="dotted", color="navy")
+    plt.legend()
+    plt.title(f"AGE\n{len(df):,} athletes\nAverage: {df['athlete_age'].mean():.1f}", fontsize=20)
+    plt.xlabel("")
+
+    plt.tight_layout()
+    add_watermark(fig, y=0.95)
+    figure.save()
+
+    # plt.show()
+
+
+def plot_birth_continents(continent_value_counts, continent_text: dict, n_athletes: int):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "birth_continents.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
+    fig = plt.figure(figsize=(12, 12))
+
+    plt.title(f'CONTINENT\nof athletes considered for the analysis "Month/Quarter of Birth"\n({n_athletes:,} athletes)', fontsize=20)
+    continent_value_counts.plot.bar(color="deepskyblue", edgecolor="black")
+
+    plt.xticks(rotation=45, ha="right")
+
+    plt.ylabel("count".upper())
+    plt.xlabel("")
+
+    for index, (continent, values) in enumerate(continent_text.items()):
+        txt = "\n".join(f"{k}: {v}" for k, v in values.items())
+        txt += "\n..."
+        plt.text(
+            index,
+            continent_value_counts[index] + 20,
+            txt,
+            ha="center",
+            fontsize=8,
+        )
+
+    # add percentage for each bar
+    for index, (continent, value) in enumerate(continent_value_counts.items()):
+        plt.text(
+            index,
+            value - 40,
+            f"{value / n_athletes * 100:.1f}%",
+            ha="center",
+            fontsize=10,
+        )
+
+    # set y max
+    plt.ylim(0, continent_value_counts.max() + 200)
+
+    plt.tight_layout()
+    add_watermark(fig, y=0.98)
+    figure.save()
+
+    # plt.show()
+
+
+def plot_birth_months(expected_month_freq, observed_month_freq, n_athletes: int):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "birth_months.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
+    fig = plt.figure(figsize=(12, 12))
+
+    plt.title(f"MONTH OF BIRTH\n({n_athletes:,} athletes)", fontsize=20)
+    plt.bar(range(12), expected_month_freq, color="gray", alpha=0.5, label="expected (data: UN)", edgecolor="black")
+
+    observed_month_freq.plot.bar(label="observed (data: ITU)", color="deepskyblue", edgecolor="black")  # pd.Series
+
+    for index, value in observed_month_freq.items():
+        plt.text(
+            index - 1,
+            value + 0.1,
+            f"{value:.2f}%",
+            ha="center",
+        )
+
+    plt.xticks(rotation=0, fontsize=12)
+    plt.yticks(range(0, int(max(observed_month_freq.max(), 10)) + 1), fontsize=12)
+    plt.ylabel("PERCENT", fontsize=16)
+    plt.xlabel("MONTH", fontsize=16)
+
+    plt.grid(axis="y")
+
+    plt.title(f"MONTH OF BIRTH\n({n_athletes:,} athletes)", fontsize=18)
+    plt.axhline(100 / 12, linestyle="-.", linewidth=2, color="dimgray", label=f"uniform: {100 / 12:.1f}%")
+    plt.legend()
+
+    plt.tight_layout()
+    add_watermark(fig)
+    figure.save()
+
+    # plt.show()
+
+
+def plot_birth_quarters(expected_quarter_freq, observed_quarter_freq, grouped, title: str, saving_name: str):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / f"{saving_name}.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
+    fig = plt.figure(figsize=(12, 12))
+
+    plt.bar(range(4), expected_quarter_freq, color="gray", alpha=0.3, label="expected (data: UN)", edgecolor="black")
+    observed_quarter_freq.plot.bar(label="observed (data: ITU)", color="deepskyblue", edgecolor="black", linewidth=3 if grouped is not None else 1)
+    for index, value in observed_quarter_freq.items():
+        plt.text(
+            index - 1,
+            value + 0.5,
+            f"{value:.1f}%",
+            color="darkblue",
+            ha="center",
+            fontsize=10,
+            fontweight="bold",
+            zorder=10,
+            bbox = dict(facecolor='deepskyblue', alpha=1, edgecolor='black')
+        )
+    plt.axhline(100 / 4, linestyle="-.", color="dimgray", label=f"uniform: {100 / 4:.1f}%", linewidth=2)
+
+    # group by gender
+    if grouped is not None:
+        n_female = grouped['female'].sum()
+        n_male = grouped['male'].sum()
+
+        # Normalize the columns by dividing by their respective sums
+        normalized_grouped = 100 * grouped.div(grouped.sum(axis=0), axis=1)
+
+        kwargs = {
+            "edgecolor": 'black',
+            "align": 'edge',
+            "linestyle": '-.',
+        }
+        width = 0.15
+        normalized_grouped['female'].plot.bar(legend=True, label=f'ITU women ({n_female:,})', color="violet", width=-width, **kwargs)
+        normalized_grouped['male'].plot.bar(legend=True, label=f'ITU men ({n_male:,})', color="lightskyblue", width=width, **kwargs)
+
+        ax = plt.gca()
+
+        # Add numbers on top of female bars
+        for i, value in enumerate(normalized_grouped['female']):
+            ax.text(
+                i - width / 2,
+                15,
+                f'{value:.1f}%',
+                rotation=90,
+                ha='center',
+                color='black',
+            )  # Shift to left slightly due to width
+
+        # Add numbers on top of male bars
+        for i, value in enumerate(normalized_grouped['male']):
+            ax.text(
+                i + width / 2,
+                15,
+                f'{value:.1f}%',
+                rotation=90,
+                ha='center',
+                color='black',
+            )
+
+    plt.xticks([0, 1, 2, 3], ['Q1\n(90/91 days)', 'Q2\n(91 days)', 'Q3\n(92 days)', 'Q4\n(92 days)'], rotation=0, fontsize=12)
+    plt.title(title, fontsize=18)
+    plt.yticks(range(0, int(max(observed_quarter_freq.max(), 10)) + 4), fontsize=12)
+    plt.grid(axis="y")
+
+    plt.xlim(-0.5, 3.5)
+    plt.xlabel("QUARTER", fontsize=16)
+    plt.ylabel("PERCENT", fontsize=16)
+    plt.legend()
+    plt.tight_layout()
+    add_watermark(fig)
+    figure.save()
+    plt.show()
+
+
 def main():
     df = None
 
@@ -111,19 +296,11 @@ def main():
     # print(list(df[~df["athlete_categories"].str.contains("42")]["athlete_listing"]))
 
     # patch: "dob" is not present in the rankings anymore!
-    def find_dob(row):
-        if "dob" in row:
-            return row.dob
-
-        if "athlete_id" not in row:
-            return None
-        athlete_info = get_athlete_info(athlete_id=int(row.athlete_id))
-        if athlete_info is None:
-            return None
-
-        return athlete_info["dob"] if "dob" in athlete_info else None
-
-    df["dob"] = df.apply(find_dob, axis=1)
+    if "dob" not in df.columns:
+        df_infos = get_athletes_info(df["athlete_id"])
+        if "dob" not in df_infos.columns:
+            df_infos["dob"] = None
+        df["dob"] = df["athlete_id"].map(df_infos.set_index("athlete_id")["dob"])
 
     # add column for month of birth from dob (e.g. "2020-01-01" -> "01")
     df["month_of_birth"] = df["dob"].apply(lambda x: str(x)[5:7])
@@ -157,28 +334,11 @@ def main():
 
     # ### plot age distribution
 
-    fig = plt.figure(figsize=(12, 12))
-
     # todo: set in config
     age_min = 15
     age_max = 45
 
-    # plot histogram of athlete_age column. todo: exercise: can it be modelled? skewness?
-    athlete_age = df["athlete_age"].value_counts().sort_index()
-    # add missing ages with 0 as value
-    athlete_age = athlete_age.reindex(range(0, max(athlete_age.index.max(), age_max) + 1), fill_value=0)
-    athlete_age.plot.bar(color="deepskyblue")
-    plt.axvline(age_min, linestyle="dotted", color="navy", label="kept interval")
-    plt.axvline(age_max, linestyle="dotted", color="navy")
-    plt.legend()
-    plt.title(f"AGE\n{len(df):,} athletes\nAverage: {df['athlete_age'].mean():.1f}", fontsize=20)
-    plt.xlabel("")
-
-    plt.tight_layout()
-    add_watermark(fig, y=0.95)
-    plt.savefig(str(res_dir / "age.png"), dpi=300)
-
-    # plt.show()
+    plot_age(df, age_min, age_max)
 
     # ### filter
 
@@ -188,9 +348,6 @@ def main():
 
     # ### plot - country
 
-    fig = plt.figure(figsize=(12, 12))
-
-    plt.title(f'CONTINENT\nof athletes considered for the analysis "Month/Quarter of Birth"\n({n_athletes:,} athletes)', fontsize=20)
     country_value_counts = df[
         # "athlete_noc"
         "athlete_country_isoa2"
@@ -200,12 +357,6 @@ def main():
 
     df["athlete_continent"] = df["athlete_country_isoa2"].apply(lambda x: convert_country_alpha2_to_continent(x))
     continent_value_counts = df["athlete_continent"].value_counts()
-    continent_value_counts.plot.bar(color="deepskyblue", edgecolor="black")
-
-    plt.xticks(rotation=45, ha="right")
-
-    plt.ylabel("count".upper())
-    plt.xlabel("")
 
     continent_text = {}
     for continent in continent_value_counts.index:
@@ -221,40 +372,10 @@ def main():
         print(f"{continent}: {country_names_counts}")
         continent_text[continent] = country_names_counts
 
-    for index, (continent, values) in enumerate(continent_text.items()):
-        txt = "\n".join(f"{k}: {v}" for k, v in values.items())
-        txt += "\n..."
-        plt.text(
-            index,
-            continent_value_counts[index] + 20,
-            txt,
-            ha="center",
-            fontsize=8,
-        )
-
-    # add percentage for each bar
-    for index, (continent, value) in enumerate(continent_value_counts.items()):
-        plt.text(
-            index,
-            value - 40,
-            f"{value / n_athletes * 100:.1f}%",
-            ha="center",
-            fontsize=10,
-        )
-
-    # set y max
-    plt.ylim(0, continent_value_counts.max() + 200)
-
-    plt.tight_layout()
-    add_watermark(fig, y=0.98)
-    plt.savefig(str(res_dir / "birth_continents.png"), dpi=300)
-
-    # plt.show()
+    plot_birth_continents(continent_value_counts, continent_text, n_athletes)
 
     # ### plot - month of birth
 
-    fig = plt.figure(figsize=(12, 12))
-
     expected_month_freq = np.array(json_load(
         p=reference_month_of_birth_path
     ))
@@ -263,43 +384,13 @@ def main():
         normalize=True  # use percentage
     ).sort_index()
 
-    plt.title(f"MONTH OF BIRTH\n({n_athletes:,} athletes)", fontsize=20)
-    plt.bar(range(12), expected_month_freq, color="gray", alpha=0.5, label="expected (data: UN)", edgecolor="black")
-
-    observed_month_freq.plot.bar(label="observed (data: ITU)", color="deepskyblue", edgecolor="black")  # pd.Series
-
-    for index, value in observed_month_freq.items():
-        plt.text(
-            index - 1,
-            value + 0.1,
-            f"{value:.2f}%",
-            ha="center",
-        )
-
-    plt.xticks(rotation=0, fontsize=12)
-    plt.yticks(range(0, int(max(observed_month_freq.max(), 10)) + 1), fontsize=12)
-    plt.ylabel("PERCENT", fontsize=16)
-    plt.xlabel("MONTH", fontsize=16)
-
-    plt.grid(axis="y")
-
-    plt.title(f"MONTH OF BIRTH\n({n_athletes:,} athletes)", fontsize=18)
-    plt.axhline(100 / 12, linestyle="-.", linewidth=2, color="dimgray", label=f"uniform: {100 / 12:.1f}%")
-    plt.legend()
-
-    plt.tight_layout()
-    add_watermark(fig)
-    plt.savefig(str(res_dir / "birth_months.png"), dpi=300)
-
-    # plt.show()
+    plot_birth_months(expected_month_freq, observed_month_freq, n_athletes)
 
     # ### plot - quarters
 
     # group_by_gender = False
     group_by_gender = True
 
-    fig = plt.figure(figsize=(12, 12))
-
     # only keep one country
     # single_country = "FRA"
     single_country = None
@@ -316,23 +407,8 @@ def main():
     tmp_reshaped_arr = expected_month_freq.reshape(4, 3)
     expected_quarter_freq = tmp_reshaped_arr.sum(axis=1)
 
-    plt.bar(range(4), expected_quarter_freq, color="gray", alpha=0.3, label="expected (data: UN)", edgecolor="black")
-    observed_quarter_freq.plot.bar(label="observed (data: ITU)", color="deepskyblue", edgecolor="black", linewidth=3 if group_by_gender else 1)
-    for index, value in observed_quarter_freq.items():
-        plt.text(
-            index - 1,
-            value + 0.5,
-            f"{value:.1f}%",
-            color="darkblue",
-            ha="center",
-            fontsize=10,
-            fontweight="bold",
-            zorder=10,
-            bbox = dict(facecolor='deepskyblue', alpha=1, edgecolor='black')
-        )
-    plt.axhline(100 / 4, linestyle="-.", color="dimgray", label=f"uniform: {100 / 4:.1f}%", linewidth=2)
-
     # group by gender
+    grouped = None
     if group_by_gender:
         grouped = df.groupby(
             ['quarter', 'athlete_gender']
@@ -340,64 +416,17 @@ def main():
 
         print(grouped)
 
-        n_female = grouped['female'].sum()
-        n_male = grouped['male'].sum()
-
         # Normalize the columns by dividing by their respective sums
         normalized_grouped = 100 * grouped.div(grouped.sum(axis=0), axis=1)
 
         # Print the normalized DataFrame
         print(normalized_grouped)
 
-        kwargs = {
-            "edgecolor": 'black',
-            "align": 'edge',
-            "linestyle": '-.',
-        }
-        width = 0.15
-        normalized_grouped['female'].plot.bar(legend=True, label=f'ITU women ({n_female:,})', color="violet", width=-width, **kwargs)
-        normalized_grouped['male'].plot.bar(legend=True, label=f'ITU men ({n_male:,})', color="lightskyblue", width=width, **kwargs)
-
-        ax = plt.gca()
-
-        # Add numbers on top of female bars
-        for i, value in enumerate(normalized_grouped['female']):
-            ax.text(
-                i - width / 2,
-                15,
-                f'{value:.1f}%',
-                rotation=90,
-                ha='center',
-                color='black',
-            )  # Shift to left slightly due to width
-
-        # Add numbers on top of male bars
-        for i, value in enumerate(normalized_grouped['male']):
-            ax.text(
-                i + width / 2,
-                15,
-                f'{value:.1f}%',
-                rotation=90,
-                ha='center',
-                color='black',
-            )
-
-    plt.xticks([0, 1, 2, 3], ['Q1\n(90/91 days)', 'Q2\n(91 days)', 'Q3\n(92 days)', 'Q4\n(92 days)'], rotation=0, fontsize=12)
     title = f"YEAR-QUARTER OF BIRTH\n({n_athletes:,} athletes)"
     if single_country is not None:
         title += f" - {single_country} only"
     if junior_only:
         title += " - Junior categories only"
-    plt.title(title, fontsize=18)
-    plt.yticks(range(0, int(max(observed_quarter_freq.max(), 10)) + 4), fontsize=12)
-    plt.grid(axis="y")
-
-    plt.xlim(-0.5, 3.5)
-    plt.xlabel("QUARTER", fontsize=16)
-    plt.ylabel("PERCENT", fontsize=16)
-    plt.legend()
-    plt.tight_layout()
-    add_watermark(fig)
     saving_name = "birth_quarters"
     if group_by_gender:
         saving_name += "_gender"
@@ -405,8 +434,7 @@ def main():
         saving_name += f"_{single_country}"
     if junior_only:
         saving_name += f"_junior"
-    plt.savefig(str(res_dir / f"{saving_name}.png"), dpi=300)
-    plt.show()
+    plot_birth_quarters(expected_quarter_freq, observed_quarter_freq, grouped, title, saving_name)
 
     # assert sum(observed_month_freq) == 100
     # assert sum(observed_quarter_freq) == 100
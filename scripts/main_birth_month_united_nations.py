@@ -8,6 +8,7 @@ from matplotlib import pyplot as plt
 from utils_countries import convert_country_alpha2_to_country_name, convert_country_name_to_country_alpha2, \
     convert_country_alpha2_to_continent
 from utils import json_dump, reference_month_of_birth_path, reference_month_of_birth_data_path, res_dir, add_watermark
+from utils_figures import CachedFigure, get_fingerprint
 
 plt.rcParams["font.family"] = "monospace"  # todo: set in global config
 plt.rcParams['mathtext.default'] = 'rm'
@@ -18,6 +19,7 @@ EXPECTED_N_ENTRIES = 230_254_524
 
 
 def get_month_distribution(df):
+    figure_inputs = get_fingerprint(locals())
     # drop "Total"
     df = df[df["Month"] != "Total"]
     # drop "Month" that contain a dash symbol
@@ -50,6 +52,10 @@ def get_month_distribution(df):
 
     json_dump(data=df.Value.to_list(), p=reference_month_of_birth_path)
 
+    figure = CachedFigure(res_dir / "birth_months_un.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
     fig, ax = plt.subplots(figsize=(16, 16))
 
     df.plot.bar(
@@ -84,54 +90,19 @@ def get_month_distribution(df):
     plt.legend(fontsize=15)
     plt.tight_layout()
     add_watermark(fig, y=0.95)
-    plt.savefig(str(res_dir / "birth_months_un.png"), dpi=300)
+    figure.save()
 
     plt.show()
 
 
-def plot_continents(df):
-    def convert_country_name_to_country_alpha2_with_correction(country_name: str) -> str:
-        correction = {
-            "Republic of Korea": "KR",  # 255
-            "Saint Helena ex. dep.": "SH",  # 146
-            "China, Hong Kong SAR": "HK",  # 145
-            "United Kingdom of Great Britain and Northern Ireland": "GB",  # 144
-            "China, Macao SAR": "CN",  # 143
-            "Czechia": "CZ",  # 143
-            "Netherlands (Kingdom of the)": "NL",  # 130
-            "Republic of Moldova": "MD",  # 117
-            "Venezuela (Bolivarian Republic of)": "VE",  # 117
-            "North Macedonia": "MK",  # 104
-            "Iran (Islamic Republic of)": "IR",  # 78
-            "Reunion": "RE",  # 78
-            "Türkiye": "TR",  # 52
-        }
-        if country_name in correction:
-            return correction[country_name]
-        else:
-            assert convert_country_name_to_country_alpha2(country_name) is not None, country_name
-            return convert_country_name_to_country_alpha2(country_name)
-
-    df["country_alpha2"] = df["country"].apply(convert_country_name_to_country_alpha2_with_correction)
-
-    # ###
+def plot_birth_continents_un(continent_value_counts, continent_text: dict, n_entries: int):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "birth_continents_un.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
     fig = plt.figure(figsize=(12, 12))
 
-    df["continent"] = df["country_alpha2"].apply(lambda x: convert_country_alpha2_to_continent(x))
-
-    missing_countries = dict(df[df["continent"].isna()][["country", "country_alpha2"]].value_counts("country"))
-    for k, v in missing_countries.items():
-        print(f"{k}: {v}")
-
-    # sum all values of df
-    assert EXPECTED_N_ENTRIES == df["Value"].sum(), df["Value"].sum()
-
-    continent_value_counts = df[["continent", "Value"]].groupby("continent").sum("Value")
-    n_entries = continent_value_counts["Value"].sum()
-    assert EXPECTED_N_ENTRIES == n_entries, n_entries
-
-    continent_value_counts = continent_value_counts["Value"].sort_values(ascending=False)
     continent_value_counts.plot.bar(color="deepskyblue", edgecolor="black")
 
     plt.xticks(rotation=45, ha="right", fontsize=12)
@@ -140,16 +111,7 @@ def plot_continents(df):
     plt.xlabel("")
 
     for index, (continent, value) in enumerate(continent_value_counts.items()):
-        countries_counts = df[df["continent"] == continent].groupby("country_alpha2").sum("Value")
-        countries_counts = countries_counts["Value"].sort_values(ascending=False).head(5)
-
-        country_names_counts = {
-            convert_country_alpha2_to_country_name(k): v
-            for k, v in dict(countries_counts).items()
-        }
-        print(f"{continent}: {country_names_counts}")
-
-        txt = "\n".join(f"{k}: {v:,.0f}" for k, v in country_names_counts.items())
+        txt = "\n".join(f"{k}: {v:,.0f}" for k, v in continent_text[continent].items())
         txt += "\n..."
         plt.text(
             index,
@@ -173,27 +135,19 @@ def plot_continents(df):
 
     plt.tight_layout()
     add_watermark(fig, y=0.95)
-    plt.savefig(str(res_dir / "birth_continents_un.png"), dpi=300)
+    figure.save()
 
     plt.show()
 
-    # ### plot continent/month distribution
-
-    assert EXPECTED_N_ENTRIES == df["Value"].sum(), df["Value"].sum()
-    continent_months_abs = df[["continent", "Month", "Value"]].groupby(["continent", "Month"]).sum("Value")
 
-    n_continents = len(continent_months_abs.groupby("continent"))
-    bar_width = 1 / (1 + n_continents)
-    offsets = np.arange(0, len(continent_months_abs) * bar_width, bar_width)
-    offsets = offsets - 0.4
+def plot_continent_quarters_un(df2, n_entries: int):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "continent_quarters_un.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
     fig = plt.figure(figsize=(12, 12))
     plt.title(f"QUARTER-OF-BIRTH DISTRIBUTION\nBY CONTINENT\ndata.UN.org\n({n_entries:,} entries)", fontsize=18)
-    # group the 12 values in 4 groups of 3: (1,2,3) (4,5,6) (7,8,9) (10,11,12)
-    df['quarter'] = ((df.Month - 1) // 3) + 1
-    df['quarter'] = df['quarter'].apply(lambda _x: 'Q' + str(_x))
-    df2 = df[["continent", "Value", "quarter"]].groupby(["continent", "quarter"]).sum("Value")
-    df2.reset_index(inplace=True)
     df2.pivot(index='continent', columns='quarter', values='Value').plot(
         kind="bar",
         edgecolor="black",
@@ -205,18 +159,15 @@ def plot_continents(df):
     plt.ylabel("COUNT", fontsize=15)
     plt.tight_layout()
     add_watermark(fig, y=0.96)
-    plt.savefig(str(res_dir / "continent_quarters_un.png"), dpi=300)
+    figure.save()
     plt.show()
 
-    dfs = []
-    for continent, df_continent in df2.groupby("continent"):
-        total = df_continent["Value"].sum()
-        df_continent["ValueNormalized"] = 100 * df_continent["Value"] / total
-        dfs.append(df_continent)
-        print()
-    df3 = pd.concat(dfs)
 
-    # ###
+def plot_quarter_by_continent_un_normalized(df3, n_continents: int, n_entries: int):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "quarter_by_continent_un_normalized.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
     fig = plt.figure(figsize=(12, 12))
     plt.title(f"QUARTER-OF-BIRTH DISTRIBUTION\nBY CONTINENT\n(NORMALIZED)\ndata.UN.org\n({n_entries:,} entries)", fontsize=18)
@@ -246,10 +197,15 @@ def plot_continents(df):
     plt.yticks(fontsize=15)
     plt.tight_layout()
     add_watermark(fig, y=0.95)
-    plt.savefig(str(res_dir / "quarter_by_continent_un_normalized.png"), dpi=300)
+    figure.save()
     plt.show()
 
-    # ###
+
+def plot_quarter_by_continent_un_normalized_2(df3, n_continents: int, n_entries: int):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "quarter_by_continent_un_normalized_2.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
     fig = plt.figure(figsize=(12, 12))
     plt.title(f"QUARTER-OF-BIRTH DISTRIBUTIONS\nBY CONTINENT\n(NORMALIZED)\n({n_entries:,} entries)", fontsize=18)
@@ -282,64 +238,78 @@ def plot_continents(df):
     plt.yticks(fontsize=15)
     plt.tight_layout()
     add_watermark(fig, y=0.96)
-    plt.savefig(str(res_dir / "quarter_by_continent_un_normalized_2.png"), dpi=300)
+    figure.save()
     plt.show()
 
-    # ###
 
-    for title_suffix, use_norm in [("ABSOLUTE", False), ("NORMALIZED", True)]:
-        fig = plt.figure(figsize=(12, 12))
-        plt.title(f"MONTH-OF-BIRTH DISTRIBUTION\nBY CONTINENT\n({title_suffix})\ndata.UN.org\n({n_entries:,} entries)", fontsize=18)
-        ax = plt.gca()
+def plot_birth_month_by_continents_un(continent_months_abs, n_entries: int, title_suffix: str, use_norm: bool):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / f"birth_month_by_continents_un_{title_suffix.lower()}.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
+    n_continents = len(continent_months_abs.groupby("continent"))
+    bar_width = 1 / (1 + n_continents)
+    offsets = np.arange(0, len(continent_months_abs) * bar_width, bar_width)
+    offsets = offsets - 0.4
+
+    fig = plt.figure(figsize=(12, 12))
+    plt.title(f"MONTH-OF-BIRTH DISTRIBUTION\nBY CONTINENT\n({title_suffix})\ndata.UN.org\n({n_entries:,} entries)", fontsize=18)
+    ax = plt.gca()
+
+    if use_norm:
+        plt.axhline(
+            100 / 12,
+            linestyle="-.",
+            linewidth=1,
+            alpha=0.5,
+            color="black",
+            label=f"uniform: {100 / 12:.1f}%"
+        )
+        plt.ylabel("percentage".upper(), fontsize=15)
+        plt.grid(axis="y", alpha=0.5)
+    else:
+        plt.ylabel("count".upper(), fontsize=15)
+
+    for i_group, group in enumerate(continent_months_abs.groupby("continent")):
+        y = list(group[1].values.reshape(-1))
         if use_norm:
-            plt.axhline(
-                100 / 12,
-                linestyle="-.",
-                linewidth=1,
-                alpha=0.5,
-                color="black",
-                label=f"uniform: {100 / 12:.1f}%"
-            )
-            plt.ylabel("percentage".upper(), fontsize=15)
-            plt.grid(axis="y", alpha=0.5)
-        else:
-            plt.ylabel("count".upper(), fontsize=15)
-
-        for i_group, group in enumerate(continent_months_abs.groupby("continent")):
-            y = list(group[1].values.reshape(-1))
-            if use_norm:
-                y = [100 * e / sum(y) for e in y]
-            y = np.array(y)
-            x = np.arange(1, 13) + offsets[i_group]
-            ax.bar(
-                x,
-                height=y,
-                label=group[0],
-                width=bar_width,
-                edgecolor="black",
-            )
-            if use_norm:
-                for _x, _y in zip(x, y):
-                    plt.text(
-                        _x + 0.025,
-                        _y + 0.15,
-                        f"{_y:.1f}",
-                        ha="center",
-                        rotation=90,
-                        fontsize=8
-                    )
-
-        plt.legend()
-        plt.xticks(np.arange(1, 13), np.arange(1, 13), fontsize=15)
-        plt.yticks(fontsize=15)
-        plt.xlabel("")
-        plt.tight_layout()
-        add_watermark(fig, y=0.95)
-        plt.savefig(str(res_dir / f"birth_month_by_continents_un_{title_suffix.lower()}.png"), dpi=300)
-        plt.show()
-
-    # ### cumulative
+            y = [100 * e / sum(y) for e in y]
+        y = np.array(y)
+        x = np.arange(1, 13) + offsets[i_group]
+        ax.bar(
+            x,
+            height=y,
+            label=group[0],
+            width=bar_width,
+            edgecolor="black",
+        )
+        if use_norm:
+            for _x, _y in zip(x, y):
+                plt.text(
+                    _x + 0.025,
+                    _y + 0.15,
+                    f"{_y:.1f}",
+                    ha="center",
+                    rotation=90,
+                    fontsize=8
+                )
+
+    plt.legend()
+    plt.xticks(np.arange(1, 13), np.arange(1, 13), fontsize=15)
+    plt.yticks(fontsize=15)
+    plt.xlabel("")
+    plt.tight_layout()
+    add_watermark(fig, y=0.95)
+    figure.save()
+    plt.show()
+
+
+def plot_birth_continents_un_cumulative(continent_months_abs, n_entries: int):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "birth_continents_un_cumulative.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
     fig = plt.figure(figsize=(12, 12))
     plt.title(f"MONTH-OF-BIRTH DISTRIBUTION\nCUMULATIVE BY CONTINENT\ndata.UN.org\n({n_entries:,} entries)", fontsize=18)
@@ -376,9 +346,101 @@ def plot_continents(df):
     plt.xlabel("")
     plt.tight_layout()
     add_watermark(fig, y=0.96)
-    plt.savefig(str(res_dir / "birth_continents_un_cumulative.png"), dpi=300)
+    figure.save()
     plt.show()
 
+
+def plot_continents(df):
+    def convert_country_name_to_country_alpha2_with_correction(country_name: str) -> str:
+        correction = {
+            "Republic of Korea": "KR",  # 255
+            "Saint Helena ex. dep.": "SH",  # 146
+            "China, Hong Kong SAR": "HK",  # 145
+            "United Kingdom of Great Britain and Northern Ireland": "GB",  # 144
+            "China, Macao SAR": "CN",  # 143
+            "Czechia": "CZ",  # 143
+            "Netherlands (Kingdom of the)": "NL",  # 130
+            "Republic of Moldova": "MD",  # 117
+            "Venezuela (Bolivarian Republic of)": "VE",  # 117
+            "North Macedonia": "MK",  # 104
+            "Iran (Islamic Republic of)": "IR",  # 78
+            "Reunion": "RE",  # 78
+            "Türkiye": "TR",  # 52
+        }
+        if country_name in correction:
+            return correction[country_name]
+        else:
+            assert convert_country_name_to_country_alpha2(country_name) is not None, country_name
+            return convert_country_name_to_country_alpha2(country_name)
+
+    df["country_alpha2"] = df["country"].apply(convert_country_name_to_country_alpha2_with_correction)
+
+    # ###
+
+    df["continent"] = df["country_alpha2"].apply(lambda x: convert_country_alpha2_to_continent(x))
+
+    missing_countries = dict(df[df["continent"].isna()][["country", "country_alpha2"]].value_counts("country"))
+    for k, v in missing_countries.items():
+        print(f"{k}: {v}")
+
+    # sum all values of df
+    assert EXPECTED_N_ENTRIES == df["Value"].sum(), df["Value"].sum()
+
+    continent_value_counts = df[["continent", "Value"]].groupby("continent").sum("Value")
+    n_entries = continent_value_counts["Value"].sum()
+    assert EXPECTED_N_ENTRIES == n_entries, n_entries
+
+    continent_value_counts = continent_value_counts["Value"].sort_values(ascending=False)
+
+    continent_text = {}
+    for continent in continent_value_counts.index:
+        countries_counts = df[df["continent"] == continent].groupby("country_alpha2").sum("Value")
+        countries_counts = countries_counts["Value"].sort_values(ascending=False).head(5)
+
+        country_names_counts = {
+            convert_country_alpha2_to_country_name(k): v
+            for k, v in dict(countries_counts).items()
+        }
+        print(f"{continent}: {country_names_counts}")
+        continent_text[continent] = country_names_counts
+
+    plot_birth_continents_un(continent_value_counts, continent_text, n_entries)
+
+    # ### plot continent/month distribution
+
+    assert EXPECTED_N_ENTRIES == df["Value"].sum(), df["Value"].sum()
+    continent_months_abs = df[["continent", "Month", "Value"]].groupby(["continent", "Month"]).sum("Value")
+
+    n_continents = len(continent_months_abs.groupby("continent"))
+
+    # group the 12 values in 4 groups of 3: (1,2,3) (4,5,6) (7,8,9) (10,11,12)
+    df['quarter'] = ((df.Month - 1) // 3) + 1
+    df['quarter'] = df['quarter'].apply(lambda _x: 'Q' + str(_x))
+    df2 = df[["continent", "Value", "quarter"]].groupby(["continent", "quarter"]).sum("Value")
+    df2.reset_index(inplace=True)
+
+    plot_continent_quarters_un(df2, n_entries)
+
+    dfs = []
+    for continent, df_continent in df2.groupby("continent"):
+        total = df_continent["Value"].sum()
+        df_continent["ValueNormalized"] = 100 * df_continent["Value"] / total
+        dfs.append(df_continent)
+        print()
+    df3 = pd.concat(dfs)
+
+    plot_quarter_by_continent_un_normalized(df3, n_continents, n_entries)
+    plot_quarter_by_continent_un_normalized_2(df3, n_continents, n_entries)
+
+    for title_suffix, use_norm in [("ABSOLUTE", False), ("NORMALIZED", True)]:
+        plot_birth_month_by_continents_un(continent_months_abs, n_entries, title_suffix, use_norm)
+
+    plot_birth_continents_un_cumulative(continent_months_abs, n_entries)
+
+    so_far_plotted = np.zeros((12,))
+    for group in continent_months_abs.groupby("continent"):
+        so_far_plotted += np.array(list(group[1].values.reshape(-1)))
+
     # ### check results of month distribution, independent of continent
 
     assert EXPECTED_N_ENTRIES == continent_months_abs["Value"].sum()
@@ -8,33 +8,18 @@ import seaborn as sns
 
 from scripts.utils_events import get_events_df
 
-from scripts.utils_events import drop_outliers, seconds_to_h_min_sec
-from utils import data_dir, json_load, res_dir, country_emojis, add_watermark, load_config, ignored_dir
+from scripts.utils_events import drop_outliers, seconds_to_h_min_sec, load_conditions_logs, conditions_logs_path
+from utils import data_dir, json_load, res_dir, country_emojis, add_watermark, load_config
+from utils_figures import CachedFigure, get_fingerprint
+from utils_instrumentation import AnalysisProfiler
+from utils_runner import run_analyses
 
 
-def process_results_wetsuit(
-        df,
-        swim_diff_percent_max: float,
-        distance_categories,
-        sport_outliers
-):
-    # ? ignore World Cups
-    # df = df[df["event_category"] != "world-cup"]
-
-    # remove outliers?
-    outliers = df[df["swim_diff_percent"] >= swim_diff_percent_max]
-    print(f"{len(outliers)} swim outliers:")
-    print(list(outliers["event_listing"]))
-    print(list(outliers["event_title"]))
-    print(outliers["swim_diff_percent"])
-    df = df[df["swim_diff_percent"] < swim_diff_percent_max]
-
-    print("\n\n\n")
-    df_same_wetsuit = df[df['wetsuit_m'] == df['wetsuit_w']]
-    df_same_wetsuit = df_same_wetsuit[df_same_wetsuit['wetsuit_m'].notna()]
-    df_same_wetsuit = df_same_wetsuit[df_same_wetsuit['wetsuit_w'].notna()]
-    print(f"###\n{len(df_same_wetsuit)} same wetsuit combinations (not None):"
-          f"\n{df_same_wetsuit['wetsuit_m'].value_counts()}\n###\n")
+def plot_wm_swim(df_same_wetsuit, distance_categories):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "wm_swim.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
     fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(16, 16))
 
@@ -81,7 +66,6 @@ def process_results_wetsuit(
             data = swim_diff_percents[df_same_wetsuit['prog_distance_category'] == distance_category]
             mean = data.mean()
             std = data.std()
-            print(f"\t[{distance_category}] {mean:.1%} ± {std:.1%} ({len(data)})")
             axes[i_wet, i_distance_category].hist(
                 data,
                 bins="auto",
@@ -117,10 +101,189 @@ def process_results_wetsuit(
         ax.xaxis.set_major_formatter(PercentFormatter(1))
     plt.tight_layout()
     add_watermark(fig, y=0.94)
-    plt.savefig(str(res_dir / "wm_swim.png"), dpi=300)
+    figure.save()
     # plt.savefig(str(res_dir / "wm_swim_20-24.png"), dpi=300)
     # plt.show()
 
+
+def plot_wetsuit(
+        swim_diff_percent_women_fast,
+        df_same_wetsuit,
+        wm_percent,
+        wm_percent_std,
+        wm_percent_w_fast,
+        wm_percent_w_fast_std,
+        improve_percent
+):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "wetsuit.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
+    swim_diff_percent_women_fast = swim_diff_percent_women_fast.sort_values(by='swim_diff_percent')
+
+    swim_diff_percents = swim_diff_percent_women_fast["swim_diff_percent"]
+    swim_diff_percent_women_fast["name"] = swim_diff_percent_women_fast[
+        ["event_date_m", "event_venue", "prog_distance_category", "swim_diff_percent"]].apply(
+        lambda
+            x: f"{x.event_venue.split(',')[0]} {x.event_date_m[:4]}\n{x.prog_distance_category.replace('standard', 'olympic')}\ndiff = {x.swim_diff_percent:.1%}\n=> benefit = {1 - (1 + x.swim_diff_percent) / (1 + wm_percent):.1%}",
+        axis=1
+    )
+    names = swim_diff_percent_women_fast["name"]
+
+    fig, ax = plt.subplots(figsize=(12, 9))
+
+    y_max = wm_percent + 0.01
+    ax.set_ylim(0, y_max)
+
+    ax.axhline(
+        wm_percent,
+        color='dodgerblue',
+        linestyle='-.',
+        linewidth=2,
+    )
+    ax.text(
+        0.92,
+        wm_percent / y_max + 0.035,  # - 0.05,
+        f"W vs M - same equipment\n{wm_percent:.1%} ± {wm_percent_std:.1%}\n(from {len(df_same_wetsuit)} events)",
+        color='dodgerblue',
+        transform=ax.transAxes,
+        rotation=0,
+        ha='center',
+        va='center',
+        fontsize=10
+    )
+
+    ax.axhline(
+        wm_percent_w_fast,
+        color='darkturquoise',
+        linestyle='-.',
+        linewidth=2,
+    )
+    ax.text(
+        0.92,
+        wm_percent_w_fast / y_max + 0.035,
+        f"W(wetsuit) vs M(no)\n{wm_percent_w_fast:.1%} ± {wm_percent_w_fast_std:.1%}\n(from {len(swim_diff_percent_women_fast)} events)",
+        color='darkturquoise',
+        transform=ax.transAxes,
+        rotation=0,
+        ha='center',
+        va='center',
+        fontsize=10
+    )
+
+    major_ticks = np.arange(0, y_max, 0.01)
+    ax.set_yticks(major_ticks)
+
+    ax.bar(
+        names,
+        swim_diff_percents,
+        color='darkturquoise',
+        alpha=0.5,
+        width=0.2,
+        edgecolor='black',
+        linewidth=0.5,
+    )
+    # set ax font size
+    # for tick in ax.get_xticklabels():
+    #     tick.set_fontsize(8)
+    # for tick in ax.get_yticklabels():
+    #     tick.set_fontsize(8)
+
+    # Remove axes splines
+    for s in ['top', 'bottom', 'left', 'right']:
+        ax.spines[s].set_visible(False)
+
+    # Remove x, y Ticks
+    ax.xaxis.set_ticks_position('none')
+    ax.yaxis.set_ticks_position('none')
+
+    # Add padding between axes and labels
+    ax.xaxis.set_tick_params(pad=5)
+    ax.yaxis.set_tick_params(pad=10)
+
+    ax.grid(
+        color='grey',
+        linestyle='-.',
+        linewidth=0.5,
+        alpha=0.7
+    )
+
+    # Add annotation to bars
+    # for i in ax.patches:
+    #     plt.text(
+    #         i.get_width() + 0.002,
+    #         i.get_y() + 0.4,
+    #         f"{i.get_width():.1%}",
+    #         fontsize=10,
+    #         fontweight='bold',
+    #         color='grey'
+    #     )
+
+    ax.invert_xaxis()
+
+    vals = ax.get_yticks()
+    ax.set_yticklabels(['{:,.1%}'.format(x) for x in vals])
+    ax.set_ylabel("How much slower did women swim\ncompared to men (%)?", fontsize=12)
+
+    wm_percent_w_fast_str = f"{100 * wm_percent_w_fast:.1f}\\%"
+    wm_percent_str = f"{100 * wm_percent:.1f}\\%"
+    improve_percent_str = f"{100 * improve_percent:.1f}\\%"
+    ax.set_title(
+        f'MEN without wetsuit swim FASTER than WOMEN with wetsuit, by ${wm_percent_w_fast_str}$'
+        f'\nThe benefit from wetsuit can be derived: ${improve_percent_str}$'
+        f'\n[ ${improve_percent_str} = 1 - (1 + {wm_percent_w_fast_str}) / (1 + {wm_percent_str})$ ]',
+        # loc='left',
+        fontsize=15
+    )
+    add_watermark(fig, y=0.9, x=0.12)
+    figure.save()
+    # plt.savefig(str(res_dir / "wetsuit_20-24.png"), dpi=300)
+    plt.show()
+
+
+def process_results_wetsuit(
+        df,
+        swim_diff_percent_max: float,
+        distance_categories,
+        sport_outliers
+):
+    figure_inputs = get_fingerprint(locals())
+    # ? ignore World Cups
+    # df = df[df["event_category"] != "world-cup"]
+
+    # remove outliers?
+    outliers = df[df["swim_diff_percent"] >= swim_diff_percent_max]
+    print(f"{len(outliers)} swim outliers:")
+    print(list(outliers["event_listing"]))
+    print(list(outliers["event_title"]))
+    print(outliers["swim_diff_percent"])
+    df = df[df["swim_diff_percent"] < swim_diff_percent_max]
+
+    print("\n\n\n")
+    df_same_wetsuit = df[df['wetsuit_m'] == df['wetsuit_w']]
+    df_same_wetsuit = df_same_wetsuit[df_same_wetsuit['wetsuit_m'].notna()]
+    df_same_wetsuit = df_same_wetsuit[df_same_wetsuit['wetsuit_w'].notna()]
+    print(f"###\n{len(df_same_wetsuit)} same wetsuit combinations (not None):"
+          f"\n{df_same_wetsuit['wetsuit_m'].value_counts()}\n###\n")
+
+    data_all = df_same_wetsuit["swim_diff_percent"]
+    wm_percent = data_all.mean()
+    wm_percent_std = data_all.std()
+
+    for use_wetsuit in [False, True]:
+        if use_wetsuit:
+            swim_diff_percents = df_same_wetsuit[df_same_wetsuit['wetsuit_m']]["swim_diff_percent"]
+        else:
+            swim_diff_percents = df_same_wetsuit[~df_same_wetsuit['wetsuit_m'].astype(bool)]["swim_diff_percent"]
+        for distance_category in distance_categories:
+            data = swim_diff_percents[df_same_wetsuit['prog_distance_category'] == distance_category]
+            mean = data.mean()
+            std = data.std()
+            print(f"\t[{distance_category}] {mean:.1%} ± {std:.1%} ({len(data)})")
+
+    plot_wm_swim(df_same_wetsuit, distance_categories)
+
     # conclusion: the difference in swim (in %) is independent of wetsuit and distance
 
     df_different_wetsuit = df[df['wetsuit_m'] != df['wetsuit_w']]
@@ -194,133 +357,54 @@ def process_results_wetsuit(
         print(
             f"improve_percent = {improve_percent:.1%} from substitution ({wm_percent = :.1%}) ({wm_percent_w_fast = :.1%})")
 
-        swim_diff_percent_women_fast = swim_diff_percent_women_fast.sort_values(by='swim_diff_percent')
-
-        swim_diff_percents = swim_diff_percent_women_fast["swim_diff_percent"]
-        swim_diff_percent_women_fast["name"] = swim_diff_percent_women_fast[
-            ["event_date_m", "event_venue", "prog_distance_category", "swim_diff_percent"]].apply(
-            lambda
-                x: f"{x.event_venue.split(',')[0]} {x.event_date_m[:4]}\n{x.prog_distance_category.replace('standard', 'olympic')}\ndiff = {x.swim_diff_percent:.1%}\n=> benefit = {1 - (1 + x.swim_diff_percent) / (1 + wm_percent):.1%}",
-            axis=1
-        )
-        names = swim_diff_percent_women_fast["name"]
-
-        fig, ax = plt.subplots(figsize=(12, 9))
-
-        y_max = wm_percent + 0.01
-        ax.set_ylim(0, y_max)
-
-        ax.axhline(
+        plot_wetsuit(
+            swim_diff_percent_women_fast,
+            df_same_wetsuit,
             wm_percent,
-            color='dodgerblue',
-            linestyle='-.',
-            linewidth=2,
-        )
-        ax.text(
-            0.92,
-            wm_percent / y_max + 0.035,  # - 0.05,
-            f"W vs M - same equipment\n{wm_percent:.1%} ± {wm_percent_std:.1%}\n(from {len(df_same_wetsuit)} events)",
-            color='dodgerblue',
-            transform=ax.transAxes,
-            rotation=0,
-            ha='center',
-            va='center',
-            fontsize=10
-        )
-
-        ax.axhline(
+            wm_percent_std,
             wm_percent_w_fast,
-            color='darkturquoise',
-            linestyle='-.',
-            linewidth=2,
-        )
-        ax.text(
-            0.92,
-            wm_percent_w_fast / y_max + 0.035,
-            f"W(wetsuit) vs M(no)\n{wm_percent_w_fast:.1%} ± {wm_percent_w_fast_std:.1%}\n(from {len(swim_diff_percent_women_fast)} events)",
-            color='darkturquoise',
-            transform=ax.transAxes,
-            rotation=0,
-            ha='center',
-            va='center',
-            fontsize=10
-        )
-
-        major_ticks = np.arange(0, y_max, 0.01)
-        ax.set_yticks(major_ticks)
-
-        ax.bar(
-            names,
-            swim_diff_percents,
-            color='darkturquoise',
-            alpha=0.5,
-            width=0.2,
-            edgecolor='black',
-            linewidth=0.5,
+            wm_percent_w_fast_std,
+            improve_percent
         )
-        # set ax font size
-        # for tick in ax.get_xticklabels():
-        #     tick.set_fontsize(8)
-        # for tick in ax.get_yticklabels():
-        #     tick.set_fontsize(8)
 
-        # Remove axes splines
-        for s in ['top', 'bottom', 'left', 'right']:
-            ax.spines[s].set_visible(False)
+    # alternative method: compare times with wetsuit vs without
 
-        # Remove x, y Ticks
-        ax.xaxis.set_ticks_position('none')
-        ax.yaxis.set_ticks_position('none')
+    improve_percents = []
+    swims = {}
 
-        # Add padding between axes and labels
-        ax.xaxis.set_tick_params(pad=5)
-        ax.yaxis.set_tick_params(pad=10)
+    for distance_category in distance_categories:
+        for suffix in ["w", "m"]:
+            df_ = df[(df[f'wetsuit_{suffix}'].notna()) & (df['prog_distance_category'] == distance_category)]
+            wet = df_[df_[f'wetsuit_{suffix}']][f"swim_mean_{suffix}"]
+            # no_wet = df_[~df_[f'wetsuit_{suffix}'].astype(bool)][f"swim_mean_{suffix}"]
+            # removing Mooloolaba 2012
+            no_wet_tmp = df_[(~df_[f'wetsuit_{suffix}'].astype(bool)) & (df_[f'event_id'] != 54303)]
+            no_wet = no_wet_tmp[f"swim_mean_{suffix}"]
+            swims[(distance_category, suffix)] = (wet, no_wet)
+            print("slowest swim:")
+            print(no_wet_tmp.sort_values(f"swim_mean_{suffix}")[["event_title", f"swim_mean_{suffix}"]].tail(5))
 
-        ax.grid(
-            color='grey',
-            linestyle='-.',
-            linewidth=0.5,
-            alpha=0.7
-        )
+            wet_mean = wet.mean()
+            wet_std = wet.std()
+            no_wet_mean = no_wet.mean()
+            no_wet_std = no_wet.std()
 
-        # Add annotation to bars
-        # for i in ax.patches:
-        #     plt.text(
-        #         i.get_width() + 0.002,
-        #         i.get_y() + 0.4,
-        #         f"{i.get_width():.1%}",
-        #         fontsize=10,
-        #         fontweight='bold',
-        #         color='grey'
-        #     )
-
-        ax.invert_xaxis()
-
-        vals = ax.get_yticks()
-        ax.set_yticklabels(['{:,.1%}'.format(x) for x in vals])
-        ax.set_ylabel("How much slower did women swim\ncompared to men (%)?", fontsize=12)
-
-        wm_percent_w_fast_str = f"{100 * wm_percent_w_fast:.1f}\\%"
-        wm_percent_str = f"{100 * wm_percent:.1f}\\%"
-        improve_percent_str = f"{100 * improve_percent:.1f}\\%"
-        ax.set_title(
-            f'MEN without wetsuit swim FASTER than WOMEN with wetsuit, by ${wm_percent_w_fast_str}$'
-            f'\nThe benefit from wetsuit can be derived: ${improve_percent_str}$'
-            f'\n[ ${improve_percent_str} = 1 - (1 + {wm_percent_w_fast_str}) / (1 + {wm_percent_str})$ ]',
-            # loc='left',
-            fontsize=15
-        )
-        add_watermark(fig, y=0.9, x=0.12)
-        plt.savefig(str(res_dir / "wetsuit.png"), dpi=300)
-        # plt.savefig(str(res_dir / "wetsuit_20-24.png"), dpi=300)
-        plt.show()
+            print(f"{distance_category} ({suffix.upper()}) ({len(df_)})")
+            print(f"\twet_mean    = {wet_mean:.0f} ±{wet_std:.0f} ({len(wet):,})")
+            print(f"\tno_wet_mean = {no_wet_mean:.0f} ±{no_wet_std:.0f} ({len(no_wet):,})")
+            improve_percent = (no_wet_mean - wet_mean) / no_wet_mean
+            print(f"\timprove_percent = {improve_percent :.2%}")
+            print(f"\t range wetsuit: {wet.min()} - {wet.max()} = {wet.max() - wet.min()}")
+            print(f"\t range no wetsuit: {no_wet.min()} - {no_wet.max()} = {no_wet.max() - no_wet.min()}")
+            improve_percents.append(improve_percent)
+            print()
 
-    # alternative method: compare times with wetsuit vs without
+    figure = CachedFigure(res_dir / "wetsuit_2.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
     fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(16, 16))
 
-    improve_percents = []
-
     for i_distance_category, distance_category in enumerate(distance_categories):
         x_max = max(
             drop_outliers(df[df['prog_distance_category'] == distance_category], i_sport=0, sport_outliers=sport_outliers)[f"swim_mean_m"].max(),
@@ -337,14 +421,7 @@ def process_results_wetsuit(
                 "w": ("navy", "violet"),
                 "m": ("navy", "cyan"),
             }
-            df_ = df[(df[f'wetsuit_{suffix}'].notna()) & (df['prog_distance_category'] == distance_category)]
-            wet = df_[df_[f'wetsuit_{suffix}']][f"swim_mean_{suffix}"]
-            # no_wet = df_[~df_[f'wetsuit_{suffix}'].astype(bool)][f"swim_mean_{suffix}"]
-            # removing Mooloolaba 2012
-            no_wet_tmp = df_[(~df_[f'wetsuit_{suffix}'].astype(bool)) & (df_[f'event_id'] != 54303)]
-            no_wet = no_wet_tmp[f"swim_mean_{suffix}"]
-            print("slowest swim:")
-            print(no_wet_tmp.sort_values(f"swim_mean_{suffix}")[["event_title", f"swim_mean_{suffix}"]].tail(5))
+            wet, no_wet = swims[(distance_category, suffix)]
 
             axes[i_suffix, i_distance_category].hist(
                 wet,
@@ -390,15 +467,6 @@ def process_results_wetsuit(
                 #     fontsize=10
                 # )
 
-            print(f"{distance_category} ({suffix.upper()}) ({len(df_)})")
-            print(f"\twet_mean    = {wet_mean:.0f} ±{wet_std:.0f} ({len(wet):,})")
-            print(f"\tno_wet_mean = {no_wet_mean:.0f} ±{no_wet_std:.0f} ({len(no_wet):,})")
-            improve_percent = (no_wet_mean - wet_mean) / no_wet_mean
-            print(f"\timprove_percent = {improve_percent :.2%}")
-            print(f"\t range wetsuit: {wet.min()} - {wet.max()} = {wet.max() - wet.min()}")
-            print(f"\t range no wetsuit: {no_wet.min()} - {no_wet.max()} = {no_wet.max() - no_wet.min()}")
-            improve_percents.append(improve_percent)
-            print()
 
             axes[i_suffix, i_distance_category].legend()
             axes[i_suffix, i_distance_category].grid()
@@ -432,13 +500,18 @@ def process_results_wetsuit(
 
     plt.tight_layout()
     add_watermark(fig)
-    plt.savefig(str(res_dir / "wetsuit_2.png"), dpi=300)
+    figure.save()
     # plt.savefig(str(res_dir / "wetsuit_2_20-24.png"), dpi=300)
 
     plt.show()
 
 
 def process_sports(df, distance_categories, sports, sport_outliers):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "sports_paces.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
     fig, axes = plt.subplots(nrows=3, ncols=2, figsize=(16, 16))
 
     fig.suptitle(
@@ -522,7 +595,7 @@ def process_sports(df, distance_categories, sports, sport_outliers):
     fig.tight_layout()
 
     add_watermark(fig)
-    plt.savefig(str(res_dir / "sports_paces.png"), dpi=300)
+    figure.save()
     # plt.savefig(str(res_dir / "sports_paces_top3.png"), dpi=300)
     # plt.savefig(str(res_dir / "sports_paces_top10.png"), dpi=300)
 
@@ -535,6 +608,7 @@ def process_results_w_vs_m(
         sports,
         distance_categories
 ):
+    figure_inputs = get_fingerprint(locals())
     # max_diff_percent = max(df[f"{sport}_diff_percent"].max() for sport in sports)
     max_diff_percent = 0.21
     max_diff_percent += 0.01
@@ -551,14 +625,21 @@ def process_results_w_vs_m(
         if not use_world_cup:
             df_2 = df_2[df_2["event_category"] != "world-cup"]
 
+        for distance_category in distance_categories:
+            print(distance_category)
+            print(df_2[(df_2['prog_distance_category'] == distance_category) & (df_2[f"{sports[0]}_diff_percent"] > 0.22)])
+
+        saving_name = f"wm_over_years" if use_world_cup else f"wm_over_years_no_world_cup"
+        figure = CachedFigure(res_dir / saving_name, inputs=[figure_inputs], dpi=300)
+        if figure.up_to_date():
+            continue
+
         fig, axes = plt.subplots(nrows=len(sports), ncols=2, figsize=(16, 16))
         for i_distance_category, distance_category in enumerate(distance_categories):
-            print(distance_category)
             for i_sport, sport in enumerate(sports):
                 data = df_2[df_2['prog_distance_category'] == distance_category]
 
                 if i_sport == 0:
-                    print(df_2[(df_2['prog_distance_category'] == distance_category) & (df_2[f"{sport}_diff_percent"] > 0.22)])
                     # fair to consider same swim equipment
                     data = df_2[
                         (df_2['prog_distance_category'] == distance_category) &
@@ -633,21 +714,25 @@ def process_results_w_vs_m(
 
         plt.tight_layout()
         add_watermark(fig)
-        saving_name = f"wm_over_years" if use_world_cup else f"wm_over_years_no_world_cup"
-        plt.savefig(str(res_dir / saving_name), dpi=300)
+        figure.save()
         plt.show()
 
     # histograms
 
+    for distance_category in distance_categories:
+        print(distance_category)
+        print(df[(df['prog_distance_category'] == distance_category) & (df[f"{sports[0]}_diff_percent"] > 0.22)])
+
+    figure = CachedFigure(res_dir / "wm.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
     fig, axes = plt.subplots(nrows=len(sports), ncols=2, figsize=(16, 16))
     for i_distance_category, distance_category in enumerate(distance_categories):
-        print(distance_category)
         for i_sport, sport in enumerate(sports):
             data = df[df['prog_distance_category'] == distance_category][f"{sport}_diff_percent"]
 
             if i_sport == 0:
-                print(df[(df['prog_distance_category'] == distance_category) & (df[f"{sport}_diff_percent"] > 0.22)])
-
                 # fair to consider same swim equipment
                 data = df[
                     (df['prog_distance_category'] == distance_category) &
@@ -715,11 +800,12 @@ def process_results_w_vs_m(
 
     plt.tight_layout()
     add_watermark(fig)
-    plt.savefig(str(res_dir / "wm.png"), dpi=300)
+    figure.save()
     plt.show()
 
 
 def process_ages(df):
+    figure_inputs = get_fingerprint(locals())
     # df = df[df["event_category"] != "world-cup"]
 
     colours = ["pink", "violet", "cyan", "deepskyblue"]
@@ -732,6 +818,10 @@ def process_ages(df):
 
     df = df.sort_values("event_date_m")
 
+    figure = CachedFigure(res_dir / "ages.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
     fig = plt.figure(figsize=(20, 9))
 
     gs = fig.add_gridspec(2, 4)
@@ -829,7 +919,7 @@ def process_ages(df):
     plt.tight_layout()
 
     add_watermark(fig, y=0.94)
-    plt.savefig(str(res_dir / "ages.png"), dpi=300)
+    figure.save()
     plt.show()
 
 
@@ -840,12 +930,12 @@ def process_results_repeated_events(
         sport_outliers,
         n_repetitions_min
 ):
+    figure_inputs = get_fingerprint(locals())
 
     df = df.sort_values("event_date_m")
 
     for i_distance_category, distance_category in enumerate(distance_categories):
         for i_suffix, suffix in enumerate(["w", "m"]):
-            fig, axes = plt.subplots(nrows=3, ncols=1, figsize=(20, 20))
             venue_groups = df[df['prog_distance_category'] == distance_category].groupby("event_venue")
 
             year_min = df["event_year"].max()
@@ -885,6 +975,19 @@ def process_results_repeated_events(
                 year_min = min(venue_group[1]["event_year"].min(), year_min)
                 year_max = max(venue_group[1]["event_year"].max(), year_max)
 
+            games_year_groups = df[
+                (df['prog_distance_category'] == distance_category) & (df['event_category'] == 'games')
+            ].groupby("event_year")
+            for year, year_group in games_year_groups:
+                if len(year_group["event_venue"]) > 1:
+                    print(f"more values in one year: {year_group['event_venue'].values}")
+
+            figure = CachedFigure(res_dir / f"repeated_events_{distance_category}_{suffix}.png", inputs=[figure_inputs], dpi=300)
+            if figure.up_to_date():
+                continue
+
+            fig, axes = plt.subplots(nrows=3, ncols=1, figsize=(20, 20))
+
             for i_sport, sport in enumerate(sports):
                 # add std to bars
                 data = df[df['prog_distance_category'] == distance_category]
@@ -938,8 +1041,6 @@ def process_results_repeated_events(
                                     games_venues[year] += "(test)"
                                 elif "commonwealth" in year_group["event_title"].values[0].lower():
                                     games_venues[year] += "(commonwealth)"
-                            elif len(year_group["event_venue"]) > 1:
-                                print(f"more values in one year: {year_group['event_venue'].values}")
 
                 years = sorted(set(year for category in cat_bar_dict.values() for year in category))
 
@@ -1105,16 +1206,18 @@ def process_results_repeated_events(
             )
             plt.tight_layout()
             add_watermark(fig)
-            plt.savefig(str(res_dir / f"repeated_events_{distance_category}_{suffix}.png"), dpi=300)
+            figure.save()
             # plt.savefig(str(res_dir / f"repeated_events_{distance_category}_{suffix}_top3.png"), dpi=300)
             # plt.savefig(str(res_dir / f"repeated_events_{distance_category}_{suffix}_top10.png"), dpi=300)
             plt.show()
 
 
-def process_sprint_finish(
-        df,
-        distance_categories
-):
+def plot_sprint_finish(df, distance_categories):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / f"sprint_finish.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
     fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(20, 20))
 
     for i_distance_category, distance_category in enumerate(distance_categories):
@@ -1238,75 +1341,26 @@ def process_sprint_finish(
     plt.suptitle(f"TIME BETWEEN FIRST AND SECOND AT FINISH (seconds)\n ({len(df)} events)", fontsize=20)
     plt.tight_layout()
     add_watermark(fig)
-    plt.savefig(str(res_dir / f"sprint_finish.png"), dpi=300)
+    figure.save()
     plt.show()
 
-    # plot over years
 
-    # df = df[df["event_category"] != "world-cup"]
+def plot_sprint_finish_over_years(df, distance_categories):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / f"sprint_finish_over_years.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
     fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(20, 20))
 
     sprint_gap_max_s = 3
 
-    sprint_finish_data = []
-
     for i_distance_category, distance_category in enumerate(distance_categories):
         for i_suffix, suffix in enumerate(["w", "m"]):
             df2 = df[
                 (df['prog_distance_category'] == distance_category)
             ]
 
-            print(
-                f"{distance_category.replace('standard', 'olympic').upper()} - {'WOMEN' if suffix == 'w' else 'MEN'}:")
-            for index, row in df2.iterrows():
-                if row[f"second_delay_{suffix}"] < 2:
-                    print(
-                        f"\t{row['event_year']} - {row['event_venue']} {row[f'winner_{suffix}']} outperforms {row[f'second_{suffix}']} ({row[f'second_delay_{suffix}']}s)")
-                    print(f"\t\tlink:{row['event_title']}")
-
-                    first_country = row[f"winner_country_{suffix}"]
-                    second_country = row[f"second_country_{suffix}"]
-                    event_country = row["event_country_noc"]
-
-                    first_country_emoji = country_emojis[
-                        first_country] if first_country in country_emojis else first_country
-                    second_country_emoji = country_emojis[
-                        second_country] if second_country in country_emojis else second_country
-                    event_country_emoji = country_emojis[
-                        event_country] if event_country in country_emojis else event_country
-
-                    first = row[f"winner_{suffix}"]
-                    second = row[f"second_{suffix}"]
-
-                    event_venue = row["event_venue"].replace("Jintang, Chengdu, Sichuan Province, China", "Chengdu")
-
-                    event_listing = row['event_listing']
-                    # event_listing = "http://www.triathlon.org"
-                    assert "http" in event_listing
-
-                    sprint_finish_data.append({
-                        "suffix": suffix,
-
-                        "year": f"[{row['event_year']}]({event_listing})",
-                        "venue": f"[{event_venue}]({event_listing}) ( {event_country_emoji} )",
-                        "event_country": event_country,
-
-                        "dist.": row["prog_distance_category"].replace("standard", "olympic"),
-
-                        "race category": row["event_category"],
-
-                        "first": f'{first} ( {first_country_emoji} )',
-                        "first_country": first_country,
-
-                        "second": f'{second} ( {second_country_emoji} )',
-                        "second_country": second_country,
-
-                        # "title": row["event_title"],
-                        # "url": f"[link]({event_listing})",
-                        # "second_delay": row[f"second_delay_{suffix}"],
-                    })
-
             df2 = df2[["event_year", f"second_delay_{suffix}"]]
 
             year_datas = {}
@@ -1341,7 +1395,6 @@ def process_sprint_finish(
 
             gap_max = df3[f"second_delay_mean"].max()
             if gap_max > 50:
-                print(gap_max)
                 # todo: use "broken axis"
                 axes[i_distance_category, i_suffix].set_ylim(0, 53)
 
@@ -1413,24 +1466,102 @@ def process_sprint_finish(
         fontsize=20
     )
 
-    sprint_finish_df = pd.DataFrame(sprint_finish_data)
+    fig.tight_layout()
+    add_watermark(fig)
+    figure.save()
+    plt.show()
 
-    country_names = sorted(list(set(
-        sprint_finish_df["first_country"].unique().tolist() + sprint_finish_df["second_country"].unique().tolist() +
-        sprint_finish_df["event_country"].unique().tolist())))
-    print(country_names)
 
-    # remove first_country column
-    sprint_finish_df.drop("first_country", axis=1, inplace=True)
-    sprint_finish_df.drop("second_country", axis=1, inplace=True)
-    sprint_finish_df.drop("event_country", axis=1, inplace=True)
+def process_sprint_finish(
+        df,
+        distance_categories
+):
+    plot_sprint_finish(df, distance_categories)
 
-    print()
+    # df = df[df["event_category"] != "world-cup"]
 
-    for suffix in ["w", "m"]:
-        sprint_finish_df2 = sprint_finish_df[sprint_finish_df.suffix == suffix].reset_index(drop=True)
-        sprint_finish_df2["race category"] = sprint_finish_df2["race category"].apply(lambda x: x.replace("wcs", "wtcs"))
-        sprint_finish_df2.drop("suffix", axis=1, inplace=True)
+    sprint_finish_data = []
+
+    for i_distance_category, distance_category in enumerate(distance_categories):
+        for i_suffix, suffix in enumerate(["w", "m"]):
+            df2 = df[
+                (df['prog_distance_category'] == distance_category)
+            ]
+
+            print(
+                f"{distance_category.replace('standard', 'olympic').upper()} - {'WOMEN' if suffix == 'w' else 'MEN'}:")
+            for index, row in df2.iterrows():
+                if row[f"second_delay_{suffix}"] < 2:
+                    print(
+                        f"\t{row['event_year']} - {row['event_venue']} {row[f'winner_{suffix}']} outperforms {row[f'second_{suffix}']} ({row[f'second_delay_{suffix}']}s)")
+                    print(f"\t\tlink:{row['event_title']}")
+
+                    first_country = row[f"winner_country_{suffix}"]
+                    second_country = row[f"second_country_{suffix}"]
+                    event_country = row["event_country_noc"]
+
+                    first_country_emoji = country_emojis[
+                        first_country] if first_country in country_emojis else first_country
+                    second_country_emoji = country_emojis[
+                        second_country] if second_country in country_emojis else second_country
+                    event_country_emoji = country_emojis[
+                        event_country] if event_country in country_emojis else event_country
+
+                    first = row[f"winner_{suffix}"]
+                    second = row[f"second_{suffix}"]
+
+                    event_venue = row["event_venue"].replace("Jintang, Chengdu, Sichuan Province, China", "Chengdu")
+
+                    event_listing = row['event_listing']
+                    # event_listing = "http://www.triathlon.org"
+                    assert "http" in event_listing
+
+                    sprint_finish_data.append({
+                        "suffix": suffix,
+
+                        "year": f"[{row['event_year']}]({event_listing})",
+                        "venue": f"[{event_venue}]({event_listing}) ( {event_country_emoji} )",
+                        "event_country": event_country,
+
+                        "dist.": row["prog_distance_category"].replace("standard", "olympic"),
+
+                        "race category": row["event_category"],
+
+                        "first": f'{first} ( {first_country_emoji} )',
+                        "first_country": first_country,
+
+                        "second": f'{second} ( {second_country_emoji} )',
+                        "second_country": second_country,
+
+                        # "title": row["event_title"],
+                        # "url": f"[link]({event_listing})",
+                        # "second_delay": row[f"second_delay_{suffix}"],
+                    })
+
+            gap_max = df2.groupby("event_year")[f"second_delay_{suffix}"].mean().max()
+            if gap_max > 50:
+                print(gap_max)
+
+    plot_sprint_finish_over_years(df, distance_categories)
+
+    sprint_finish_df = pd.DataFrame(sprint_finish_data)
+
+    country_names = sorted(list(set(
+        sprint_finish_df["first_country"].unique().tolist() + sprint_finish_df["second_country"].unique().tolist() +
+        sprint_finish_df["event_country"].unique().tolist())))
+    print(country_names)
+
+    # remove first_country column
+    sprint_finish_df.drop("first_country", axis=1, inplace=True)
+    sprint_finish_df.drop("second_country", axis=1, inplace=True)
+    sprint_finish_df.drop("event_country", axis=1, inplace=True)
+
+    print()
+
+    for suffix in ["w", "m"]:
+        sprint_finish_df2 = sprint_finish_df[sprint_finish_df.suffix == suffix].reset_index(drop=True)
+        sprint_finish_df2["race category"] = sprint_finish_df2["race category"].apply(lambda x: x.replace("wcs", "wtcs"))
+        sprint_finish_df2.drop("suffix", axis=1, inplace=True)
         sprint_finish_df2.columns = ["YEAR", "VENUE", "DIST.", "RACE CATEGORY", "FIRST-COL", "SECOND-COL"]
         txt = sprint_finish_df2.sort_values(["YEAR"]).to_markdown(
             index=False,
@@ -1440,21 +1571,15 @@ def process_sprint_finish(
         txt = txt.replace(" SECOND-COL", " SECOND ( :2nd_place_medal: )")
         print(txt)
 
-    fig.tight_layout()
-    add_watermark(fig)
-    plt.savefig(str(res_dir / f"sprint_finish_over_years.png"), dpi=300)
-    plt.show()
 
+def plot_scenarios(df, distance_categories):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / f"scenarios.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
-def process_scenarios(
-        df,
-        distance_categories
-):
     fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(20, 20))
 
-    df = df[df["event_category"] != "world-cup"]
-    # df = df[df["event_category"] == "world-cup"]
-
     pack_size_max = max(df["pack_size_w"].max(), df["pack_size_m"].max())
 
     for i_distance_category, distance_category in enumerate(distance_categories):
@@ -1528,86 +1653,16 @@ def process_scenarios(
 
     plt.tight_layout()
     add_watermark(fig)
-    plt.savefig(str(res_dir / f"scenarios.png"), dpi=300)
+    figure.save()
     # plt.savefig(str(res_dir / f"scenarios_wc.png"), dpi=300)
     plt.show()
 
-    table_info = []
-    for suffix in ["w", "m"]:
-        df_tmp = df.copy()
-        df_tmp.sort_values(
-            by=[
-                f"pack_size_{suffix}",
-                f"event_year"
-            ],
-            ascending=False,
-            inplace=True
-        )
-        for i_row, row in df_tmp.head(10).iterrows():
-            winner_name = row[f'winner_{suffix}']
-            table_info.append({
-                "**pack_size**": "**" + str(row[f"pack_size_{suffix}"]) + "**",
-                "year": row["event_year"],
-                "winner": f"{winner_name} ( {country_emojis[row[f'winner_country_{suffix}']] if row[f'winner_country_{suffix}'] in country_emojis else row['winner_country_noc']} )",
-                "distance": row["prog_distance_category"].replace("standard", "olympic").upper(),
-                "cat": row["event_category"].upper().replace("WCS", "WTCS"),
-                "event": f"[{row['event_title']} ( {country_emojis[row['event_country_noc']] if row['event_country_noc'] in country_emojis else row['event_country_noc']} )]({row['event_listing']})",
-            })
-        table_info.append({
-            "**pack_size**": "*...*",
-            "year": "...",
-            "winner": "...",
-            "distance": "...",
-            "cat": "...",
-            "event": "...",
-        })
-    df_table = pd.DataFrame(table_info)
-    # upper the columns
-    df_table.columns = df_table.columns.str.upper()
-    print(df_table.to_markdown(
-        index=False,
-        colalign=["center"] * len(df_table.columns)
-    ))
-
-    table_info = []
-    for suffix in ["w", "m"]:
-        df_table = df[(df[f"pack_size_{suffix}"] < 4) & (df2[f"is_winner_in_front_pack_{suffix}"])]
-        df_table.sort_values(
-            by=[
-                f"pack_size_{suffix}",
-                f"event_year"
-            ],
-            ascending=True,
-            inplace=True
-        )
-        print(f"{suffix.upper()}")
-        for i_row, row in df_table.iterrows():
-            winner_name = row[f'winner_{suffix}']
-            table_info.append({
-                "**pack_size**": "**" + str(row[f"pack_size_{suffix}"]) + "**",
-                "year": row["event_year"],
-                "winner": f"{winner_name} ( {country_emojis[row[f'winner_country_{suffix}']] if row[f'winner_country_{suffix}'] in country_emojis else row['winner_country_noc']} )",
-                "distance": row["prog_distance_category"].replace("standard", "olympic").upper(),
-                "cat": row["event_category"].upper().replace("WCS", "WTCS"),
-                "event": f"[{row['event_title']} ( {country_emojis[row['event_country_noc']] if row['event_country_noc'] in country_emojis else row['event_country_noc']} )]({row['event_listing']})",
-            })
-
-        table_info.append({
-            "**pack_size**": "...",
-            "year": "...",
-            "winner": "...",
-            "distance": "...",
-            "cat": "...",
-            "event": "...",
-        })
 
-    # print markdown
-    df_table = pd.DataFrame(table_info)
-    df_table.columns = df_table.columns.str.upper()
-    print(df_table.to_markdown(
-        index=False,
-        colalign=["center"] * len(df_table.columns)
-    ))
+def plot_scenarios_over_years(df, distance_categories):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / f"scenarios_over_years.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
     fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(20, 20))
 
@@ -1743,10 +1798,107 @@ def process_scenarios(
     fig.tight_layout()
 
     add_watermark(fig, y=0.96)
-    plt.savefig(str(res_dir / f"scenarios_over_years.png"), dpi=300)
+    figure.save()
     # plt.savefig(str(res_dir / f"scenarios_over_years_wc.png"), dpi=300)
     plt.show()
 
+
+def process_scenarios(
+        df,
+        distance_categories
+):
+    figure_inputs = get_fingerprint(locals())
+
+    df = df[df["event_category"] != "world-cup"]
+    # df = df[df["event_category"] == "world-cup"]
+
+    # the table of small winning packs only looks at the last distance category
+    df_last_category = df[df['prog_distance_category'] == distance_categories[-1]]
+
+    plot_scenarios(df, distance_categories)
+
+    table_info = []
+    for suffix in ["w", "m"]:
+        df_tmp = df.copy()
+        df_tmp.sort_values(
+            by=[
+                f"pack_size_{suffix}",
+                f"event_year"
+            ],
+            ascending=False,
+            inplace=True
+        )
+        for i_row, row in df_tmp.head(10).iterrows():
+            winner_name = row[f'winner_{suffix}']
+            table_info.append({
+                "**pack_size**": "**" + str(row[f"pack_size_{suffix}"]) + "**",
+                "year": row["event_year"],
+                "winner": f"{winner_name} ( {country_emojis[row[f'winner_country_{suffix}']] if row[f'winner_country_{suffix}'] in country_emojis else row['winner_country_noc']} )",
+                "distance": row["prog_distance_category"].replace("standard", "olympic").upper(),
+                "cat": row["event_category"].upper().replace("WCS", "WTCS"),
+                "event": f"[{row['event_title']} ( {country_emojis[row['event_country_noc']] if row['event_country_noc'] in country_emojis else row['event_country_noc']} )]({row['event_listing']})",
+            })
+        table_info.append({
+            "**pack_size**": "*...*",
+            "year": "...",
+            "winner": "...",
+            "distance": "...",
+            "cat": "...",
+            "event": "...",
+        })
+    df_table = pd.DataFrame(table_info)
+    # upper the columns
+    df_table.columns = df_table.columns.str.upper()
+    print(df_table.to_markdown(
+        index=False,
+        colalign=["center"] * len(df_table.columns)
+    ))
+
+    table_info = []
+    for suffix in ["w", "m"]:
+        df_table = df[(df[f"pack_size_{suffix}"] < 4) & (df_last_category[f"is_winner_in_front_pack_{suffix}"])]
+        df_table.sort_values(
+            by=[
+                f"pack_size_{suffix}",
+                f"event_year"
+            ],
+            ascending=True,
+            inplace=True
+        )
+        print(f"{suffix.upper()}")
+        for i_row, row in df_table.iterrows():
+            winner_name = row[f'winner_{suffix}']
+            table_info.append({
+                "**pack_size**": "**" + str(row[f"pack_size_{suffix}"]) + "**",
+                "year": row["event_year"],
+                "winner": f"{winner_name} ( {country_emojis[row[f'winner_country_{suffix}']] if row[f'winner_country_{suffix}'] in country_emojis else row['winner_country_noc']} )",
+                "distance": row["prog_distance_category"].replace("standard", "olympic").upper(),
+                "cat": row["event_category"].upper().replace("WCS", "WTCS"),
+                "event": f"[{row['event_title']} ( {country_emojis[row['event_country_noc']] if row['event_country_noc'] in country_emojis else row['event_country_noc']} )]({row['event_listing']})",
+            })
+
+        table_info.append({
+            "**pack_size**": "...",
+            "year": "...",
+            "winner": "...",
+            "distance": "...",
+            "cat": "...",
+            "event": "...",
+        })
+
+    # print markdown
+    df_table = pd.DataFrame(table_info)
+    df_table.columns = df_table.columns.str.upper()
+    print(df_table.to_markdown(
+        index=False,
+        colalign=["center"] * len(df_table.columns)
+    ))
+    plot_scenarios_over_years(df, distance_categories)
+
+    figure = CachedFigure(res_dir / f"best_runner_wins.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
     fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(20, 20))
 
     for i_distance_category, distance_category in enumerate(distance_categories):
@@ -1826,20 +1978,17 @@ def process_scenarios(
     fig.tight_layout()
 
     add_watermark(fig)
-    plt.savefig(str(res_dir / f"best_runner_wins.png"), dpi=300)
+    figure.save()
     # plt.savefig(str(res_dir / f"best_runner_wins_wc.png"), dpi=300)
     plt.show()
 
 
-def process_temperatures(df, distance_categories):
-
-    # assert that consistency wetsuit / temperature
-    # assert len(df[(df["wetsuit_w"]) & (df["water_temperature_w"] >= 20.0)]) == 0
-    # assert len(df[(df["wetsuit_m"]) & (df["water_temperature_m"] >= 20.0)]) == 0
-    # assert len(df[(~df["wetsuit_w"]) & (df["water_temperature_w"] < 20.0)]) == 0
-    # assert len(df[(~df["wetsuit_m"]) & (df["water_temperature_m"] < 20.0)]) == 0
+def plot_temperatures(df):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "temperatures.png", inputs=[figure_inputs])
+    if figure.up_to_date():
+        return
 
-    # plot df[temperature] distribution
     measure_min = min(
         min(df[f"water_temperature_m"].min(), df[f"water_temperature_w"].min()),
         min(df[f"air_temperature_m"].min(), df[f"air_temperature_w"].min()),
@@ -1901,7 +2050,6 @@ def process_temperatures(df, distance_categories):
         # )
 
         q_10, q_90 = np.percentile(data, [10, 90])
-        print(f"80% of {measure} temperatures are between {q_10:.1f} and {q_90:.1f} °C (Mean: {mean:.1f} °C, SD: {sd:.1f} °C, Min: {data.min():.1f} °C, Max: {data.max():.1f} °C)")
         axes[i_measure].axvline(
             q_10,
             color='black',
@@ -1948,30 +2096,239 @@ def process_temperatures(df, distance_categories):
     )
     plt.tight_layout()
     add_watermark(fig)
-    plt.savefig(res_dir / "temperatures.png")
+    figure.save()
     # plt.show()
 
-    for measure, sport in [("air", "run"), ("water", "swim")]:
-        measure_min = min(df[f"{measure}_temperature_m"].min(), df[f"{measure}_temperature_w"].min())
-        measure_max = max(df[f"{measure}_temperature_m"].max(), df[f"{measure}_temperature_w"].max())
 
-        fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(20, 20))
+def plot_temperatures_vs_times(df, distance_categories, measure, sport):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / f"temperatures_{measure}.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
-        # df = df[df["event_category"] != "world-cup"]
-        # df = df[df["event_category"] == "world-cup"]
+    measure_min = min(df[f"{measure}_temperature_m"].min(), df[f"{measure}_temperature_w"].min())
+    measure_max = max(df[f"{measure}_temperature_m"].max(), df[f"{measure}_temperature_w"].max())
 
-        for i_distance_category, distance_category in enumerate(distance_categories):
-            for i_suffix, suffix in enumerate(["w", "m"]):
-                df2 = df[df["prog_distance_category"] == distance_category]
-                df2 = df2.dropna(subset=[f"{measure}_temperature_{suffix}"])
-                df2.sort_values([f"{measure}_temperature_{suffix}"], inplace=True)
+    fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(20, 20))
+
+    # df = df[df["event_category"] != "world-cup"]
+    # df = df[df["event_category"] == "world-cup"]
+
+    for i_distance_category, distance_category in enumerate(distance_categories):
+        for i_suffix, suffix in enumerate(["w", "m"]):
+            df2 = df[df["prog_distance_category"] == distance_category]
+            df2 = df2.dropna(subset=[f"{measure}_temperature_{suffix}"])
+            df2.sort_values([f"{measure}_temperature_{suffix}"], inplace=True)
+
+            if sport == "swim":
+                # ignore races with hot-wetsuit or cold-swimsuit
+                hot_wetsuit_filter = (df2[f"wetsuit_{suffix}"]) & (df2[f"water_temperature_{suffix}"] >= 20.0)
+                cold_swimsuit_filter = (~df2[f"wetsuit_{suffix}"]) & (df2[f"water_temperature_{suffix}"] < 20.0)
+
+                df2 = df2[~hot_wetsuit_filter]
+                df2 = df2[~cold_swimsuit_filter]
+
+                colours = ["navy" if t >= 20 else "dodgerblue" for t in df2[f"{measure}_temperature_{suffix}"]]
+                kwargs = dict(
+                    color=colours,
+                    edgecolor='black',
+                    s=100,
+                    marker="x"
+                )
+
+                # reg_colour = "deepskyblue"
+                # df_no_wetsuit = df2[df2[f"{measure}_temperature_{suffix}"] >= 20.0]
+                # df_wetsuit = df2[df2[f"{measure}_temperature_{suffix}"] < 20.0]
+                # sns.regplot(
+                #     x=df_no_wetsuit[f"{measure}_temperature_{suffix}"],
+                #     y=df_no_wetsuit[f"{sport}_mean_{suffix}"],
+                #     scatter=False,
+                #     line_kws={"color": reg_colour, "linewidth": 1, "alpha": 0.1, "linestyle": "-"},
+                #     ax=axes[i_distance_category, i_suffix],
+                #     order=2
+                # )
+                # sns.regplot(
+                #     x=df_wetsuit[f"{measure}_temperature_{suffix}"],
+                #     y=df_wetsuit[f"{sport}_mean_{suffix}"],
+                #     scatter=False,
+                #     line_kws={"color": reg_colour, "linewidth": 1, "alpha": 0.1, "linestyle": "-"},
+                #     ax=axes[i_distance_category, i_suffix],
+                #     order=2
+                # )
+
+            elif sport == "run":
+                # drop event_id 109660 because too long run! (top women at 3:57/km!)
+                df2 = df2[df2["event_id"] != 109660]
+
+                kwargs = dict(
+                    cmap='autumn_r',
+                    c=df2[f"{measure}_temperature_{suffix}"],
+                    edgecolor='black',
+                    s=100,
+                    marker="P"
+                )
+
+                reg_colour = "deepskyblue"
+                sns.regplot(
+                    x=df2[f"{measure}_temperature_{suffix}"],
+                    y=df2[f"{sport}_mean_{suffix}"],
+                    scatter=False,
+                    line_kws={"color": reg_colour, "linewidth": 1, "alpha": 0.2, "linestyle": "-"},
+                    ax=axes[i_distance_category, i_suffix],
+                    order=2
+                )
+
+                coefficients = np.polyfit(
+                    df2[f"{measure}_temperature_{suffix}"],
+                    df2[f"{sport}_mean_{suffix}"],
+                    2
+                )
+                axes[i_distance_category, i_suffix].plot(
+                    df2[f"{measure}_temperature_{suffix}"],
+                    # np.poly1d(p)(df2[f"{measure}_temperature_{suffix}"]),
+                    np.polyval(coefficients, df2[f"{measure}_temperature_{suffix}"]),
+                    color='dodgerblue',
+                    linewidth=2,
+                    linestyle='-',
+                    alpha=0.6,
+                    label='Best fit (2nd degree)'
+                )
+
+                a, b, c = coefficients
+                optimal_t = -b / (2 * a)
+                axes[i_distance_category, i_suffix].axvline(
+                    optimal_t,
+                    linestyle="-.",
+                    linewidth=2,
+                    alpha=0.6,
+                    color="dodgerblue",
+                    label=f"Optimal: {optimal_t:.1f}°C"
+                )
+            else:
+                raise NotImplementedError(f"Sport {sport} not implemented")
+
+            axes[i_distance_category, i_suffix].scatter(
+                df2[f"{measure}_temperature_{suffix}"],
+                df2[f"{sport}_mean_{suffix}"],
+                **kwargs
+            )
+
+            # set title
+            axes[i_distance_category, i_suffix].set_title(
+                f"\n{distance_category.replace('standard', 'olympic').upper()} - {'WOMEN' if suffix == 'w' else 'MEN'}\n({len(df2)} events)",
+                fontsize=20
+            )
+
+            axes[i_distance_category, i_suffix].grid()
+
+            locs = axes[i_distance_category, i_suffix].get_yticks()
+
+            def format_label(_x):
+                splits = seconds_to_h_min_sec(_x, use_hours=True, sport=sport, use_units=True).split(" (")
+                return f"{splits[0]}\n({splits[1]}"
+
+            labels = map(format_label, locs)
+            axes[i_distance_category, i_suffix].set_yticks(locs)
+            axes[i_distance_category, i_suffix].set_yticklabels(labels)
+
+            # set tick font size
+            axes[i_distance_category, i_suffix].yaxis.set_tick_params(labelsize=13)
+            axes[i_distance_category, i_suffix].set_ylabel(f"{sport} time".upper(), fontsize=15)
+
+            axes[i_distance_category, i_suffix].set_xlabel(f"{measure} temperature (°C)".upper(), fontsize=15)
+            axes[i_distance_category, i_suffix].xaxis.set_tick_params(labelsize=13)
+
+            # set x min max
+            axes[i_distance_category, i_suffix].set_xlim(measure_min - 1, measure_max + 1)
+
+            if sport == "swim":
+                axes[i_distance_category, i_suffix].axvline(
+                    20,
+                    linestyle="-.",
+                    linewidth=2,
+                    color="black",
+                    label="20°C"
+                )
+
+                # get current x and y min/max of the ax
+                x_min = axes[i_distance_category, i_suffix].get_xlim()[0]
+                x_max = axes[i_distance_category, i_suffix].get_xlim()[1]
+                y_min = axes[i_distance_category, i_suffix].get_ylim()[0]
+                y_max = axes[i_distance_category, i_suffix].get_ylim()[1]
+
+                # Create the rectangle
+                rect = patches.Rectangle(
+                    (x_min, y_min),
+                    20 - x_min,
+                    y_max - y_min,
+                    facecolor='silver',
+                    alpha=0.2,
+                    label="wetsuit"
+                )
+
+                # Add the rectangle to the plot
+                axes[i_distance_category, i_suffix].add_patch(rect)
+
+                rect = patches.Rectangle(
+                    (20, y_min),
+                    x_max - 20,
+                    y_max - y_min,
+                    facecolor='lightskyblue',
+                    alpha=0.2,
+                    label="no wetsuit"
+                )
+
+                # Add the rectangle to the plot
+                axes[i_distance_category, i_suffix].add_patch(rect)
+
+            axes[i_distance_category, i_suffix].legend(fontsize=15)
+
+    fig.suptitle(
+        f"{measure.upper()} TEMPERATURES AND {sport.upper()} TIMES"
+        f"\n(from {measure_min:.1f} to {measure_max:.1f}°C)",
+        fontsize=20
+    )
+
+    fig.tight_layout()
+
+    add_watermark(fig)
+    figure.save()
+    plt.show()
+
+
+def process_temperatures(df, distance_categories):
+    # assert that consistency wetsuit / temperature
+    # assert len(df[(df["wetsuit_w"]) & (df["water_temperature_w"] >= 20.0)]) == 0
+    # assert len(df[(df["wetsuit_m"]) & (df["water_temperature_m"] >= 20.0)]) == 0
+    # assert len(df[(~df["wetsuit_w"]) & (df["water_temperature_w"] < 20.0)]) == 0
+    # assert len(df[(~df["wetsuit_m"]) & (df["water_temperature_m"] < 20.0)]) == 0
+
+    for measure in ["air", "water"]:
+        data = np.concatenate([
+            df[f"{measure}_temperature_m"].values,
+            df[f"{measure}_temperature_w"].values
+        ])
+        # drop nan
+        data = data[~np.isnan(data)]
+        mean = data.mean()
+        sd = data.std()
+        q_10, q_90 = np.percentile(data, [10, 90])
+        print(f"80% of {measure} temperatures are between {q_10:.1f} and {q_90:.1f} °C (Mean: {mean:.1f} °C, SD: {sd:.1f} °C, Min: {data.min():.1f} °C, Max: {data.max():.1f} °C)")
+
+    plot_temperatures(df)
+
+    for measure, sport in [("air", "run"), ("water", "swim")]:
+        if sport == "swim":
+            for distance_category in distance_categories:
+                for suffix in ["w", "m"]:
+                    df2 = df[df["prog_distance_category"] == distance_category]
+                    df2 = df2.dropna(subset=[f"{measure}_temperature_{suffix}"])
+                    df2.sort_values([f"{measure}_temperature_{suffix}"], inplace=True)
 
-                if sport == "swim":
                     # ignore races with hot-wetsuit or cold-swimsuit
-                    conditions_logs_path = ignored_dir / "conditions_inconsistencies.json"
-                    conditions_logs = []
-                    if conditions_logs_path.exists():
-                        conditions_logs = json_load(conditions_logs_path)
+                    df_conditions_logs = load_conditions_logs()
+                    prog_name = "Elite Men" if suffix == "m" else "Elite Women"
+                    df_conditions_logs = df_conditions_logs[df_conditions_logs["prog_name"] == prog_name]
 
                     hot_wetsuit_filter = (df2[f"wetsuit_{suffix}"]) & (df2[f"water_temperature_{suffix}"] >= 20.0)
                     df_hot_wetsuit = df2[hot_wetsuit_filter]
@@ -1985,14 +2342,8 @@ def process_temperatures(df, distance_categories):
                             air_temperature = row.air_temperature_w if suffix == "w" else row.air_temperature_m
                             msg = f"{row.event_id} ({suffix}): {water_temperature} °C (air at {air_temperature} °C) for {row.event_year} {row.event_venue} - {row.event_title}\n\t{row.event_listing}"
                             print(f"\t{msg}")
-                            found = False
-                            for condition_log in conditions_logs:
-                                if condition_log["event_id"] == row.event_id:
-                                    if ((condition_log["prog_name"] == "Elite Men") and (suffix == "m")) or ((condition_log["prog_name"] == "Elite Women") and (suffix == "w")):
-                                        for issue in condition_log["issues"]:
-                                            if "wetsuit" in issue:
-                                                found = True
-                                                continue
+                            event_issues = df_conditions_logs.loc[df_conditions_logs["event_id"] == row.event_id, "issues"]
+                            found = any("wetsuit" in issue for issues in event_issues for issue in issues)
                             if not found:
                                 raise Exception(f"Hot wetsuit: not found in {conditions_logs_path.absolute()}:\n{msg}")
 
@@ -2003,174 +2354,12 @@ def process_temperatures(df, distance_categories):
                             air_temperature = row.air_temperature_w if suffix == "w" else row.air_temperature_m
                             msg = f"{row.event_id} ({suffix}): {water_temperature} °C (air at {air_temperature} °C) for {row.event_year} {row.event_venue} - {row.event_title}\n\t{row.event_listing}"
                             print(f"\t{msg}")
-                            found = False
-                            for condition_log in conditions_logs:
-                                if condition_log["event_id"] == row.event_id:
-                                    if ((condition_log["prog_name"] == "Elite Men") and (suffix == "m")) or ((condition_log["prog_name"] == "Elite Women") and (suffix == "w")):
-                                        for issue in condition_log["issues"]:
-                                            if "wetsuit" in issue:
-                                                found = True
-                                                continue
+                            event_issues = df_conditions_logs.loc[df_conditions_logs["event_id"] == row.event_id, "issues"]
+                            found = any("wetsuit" in issue for issues in event_issues for issue in issues)
                             if not found:
                                 raise Exception(f"Cold swimsuit: not found in {conditions_logs_path.absolute()}:\n{msg}")
 
-                    df2 = df2[~hot_wetsuit_filter]
-                    df2 = df2[~cold_swimsuit_filter]
-
-                    colours = ["navy" if t >= 20 else "dodgerblue" for t in df2[f"{measure}_temperature_{suffix}"]]
-                    kwargs = dict(
-                        color=colours,
-                        edgecolor='black',
-                        s=100,
-                        marker="x"
-                    )
-
-                    # reg_colour = "deepskyblue"
-                    # df_no_wetsuit = df2[df2[f"{measure}_temperature_{suffix}"] >= 20.0]
-                    # df_wetsuit = df2[df2[f"{measure}_temperature_{suffix}"] < 20.0]
-                    # sns.regplot(
-                    #     x=df_no_wetsuit[f"{measure}_temperature_{suffix}"],
-                    #     y=df_no_wetsuit[f"{sport}_mean_{suffix}"],
-                    #     scatter=False,
-                    #     line_kws={"color": reg_colour, "linewidth": 1, "alpha": 0.1, "linestyle": "-"},
-                    #     ax=axes[i_distance_category, i_suffix],
-                    #     order=2
-                    # )
-                    # sns.regplot(
-                    #     x=df_wetsuit[f"{measure}_temperature_{suffix}"],
-                    #     y=df_wetsuit[f"{sport}_mean_{suffix}"],
-                    #     scatter=False,
-                    #     line_kws={"color": reg_colour, "linewidth": 1, "alpha": 0.1, "linestyle": "-"},
-                    #     ax=axes[i_distance_category, i_suffix],
-                    #     order=2
-                    # )
-
-                elif sport == "run":
-                    # drop event_id 109660 because too long run! (top women at 3:57/km!)
-                    df2 = df2[df2["event_id"] != 109660]
-
-                    kwargs = dict(
-                        cmap='autumn_r',
-                        c=df2[f"{measure}_temperature_{suffix}"],
-                        edgecolor='black',
-                        s=100,
-                        marker="P"
-                    )
-
-                    reg_colour = "deepskyblue"
-                    sns.regplot(
-                        x=df2[f"{measure}_temperature_{suffix}"],
-                        y=df2[f"{sport}_mean_{suffix}"],
-                        scatter=False,
-                        line_kws={"color": reg_colour, "linewidth": 1, "alpha": 0.2, "linestyle": "-"},
-                        ax=axes[i_distance_category, i_suffix],
-                        order=2
-                    )
-
-                    coefficients = np.polyfit(
-                        df2[f"{measure}_temperature_{suffix}"],
-                        df2[f"{sport}_mean_{suffix}"],
-                        2
-                    )
-                    axes[i_distance_category, i_suffix].plot(
-                        df2[f"{measure}_temperature_{suffix}"],
-                        # np.poly1d(p)(df2[f"{measure}_temperature_{suffix}"]),
-                        np.polyval(coefficients, df2[f"{measure}_temperature_{suffix}"]),
-                        color='dodgerblue',
-                        linewidth=2,
-                        linestyle='-',
-                        alpha=0.6,
-                        label='Best fit (2nd degree)'
-                    )
-
-                    a, b, c = coefficients
-                    optimal_t = -b / (2 * a)
-                    axes[i_distance_category, i_suffix].axvline(
-                        optimal_t,
-                        linestyle="-.",
-                        linewidth=2,
-                        alpha=0.6,
-                        color="dodgerblue",
-                        label=f"Optimal: {optimal_t:.1f}°C"
-                    )
-                else:
-                    raise NotImplementedError(f"Sport {sport} not implemented")
-
-                axes[i_distance_category, i_suffix].scatter(
-                    df2[f"{measure}_temperature_{suffix}"],
-                    df2[f"{sport}_mean_{suffix}"],
-                    **kwargs
-                )
-
-                # set title
-                axes[i_distance_category, i_suffix].set_title(
-                    f"\n{distance_category.replace('standard', 'olympic').upper()} - {'WOMEN' if suffix == 'w' else 'MEN'}\n({len(df2)} events)",
-                    fontsize=20
-                )
-
-                axes[i_distance_category, i_suffix].grid()
-
-                locs = axes[i_distance_category, i_suffix].get_yticks()
-
-                def format_label(_x):
-                    splits = seconds_to_h_min_sec(_x, use_hours=True, sport=sport, use_units=True).split(" (")
-                    return f"{splits[0]}\n({splits[1]}"
-
-                labels = map(format_label, locs)
-                axes[i_distance_category, i_suffix].set_yticks(locs)
-                axes[i_distance_category, i_suffix].set_yticklabels(labels)
-
-                # set tick font size
-                axes[i_distance_category, i_suffix].yaxis.set_tick_params(labelsize=13)
-                axes[i_distance_category, i_suffix].set_ylabel(f"{sport} time".upper(), fontsize=15)
-
-                axes[i_distance_category, i_suffix].set_xlabel(f"{measure} temperature (°C)".upper(), fontsize=15)
-                axes[i_distance_category, i_suffix].xaxis.set_tick_params(labelsize=13)
-
-                # set x min max
-                axes[i_distance_category, i_suffix].set_xlim(measure_min - 1, measure_max + 1)
-
-                if sport == "swim":
-                    axes[i_distance_category, i_suffix].axvline(
-                        20,
-                        linestyle="-.",
-                        linewidth=2,
-                        color="black",
-                        label="20°C"
-                    )
-
-                    # get current x and y min/max of the ax
-                    x_min = axes[i_distance_category, i_suffix].get_xlim()[0]
-                    x_max = axes[i_distance_category, i_suffix].get_xlim()[1]
-                    y_min = axes[i_distance_category, i_suffix].get_ylim()[0]
-                    y_max = axes[i_distance_category, i_suffix].get_ylim()[1]
-
-                    # Create the rectangle
-                    rect = patches.Rectangle(
-                        (x_min, y_min),
-                        20 - x_min,
-                        y_max - y_min,
-                        facecolor='silver',
-                        alpha=0.2,
-                        label="wetsuit"
-                    )
-
-                    # Add the rectangle to the plot
-                    axes[i_distance_category, i_suffix].add_patch(rect)
-
-                    rect = patches.Rectangle(
-                        (20, y_min),
-                        x_max - 20,
-                        y_max - y_min,
-                        facecolor='lightskyblue',
-                        alpha=0.2,
-                        label="no wetsuit"
-                    )
-
-                    # Add the rectangle to the plot
-                    axes[i_distance_category, i_suffix].add_patch(rect)
-
-                axes[i_distance_category, i_suffix].legend(fontsize=15)
+        plot_temperatures_vs_times(df, distance_categories, measure, sport)
 
         # create markdown table
         df = df.dropna(subset=[f"{measure}_temperature_w", f"{measure}_temperature_m"])
@@ -2217,32 +2406,15 @@ def process_temperatures(df, distance_categories):
             colalign=["center"] * len(df_table.columns)
         ))
 
-        fig.suptitle(
-            f"{measure.upper()} TEMPERATURES AND {sport.upper()} TIMES"
-            f"\n(from {measure_min:.1f} to {measure_max:.1f}°C)",
-            fontsize=20
-        )
 
-        fig.tight_layout()
+def plot_sport_proportion(df, distance_categories):
+    figure_inputs = get_fingerprint(locals())
+    figure = CachedFigure(res_dir / "sport_proportion.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
 
-        add_watermark(fig)
-        plt.savefig(str(res_dir / f"temperatures_{measure}.png"), dpi=300)
-        plt.show()
-
-
-def process_sport_proportion(df, distance_categories):
     fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(16, 16))
 
-    for i_suffix, suffix in enumerate(["w", "m"]):
-        df[f"total_mean_{suffix}"] = df[f"swim_mean_{suffix}"] + df[f"t1_mean_{suffix}"] + df[f"bike_mean_{suffix}"] + \
-                                     df[
-                                         f"t2_mean_{suffix}"] + df[f"run_mean_{suffix}"]
-        df[f"swim_prop_{suffix}"] = df[f"swim_mean_{suffix}"] / df[f"total_mean_{suffix}"]
-        df[f"t1_prop_{suffix}"] = df[f"t1_mean_{suffix}"] / df[f"total_mean_{suffix}"]
-        df[f"bike_prop_{suffix}"] = df[f"bike_mean_{suffix}"] / df[f"total_mean_{suffix}"]
-        df[f"t2_prop_{suffix}"] = df[f"t2_mean_{suffix}"] / df[f"total_mean_{suffix}"]
-        df[f"run_prop_{suffix}"] = df[f"run_mean_{suffix}"] / df[f"total_mean_{suffix}"]
-
     rows_names = []
     for i_distance_category, distance_category in enumerate(distance_categories):
         for i_suffix, suffix in enumerate(["w", "m"]):
@@ -2256,11 +2428,6 @@ def process_sport_proportion(df, distance_categories):
                 for sport in pie_sports
             ]
 
-            t1_mean = df[f"t1_mean_{suffix}"][df['prog_distance_category'] == distance_category].mean()
-            t2_mean = df[f"t2_mean_{suffix}"][df['prog_distance_category'] == distance_category].mean()
-            print(
-                f"{distance_category} {suffix}: {t1_mean = :.3f} s, {t2_mean = :.3f} s  - should be distance independent")
-
             axes[i_suffix, i_distance_category].pie(
                 means,
                 labels=[
@@ -2317,9 +2484,30 @@ def process_sport_proportion(df, distance_categories):
 
     plt.tight_layout()
     add_watermark(fig)
-    plt.savefig(str(res_dir / "sport_proportion.png"), dpi=300)
+    figure.save()
     plt.show()
 
+
+def process_sport_proportion(df, distance_categories):
+    for i_suffix, suffix in enumerate(["w", "m"]):
+        df[f"total_mean_{suffix}"] = df[f"swim_mean_{suffix}"] + df[f"t1_mean_{suffix}"] + df[f"bike_mean_{suffix}"] + \
+                                     df[
+                                         f"t2_mean_{suffix}"] + df[f"run_mean_{suffix}"]
+        df[f"swim_prop_{suffix}"] = df[f"swim_mean_{suffix}"] / df[f"total_mean_{suffix}"]
+        df[f"t1_prop_{suffix}"] = df[f"t1_mean_{suffix}"] / df[f"total_mean_{suffix}"]
+        df[f"bike_prop_{suffix}"] = df[f"bike_mean_{suffix}"] / df[f"total_mean_{suffix}"]
+        df[f"t2_prop_{suffix}"] = df[f"t2_mean_{suffix}"] / df[f"total_mean_{suffix}"]
+        df[f"run_prop_{suffix}"] = df[f"run_mean_{suffix}"] / df[f"total_mean_{suffix}"]
+
+    for distance_category in distance_categories:
+        for suffix in ["w", "m"]:
+            t1_mean = df[f"t1_mean_{suffix}"][df['prog_distance_category'] == distance_category].mean()
+            t2_mean = df[f"t2_mean_{suffix}"][df['prog_distance_category'] == distance_category].mean()
+            print(
+                f"{distance_category} {suffix}: {t1_mean = :.3f} s, {t2_mean = :.3f} s  - should be distance independent")
+
+    plot_sport_proportion(df, distance_categories)
+
     df["t1+t2_mean_m"] = df["t1_mean_m"] + df["t2_mean_m"]
     df["t1+t2_mean_w"] = df["t1_mean_w"] + df["t2_mean_w"]
     for t_what in ["t1", "t2", "t1+t2"]:
@@ -2366,8 +2554,7 @@ def process_sport_proportion(df, distance_categories):
 
 
 def process_swim_gaps(df, distance_categories):
-    fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(16, 16))
-
+    figure_inputs = get_fingerprint(locals())
     df = df[df["event_category"] != "games"]
     # df = df[df["event_category"] != "world-cup"]
 
@@ -2375,11 +2562,37 @@ def process_swim_gaps(df, distance_categories):
         df[f'swim_gap_{suffix}'] = df[f'swim_mean_{suffix}_last'] - df[f'swim_mean_{suffix}']
 
     gap_diffs = []
-    for i_distance_category, distance_category in enumerate(distance_categories):
-        for i_suffix, suffix in enumerate(["w", "m"]):
+    swim_gaps = {}
+    for distance_category in distance_categories:
+        for suffix in ["w", "m"]:
             df_ = df[(df[f'wetsuit_{suffix}'].notna()) & (df['prog_distance_category'] == distance_category)]
             wet = df_[df_[f'wetsuit_{suffix}']][f"swim_gap_{suffix}"]
             no_wet = df_[~df_[f'wetsuit_{suffix}'].astype(bool)][f"swim_gap_{suffix}"]
+            wet_mean = wet.mean()
+            wet_std = wet.std()
+            no_wet_mean = no_wet.mean()
+            no_wet_std = no_wet.std()
+
+            gap_diff = wet_mean - no_wet_mean
+            gap_diffs.append(gap_diff)
+            swim_gaps[(distance_category, suffix)] = (wet, no_wet)
+
+            print(f"{distance_category} ({suffix.upper()}) ({len(df_)})")
+            print(f"\twet_mean    = {wet_mean:.0f} ±{wet_std:.0f} ({len(wet):,})")
+            print(f"\tno_wet_mean = {no_wet_mean:.0f} ±{no_wet_std:.0f} ({len(no_wet):,})")
+            improve_percent = (no_wet_mean - wet_mean) / wet_mean
+            print(f"\timprove_percent = {improve_percent :.1%}")
+            print()
+
+    figure = CachedFigure(res_dir / "swim_gaps.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
+    fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(16, 16))
+
+    for i_distance_category, distance_category in enumerate(distance_categories):
+        for i_suffix, suffix in enumerate(["w", "m"]):
+            wet, no_wet = swim_gaps[(distance_category, suffix)]
             colours = {
                 "w": ("navy", "violet"),
                 "m": ("navy", "cyan"),
@@ -2409,7 +2622,6 @@ def process_swim_gaps(df, distance_categories):
             no_wet_std = no_wet.std()
 
             gap_diff = wet_mean - no_wet_mean
-            gap_diffs.append(gap_diff)
 
             for i_, (mean, std, colour) in enumerate([(wet_mean, wet_std, 'r'), (no_wet_mean, no_wet_std, 'b')]):
                 axes[i_suffix, i_distance_category].axvline(
@@ -2421,13 +2633,6 @@ def process_swim_gaps(df, distance_categories):
                     label=f" {mean:.1f} ± {std:.0f} s"
                 )
 
-            print(f"{distance_category} ({suffix.upper()}) ({len(df_)})")
-            print(f"\twet_mean    = {wet_mean:.0f} ±{wet_std:.0f} ({len(wet):,})")
-            print(f"\tno_wet_mean = {no_wet_mean:.0f} ±{no_wet_std:.0f} ({len(no_wet):,})")
-            improve_percent = (no_wet_mean - wet_mean) / wet_mean
-            print(f"\timprove_percent = {improve_percent :.1%}")
-            print()
-
             # print rows with larger gap_diff
             # df_[["event_title", f"wetsuit_{suffix}", f"swim_gap_{suffix}"]][df_[f"swim_gap_{suffix}"] > 30]
 
@@ -2473,7 +2678,7 @@ def process_swim_gaps(df, distance_categories):
 
     plt.tight_layout()
     add_watermark(fig)
-    plt.savefig(str(res_dir / "swim_gaps.png"), dpi=300)
+    figure.save()
     # plt.savefig(str(res_dir / "swim_gaps-wcs.png"), dpi=300)
     # plt.savefig(str(res_dir / "swim_gaps_20-24-wcs.png"), dpi=300)
     # plt.savefig(str(res_dir / "swim_gaps_20-24.png"), dpi=300)
@@ -2514,6 +2719,7 @@ def process_event_country(df):
 
 
 def process_event_dates(df):
+    figure_inputs = get_fingerprint(locals(), [json_load(data_dir / f"athlete_season_durations_{suffix}.json") for suffix in ["w", "m"]])
 
     durations_all = {}
 
@@ -2569,6 +2775,10 @@ def process_event_dates(df):
 
     # plot durations
 
+    figure = CachedFigure(res_dir / "season_duration.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
     fig, ax = plt.subplots(figsize=(16, 16))
     colours = {
         "wcs": "gold",
@@ -2677,7 +2887,7 @@ def process_event_dates(df):
 
     plt.tight_layout()
     add_watermark(fig)
-    plt.savefig(str(res_dir / "season_duration.png"), dpi=300)
+    figure.save()
 
     plt.show()
 
@@ -2690,6 +2900,7 @@ def process_wetsuit_from_repeated_events(
         min_wet_gain_percent,
         max_wet_gain_percent,
 ):
+    figure_inputs = get_fingerprint(locals())
     # remove outliers?
     outliers = df[df["swim_diff_percent"] >= swim_diff_percent_max]
     print(f"{len(outliers)} swim outliers:")
@@ -2821,16 +3032,6 @@ def process_wetsuit_from_repeated_events(
         print(f'\t\t{df_wet_gain[df_wet_gain["suffix"] == suffix]["wet_gain_percent"].mean():.2f} mean')
         print(f'\t\t{df_wet_gain[df_wet_gain["suffix"] == suffix]["wet_gain_percent"].median():.2f} median')
 
-    fig, ax = plt.subplots(figsize=(16, 16))
-
-    data_min = min(df_wet_gain["wet_gain_percent"])
-    data_max = max(df_wet_gain["wet_gain_percent"])
-    bins = np.arange(int(data_min) - 1, int(data_max) + 1, 1)
-    kwargs_hist = {
-        "density": True,
-        "bins": bins,
-    }
-
     print("w vs m:")
     mean_all = df_wet_gain["wet_gain_percent"].mean()
     median_all = df_wet_gain["wet_gain_percent"].median()
@@ -2850,6 +3051,20 @@ def process_wetsuit_from_repeated_events(
     print(f'\t- Men only   : `mean = {mean_m:.1f}%`, `median = {median_m:.1f}%`. (`std = {std_m:.1f}`)')
     print(f'- **Women vs Men: `{mean_w - mean_m:.1f}%` (with means) or `{median_w - median_m:.1f}%` (with medians)**.')
 
+    figure = CachedFigure(res_dir / "wetsuit_in_swim_year_to_year.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+
+    fig, ax = plt.subplots(figsize=(16, 16))
+
+    data_min = min(df_wet_gain["wet_gain_percent"])
+    data_max = max(df_wet_gain["wet_gain_percent"])
+    bins = np.arange(int(data_min) - 1, int(data_max) + 1, 1)
+    kwargs_hist = {
+        "density": True,
+        "bins": bins,
+    }
+
     ax.hist(
         df_wet_gain["wet_gain_percent"],
         label=r"all  : [: = median = ${:.1f}$] [-- = mean = ${:.1f}$]".format(median_all, mean_all),
@@ -2925,7 +3140,7 @@ def process_wetsuit_from_repeated_events(
     )
     plt.tight_layout()
     add_watermark(fig, y=0.92, x=0.12)
-    plt.savefig(str(res_dir / "wetsuit_in_swim_year_to_year.png"), dpi=300)
+    figure.save()
     plt.show()
 
 
@@ -2964,28 +3179,43 @@ def main():
     wetsuit_benefit_from_recurring_events=events_config["wetsuit_benefit_from_recurring_events"]
     swim_diff_percent_max = events_config["cleaning"]["swim_diff_percent_max"]
     sport_outliers = events_config["cleaning"]["sport_outliers"]
+    analyses_config = events_config["analyses"]
     ###
 
     df = get_events_df(events_config=events_config)
 
+    # `--profile` or `TRI_STATS_PROFILE=1`: one cProfile per analysis in `ignored/profiles/` and a summary (runs serially, renders all figures)
+    profiler = AnalysisProfiler()
+
     # df = df[df["event_category"] != "world-cup"]
     # df = df[df["prog_distance_category"] != "sprint"]
     # df = df[df["event_venue"].isin(["Yokohama", "Edmonton", "Cagliari", "Stockholm"])]
 
-    process_sports(df.copy(), distance_categories=distance_categories, sports=sports, sport_outliers=sport_outliers)
-    process_results_wetsuit(df.copy(), swim_diff_percent_max=swim_diff_percent_max, distance_categories=distance_categories, sport_outliers=sport_outliers)
-    process_wetsuit_from_repeated_events(df.copy(), swim_diff_percent_max=swim_diff_percent_max, distance_categories=distance_categories, sport_outliers=sport_outliers, **wetsuit_benefit_from_recurring_events)
-    process_results_w_vs_m(df.copy(), swim_diff_percent_max=swim_diff_percent_max, distance_categories=distance_categories, sports=sports)
-    process_results_repeated_events(df.copy(), distance_categories=distance_categories, sports=sports, sport_outliers=sport_outliers, n_repetitions_min=n_repetitions_min)
-    process_scenarios(df.copy(), distance_categories=distance_categories)
-    process_sprint_finish(df.copy(), distance_categories=distance_categories)
-    process_ages(df.copy())
-    process_sport_proportion(df.copy(), distance_categories=distance_categories)
-    process_swim_gaps(df.copy(), distance_categories=distance_categories)
-    process_event_country(df.copy())
-    process_temperatures(df.copy(), distance_categories=distance_categories)
-    # process_event_dates(df.copy())  # make sure to reduce the min-participants: n_results_min
-    process_level(df.copy())
+    analyses = [
+        (process_sports, dict(distance_categories=distance_categories, sports=sports, sport_outliers=sport_outliers)),
+        (process_results_wetsuit, dict(swim_diff_percent_max=swim_diff_percent_max, distance_categories=distance_categories, sport_outliers=sport_outliers)),
+        (process_wetsuit_from_repeated_events, dict(swim_diff_percent_max=swim_diff_percent_max, distance_categories=distance_categories, sport_outliers=sport_outliers, **wetsuit_benefit_from_recurring_events)),
+        (process_results_w_vs_m, dict(swim_diff_percent_max=swim_diff_percent_max, distance_categories=distance_categories, sports=sports)),
+        (process_results_repeated_events, dict(distance_categories=distance_categories, sports=sports, sport_outliers=sport_outliers, n_repetitions_min=n_repetitions_min)),
+        (process_scenarios, dict(distance_categories=distance_categories)),
+        (process_sprint_finish, dict(distance_categories=distance_categories)),
+        (process_ages, dict()),
+        (process_sport_proportion, dict(distance_categories=distance_categories)),
+        (process_swim_gaps, dict(distance_categories=distance_categories)),
+        (process_event_country, dict()),
+        (process_temperatures, dict(distance_categories=distance_categories)),
+        # (process_event_dates, dict()),  # make sure to reduce the min-participants: n_results_min
+        (process_level, dict()),
+    ]
+    run_analyses(
+        df,
+        analyses=analyses,
+        use_processes=analyses_config["use_processes"],
+        max_workers=analyses_config["max_workers"],
+        profiler=profiler
+    )
+
+    profiler.save_summary()
 
 
 if __name__ == '__main__':
@@ -8,7 +8,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.ticker import PercentFormatter
 
-from scripts.utils import load_config, ignored_dir, country_emojis, res_dir, add_watermark
+from scripts.utils import load_config, country_emojis, res_dir, add_watermark
 from scripts.utils_events import get_events_df
 
 config = load_config()
@@ -16,17 +16,12 @@ events_config = config["events"]
 t1_config = events_config["t1_with_wetsuit"]
 
 
-def get_df(use_cache: bool = False):
-    tmp_results_file_path = ignored_dir / "tmp_results.csv"
-    if use_cache and tmp_results_file_path.exists():
-        df = pd.read_csv(str(tmp_results_file_path))
-    else:
-        # set larger window for mean
-        events_config["mean_computation"]["i_first"] = t1_config["i_first"]
-        events_config["mean_computation"]["i_last"] = t1_config["i_last"]
+def get_df(use_cache: bool = True):
+    # set larger window for mean. part of the memoization key of `get_events_df()`
+    events_config["mean_computation"]["i_first"] = t1_config["i_first"]
+    events_config["mean_computation"]["i_last"] = t1_config["i_last"]
 
-        df = get_events_df(events_config=events_config)
-        df.to_csv(str(tmp_results_file_path), index=False)
+    df = get_events_df(events_config=events_config, use_memo=use_cache)
 
     # df = df[df["event_category"] == "world-cup"]
     # df = df[df["event_category"] == "wcs"]
@@ -538,7 +533,7 @@ def method_wm(df):
 
 def main():
     df = get_df(
-        use_cache=False
+        use_cache=True
     )
 
     method_events(df.copy())
@@ -1,7 +1,13 @@
 import json
+import os
 from pathlib import Path
 import yaml
 
+try:
+    import orjson  # pip install orjson. optional: several times faster than `json` on the event files
+except ImportError:
+    orjson = None
+
 
 res_dir = Path(__file__).parent.parent / "res"
 res_dir.mkdir(exist_ok=True)
@@ -33,19 +39,96 @@ def add_watermark(fig, x=0.92, y=0.97):
     )
 
 
+def json_dumps(
+        data,
+        pretty: bool = True
+) -> bytes:
+    """
+    `pretty`: stdlib json with indent=4, the stable format of the files that are read or edited by hand.
+    otherwise compact bytes, with orjson if installed.
+    """
+    if pretty:
+        return json.dumps(data, indent=4).encode()
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def json_loads(
+        b: bytes
+):
+    if orjson is not None:
+        try:
+            return orjson.loads(b)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN written by the stdlib json
+    return json.loads(b)
+
+
 def json_dump(
         data,
-        p: Path
+        p: Path,
+        atomic: bool = False,
+        pretty: bool = True
 ) -> None:
-    with p.open("w") as f:
-        json.dump(data, f, indent=4)
+    """
+    `atomic`: write to a temporary file first, so that an interrupted run never leaves a truncated file.
+    `pretty`: False for the bulk caches, e.g. the event files.
+    """
+    tmp_p = p.with_name(p.name + ".tmp") if atomic else p
+    tmp_p.write_bytes(json_dumps(data, pretty=pretty))
+    if atomic:
+        os.replace(tmp_p, p)
 
 
 def json_load(
         p: Path
 ):
+    return json_loads(p.read_bytes())
+
+
+def jsonl_append(
+        record,
+        p: Path,
+        fsync: bool = False
+) -> None:
+    """append one record as a json line, see `jsonl_extend()`."""
+    jsonl_extend([record], p=p, fsync=fsync)
+
+
+def jsonl_extend(
+        records: list,
+        p: Path,
+        fsync: bool = False
+) -> None:
+    """
+    append records as json lines, in one write.
+    the lines survive an interrupted run (killed process). `fsync`: also a crash of the machine, at a cost per call.
+    """
+    if not records:
+        return
+    with p.open("a") as f:
+        f.write("".join(json.dumps(record) + "\n" for record in records))
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def jsonl_load(
+        p: Path
+) -> list:
+    if not p.exists():
+        return []
+    records = []
     with p.open("r") as f:
-        return json.load(f)
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"ignoring truncated line in {p}: {line}")
+    return records
 
 
 def yaml_load(file_path: Path):
@@ -0,0 +1,291 @@
+"""
+single SQLite file caching the responses of the triathlon.org API
+    key = url suffix + params, value = the `data` field of the response (as json)
+    `None` values (the API has no data, or the request failed) can be given a shorter max age
+
+replaces the ad-hoc json/csv files that were saved next to each caller:
+    cache/events/events_query.json
+    cache/prog_info/{event_id}_{prog_id}.json
+    scripts/data/athletes/{athlete_id}.json
+    cache/athletes/{athlete_id}.json
+    cache/athletes_results/{athlete_id}.json
+    cache/rankings/rankings_{ranking_id}.csv
+
+run this file to import the legacy json files and to print what the cache contains.
+
+`ReductionStore` keeps the rows derived from the `cache/events/*.json` files, see `get_events_results()`.
+"""
+
+import json
+import os
+from pathlib import Path
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlencode
+
+from utils import cache_dir, json_load
+
+
+class ResponseCache:
+    """thread- and process-safe: one connection per thread, WAL journal so that readers do not block the writer."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self.counts_lock = threading.Lock()
+        self.n_hits = 0
+        self.n_misses = 0
+        with self._connection() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url_suffix TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    data TEXT,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS responses_url_suffix ON responses (url_suffix)")
+            con.execute("CREATE INDEX IF NOT EXISTS responses_fetched_at ON responses (fetched_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        # a connection inherited from a forked parent must not be used
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(self.db_path, timeout=60)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+            self._local.pid = os.getpid()
+        return con
+
+    @staticmethod
+    def encode_params(params) -> str:
+        """canonical query string: the same for dicts with the keys in another order."""
+        if not params:
+            return ""
+        if isinstance(params, dict):
+            return urlencode(sorted(params.items()))
+        return str(params)
+
+    @staticmethod
+    def make_key(url_suffix: str, params="") -> str:
+        params = ResponseCache.encode_params(params)
+        if not params:
+            return url_suffix
+        return f"{url_suffix}{'&' if '?' in url_suffix else '?'}{params}"
+
+    @staticmethod
+    def _min_fetched_at(max_age_s: Optional[float], max_age_none_s: Optional[float] = None) -> tuple[float, float]:
+        """(min fetch time of the values, min fetch time of the `None` values)."""
+        now = time.time()
+        min_fetched_at = 0.0 if max_age_s is None else now - max_age_s
+        if max_age_none_s is None:
+            return min_fetched_at, min_fetched_at
+        return min_fetched_at, max(min_fetched_at, now - max_age_none_s)
+
+    # `data` is the json of the value: 'null' for `None`
+    fresh_condition = "fetched_at >= CASE WHEN data = 'null' THEN ? ELSE ? END"
+
+    def get(self, key: str, max_age_s: float = None, max_age_none_s: float = None) -> tuple[bool, object]:
+        """
+        returns (hit, data). a cached `None` is a hit: the API has no data for this key, or the request failed.
+        `max_age_none_s`: max age of the cached `None` values, if shorter than `max_age_s`.
+        """
+        min_fetched_at, min_fetched_at_none = self._min_fetched_at(max_age_s, max_age_none_s)
+        row = self._connection().execute(
+            f"SELECT data FROM responses WHERE key = ? AND {self.fresh_condition}",
+            (key, min_fetched_at_none, min_fetched_at)
+        ).fetchone()
+        self._count(n_hits=row is not None, n_misses=row is None)
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+
+    def _count(self, n_hits: int, n_misses: int):
+        with self.counts_lock:
+            self.n_hits += n_hits
+            self.n_misses += n_misses
+
+    def counts(self) -> dict:
+        """lookups of this process since start."""
+        with self.counts_lock:
+            return {"cache_hits": self.n_hits, "cache_misses": self.n_misses}
+
+    def get_many(self, keys: list, max_age_s: float = None, max_age_none_s: float = None) -> dict:
+        """returns {key: data} for the keys that are cached."""
+        res = {}
+        keys = list(keys)
+        min_fetched_at, min_fetched_at_none = self._min_fetched_at(max_age_s, max_age_none_s)
+        chunk_size = 500  # stay below SQLITE_MAX_VARIABLE_NUMBER
+        for i in range(0, len(keys), chunk_size):
+            chunk = keys[i: i + chunk_size]
+            rows = self._connection().execute(
+                f"SELECT key, data FROM responses WHERE key IN ({','.join('?' * len(chunk))}) AND {self.fresh_condition}",
+                (*chunk, min_fetched_at_none, min_fetched_at)
+            ).fetchall()
+            res.update({key: json.loads(data) for key, data in rows})
+        self._count(n_hits=len(res), n_misses=len(keys) - len(res))
+        return res
+
+    def contains_many(self, keys: list, max_age_s: float = None, max_age_none_s: float = None) -> set:
+        """returns the subset of `keys` that are cached, without decoding the data."""
+        res = set()
+        keys = list(keys)
+        min_fetched_at, min_fetched_at_none = self._min_fetched_at(max_age_s, max_age_none_s)
+        chunk_size = 500
+        for i in range(0, len(keys), chunk_size):
+            chunk = keys[i: i + chunk_size]
+            rows = self._connection().execute(
+                f"SELECT key FROM responses WHERE key IN ({','.join('?' * len(chunk))}) AND {self.fresh_condition}",
+                (*chunk, min_fetched_at_none, min_fetched_at)
+            ).fetchall()
+            res.update(key for (key,) in rows)
+        self._count(n_hits=len(res), n_misses=len(keys) - len(res))
+        return res
+
+    def put(self, key: str, url_suffix: str, params, data, fetched_at: float = None):
+        self.put_many([(key, url_suffix, params, data)], fetched_at=fetched_at)
+
+    def put_many(self, entries: list, fetched_at: float = None):
+        """
+        `entries`: list of (key, url_suffix, params, data), or (key, url_suffix, params, data, fetched_at).
+        written in one transaction.
+        """
+        if fetched_at is None:
+            fetched_at = time.time()
+        rows = [
+            (key, url_suffix, self.encode_params(params), json.dumps(data), entry_fetched_at[0] if entry_fetched_at else fetched_at)
+            for key, url_suffix, params, data, *entry_fetched_at in entries
+        ]
+        with self._connection() as con:
+            con.executemany(
+                "INSERT OR REPLACE INTO responses (key, url_suffix, params, data, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def invalidate(self, key_prefix: str = "", older_than_s: float = None) -> int:
+        """delete the entries whose key starts with `key_prefix` (all by default), optionally only the stale ones."""
+        max_fetched_at = time.time() - older_than_s if older_than_s is not None else float("inf")
+        with self._connection() as con:
+            cursor = con.execute(
+                "DELETE FROM responses WHERE key >= ? AND key < ? AND fetched_at < ?",
+                (key_prefix, key_prefix + "\uffff", max_fetched_at)
+            )
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        con = self._connection()
+        n_entries, oldest, newest = con.execute(
+            "SELECT COUNT(*), MIN(fetched_at), MAX(fetched_at) FROM responses"
+        ).fetchone()
+        by_resource = con.execute("""
+            SELECT
+                CASE WHEN instr(url_suffix, '/') > 0 THEN substr(url_suffix, 1, instr(url_suffix, '/') - 1)
+                     WHEN instr(url_suffix, '?') > 0 THEN substr(url_suffix, 1, instr(url_suffix, '?') - 1)
+                     ELSE url_suffix END AS resource,
+                COUNT(*)
+            FROM responses GROUP BY resource ORDER BY resource
+        """).fetchall()
+        return {
+            "db_path": str(self.db_path),
+            "size_mb": round(self.db_path.stat().st_size / 1e6, 1),
+            "n_entries": n_entries,
+            "by_resource": dict(by_resource),
+            "oldest": time.strftime("%Y-%m-%d %H:%M", time.localtime(oldest)) if oldest else None,
+            "newest": time.strftime("%Y-%m-%d %H:%M", time.localtime(newest)) if newest else None,
+        }
+
+
+class ReductionStore:
+    """
+    one entry per event: the output of `reduce_event_file()` (pickled, to keep numpy and list values as they are),
+    valid as long as its `key` (hash of the event file, of the config and of the other inputs) does not change.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(self.db_path, timeout=60)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        with self.con:
+            self.con.execute("""
+                CREATE TABLE IF NOT EXISTS reduced_events (
+                    event_id TEXT PRIMARY KEY,
+                    key TEXT NOT NULL,
+                    reduced BLOB NOT NULL,
+                    reduced_at REAL NOT NULL
+                )
+            """)
+
+    def get_many(self, keys: dict) -> dict:
+        """`keys`: {event_id: key}. returns {event_id: reduced} for the entries stored with the same key."""
+        res = {}
+        event_ids = list(keys)
+        chunk_size = 500
+        for i in range(0, len(event_ids), chunk_size):
+            chunk = event_ids[i: i + chunk_size]
+            rows = self.con.execute(
+                f"SELECT event_id, key, reduced FROM reduced_events WHERE event_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            res.update({event_id: pickle.loads(reduced) for event_id, key, reduced in rows if keys[event_id] == key})
+        return res
+
+    def put_many(self, entries: list):
+        """`entries`: list of (event_id, key, reduced). written in one transaction."""
+        reduced_at = time.time()
+        with self.con:
+            self.con.executemany(
+                "INSERT OR REPLACE INTO reduced_events (event_id, key, reduced, reduced_at) VALUES (?, ?, ?, ?)",
+                [(event_id, key, pickle.dumps(reduced), reduced_at) for event_id, key, reduced in entries]
+            )
+
+    def clear(self):
+        with self.con:
+            self.con.execute("DELETE FROM reduced_events")
+
+
+def import_legacy_caches(cache: ResponseCache):
+    """import the json files of the former per-caller caches. the csv rankings cannot be converted back."""
+    legacy_files = []
+
+    events_query_file = cache_dir / "events" / "events_query.json"
+    if events_query_file.exists():
+        for url_suffix, data in json_load(events_query_file).items():
+            legacy_files.append((url_suffix, data))
+
+    for p in (cache_dir / "prog_info").glob("*.json"):
+        event_id, prog_id = p.stem.split("_")
+        legacy_files.append((f"events/{event_id}/programs/{prog_id}", p))
+
+    for athletes_dir in [Path(__file__).parent / "data" / "athletes", cache_dir / "athletes"]:
+        for p in athletes_dir.glob("*.json"):
+            legacy_files.append((f"athletes/{p.stem}", p))
+
+    for p in (cache_dir / "athletes_results").glob("*.json"):
+        legacy_files.append((f"athletes/{p.stem}/results?per_page=1000", p))
+
+    entries = []
+    for url_suffix, data in legacy_files:
+        if isinstance(data, Path):
+            fetched_at = data.stat().st_mtime
+            data = json_load(data)
+        else:
+            fetched_at = events_query_file.stat().st_mtime
+        entries.append((url_suffix, url_suffix, "", data, fetched_at))
+
+    # the mtime of the legacy files is kept as fetch time, for the staleness checks
+    cache.put_many(entries)
+    print(f"imported {len(entries)} legacy cache files into {cache.db_path}")
+
+
+if __name__ == '__main__':
+    from utils_itu import response_cache
+
+    import_legacy_caches(response_cache)
+    print(json.dumps(response_cache.stats(), indent=4))
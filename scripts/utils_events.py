@@ -2,39 +2,113 @@
 
 """
 
+import asyncio
+import atexit
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+import hashlib
+import json
+import os
+from pathlib import Path
+import time
 from typing import Optional
 
 import cv2
 from matplotlib import pyplot as plt
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import re
 
-import requests
 from PIL import Image
 from io import BytesIO
 
-from utils import json_dump, data_dir, cache_dir, ignored_dir, json_load, load_config
-from utils_itu import get_request, get_athlete_info
+from utils import json_dump, data_dir, cache_dir, ignored_dir, json_load, load_config, jsonl_append, jsonl_extend, jsonl_load
+from utils_itu import get_request, get_athlete_info, async_get_request, run_async, rate_limiter, \
+    create_session, api_config, response_cache
+from utils_cache import ReductionStore
+from utils_instrumentation import RunReport, get_local_api_counts, add_worker_api_counts
+from utils_ragged import RaggedArray, get_all_columns, to_ragged_columns
 
 tmp_results_file_path = ignored_dir / "tmp_results.csv"
 log_file_path = ignored_dir / "log.json"
-conditions_logs_path = ignored_dir / "conditions_inconsistencies.json"
+conditions_logs_path = ignored_dir / "conditions_inconsistencies.jsonl"
 conditions_logs_path.parent.mkdir(parents=True, exist_ok=True)
 
+# event pictures are not served by the API: no api key, no API rate limit
+images_session = create_session()
+
 # todo: is it the correct way to set the math fonts?
 plt.rcParams["font.family"] = "monospace"  # todo: set in global config
 plt.rcParams['mathtext.default'] = 'rm'
 plt.rcParams['mathtext.fontset'] = 'cm'  # "stix
 
 
+class EventLedger:
+    """
+    loaded / ignored / returned events of a run, with the reasons for ignoring them.
+    kept in memory and written to `log_file_path` once, by `flush()` (at the end of `get_events_df()`, or on exit).
+    """
+    categories = ["loaded", "ignored", "returned"]
+
+    def __init__(self, p: Optional[Path] = log_file_path):
+        self.p = p
+        self.data = {cat: {} for cat in self.categories}
+
+    def clear(self):
+        self.data = {cat: {} for cat in self.categories}
+
+    def add(
+            self,
+            category: str,
+            event_id: int,
+            txt: str = "",
+            event_title: str = "",
+            event_listing: str = ""
+    ):
+        assert category in self.categories, f"{category = } not in {self.categories = }"
+        event_id = str(event_id)  # keys of the json file
+        if event_id in self.data[category]:
+            self.data[category][event_id]["txt"] = self.data[category][event_id]["txt"] + "\n" + txt
+        else:
+            self.data[category][event_id] = {"txt": txt, "event_title": event_title, "event_listing": event_listing}
+
+    def flush(self):
+        if self.p is not None:
+            json_dump(self.data, self.p)
+
+
+event_ledger = EventLedger()
+atexit.register(event_ledger.flush)
+
+
 def clean_up_log_file():
-    json_dump({}, log_file_path)
+    event_ledger.clear()
+    event_ledger.flush()
 
 
 def clean_up_conditions_log_file():
-    json_dump([], conditions_logs_path)
+    conditions_logs_path.write_text("")
+
+
+def append_conditions_log(log_dict: dict):
+    jsonl_append(log_dict, conditions_logs_path)
+
+
+def append_conditions_logs(log_dicts: list):
+    """several records in one write."""
+    jsonl_extend(log_dicts, conditions_logs_path)
+
+
+def load_conditions_logs() -> pd.DataFrame:
+    """one row per program with inconsistent air / water / wetsuit information. `issues` is a list of str."""
+    columns = [
+        "event_id", "event_title", "event_listing", "event_venue", "event_country_noc", "event_date",
+        "prog_id", "prog_name", "issues", "air_temperature", "water_temperature", "wetsuit"
+    ]
+    return pd.DataFrame(jsonl_load(conditions_logs_path), columns=columns)
 
 
 def update_log_file(
@@ -44,25 +118,17 @@ def update_log_file(
         event_title: str = "",
         event_listing: str = ""
 ):
-    if not log_file_path.exists():
-        clean_up_log_file()
-
-    log_data = json_load(log_file_path)
+    event_ledger.add(
+        category=category,
+        event_id=event_id,
+        txt=txt,
+        event_title=event_title,
+        event_listing=event_listing
+    )
 
-    all_cats = ["loaded", "ignored", "returned"]
-    assert category in all_cats, f"{category = } not in {all_cats = }"
-    for cat in all_cats:
-        if cat not in log_data:
-            log_data[cat] = {}
-
-    if event_id in log_data[category]:
-        log_data[category][event_id]["txt"] = log_data[category][event_id]["txt"] + "\n" + txt
-    else:
-        log_data[category][event_id] = {"txt": txt, "event_title": event_title, "event_listing": event_listing}
-    json_dump(log_data, log_file_path)
 
 def print_log_file():
-    log_data = json_load(log_file_path)
+    log_data = event_ledger.data
     loaded_data = log_data['loaded']
     ignored_data = log_data['ignored']
     returned_data = log_data['returned']
@@ -168,21 +234,52 @@ def get_program_info(event_id: int, prog_id: int):
     return res_req
 
 
-def save_images(
+def save_thumbnail(content: bytes, saving_path: str, max_size: tuple = (600, 600)) -> str:
+    """decode and resize one downloaded image. runs in a process pool."""
+    # Open the image from the response content
+    image = Image.open(BytesIO(content))
+
+    # Resize the image while maintaining aspect ratio
+    image.thumbnail(max_size, Image.LANCZOS)
+
+    # Save the resized image
+    image.save(saving_path)
+    return saving_path
+
+
+def download_image(url: str) -> Optional[bytes]:
+    response = images_session.get(url, timeout=(api_config["connect_timeout_s"], api_config["read_timeout_s"]))
+    if response.status_code != 200:
+        print(f"\tFailed to retrieve image. Status code: {response.status_code}")
+        return None
+    return response.content
+
+
+def iter_event_images(
         event_id: int,
         event_title: str = "",
-        per_page: int = 1000
+        per_page: int = 1000,
+        max_workers_io: int = 8,
+        max_workers_cpu: int = None
 ):
+    """
+    yield the paths of the thumbnails of an event as soon as they are on disk, starting with the ones already saved.
+    downloads run in a pool of threads, decoding and resizing in a pool of processes.
+    each image is resized as soon as it is downloaded, while the other downloads go on.
+    """
     images_dir = cache_dir / "images"
-    images_dir.mkdir(parents=True, exist_ok=True)
     saving_dir = images_dir / f"{event_id}"
-
-    if saving_dir.exists():
-        return
     saving_dir.mkdir(parents=True, exist_ok=True)
 
-    suffix = f"events/{event_id}/images?per_page={per_page}"
-    res_req = get_request(url_suffix=suffix)
+    # the listing is saved next to the images, so that an interrupted download can resume without API call
+    # only a successful listing: a failed request (`None`, also in files saved before) is requested again
+    listing_path = images_dir / f"{event_id}.json"
+    res_req = json_load(listing_path) if listing_path.exists() else None
+    if res_req is None:
+        suffix = f"events/{event_id}/images?per_page={per_page}"
+        res_req = get_request(url_suffix=suffix)
+        if res_req is not None:
+            json_dump(res_req, listing_path, pretty=False)
     if res_req is None or len(res_req) == 0:
         print(f"\t!! No images found for event {event_id}: {event_title}")
         return
@@ -192,42 +289,288 @@ def save_images(
     }
     print(f"\tfound {len(urls)} images for event {event_id}: {event_title}")
     assert per_page >= len(urls), f"per_page ({per_page}) must be >= len(urls) ({len(urls)})"
+
+    to_download = {}
     for filename, url in urls.items():
         saving_path = saving_dir / filename
         if saving_path.exists():
-            continue
+            yield saving_path
+        else:
+            to_download[filename] = url
+    n_skipped = len(urls) - len(to_download)
+    if not to_download:
+        return
 
-        # download image
-        try:
-            response = requests.get(
-                url,
-                # headers=headers
-            )
-            if response.status_code == 200:
-                # with saving_path.open('wb') as file:
-                #     file.write(response.content)
+    t_start = time.monotonic()
+    n_saved = 0
+    n_failed = 0
+    n_bytes = 0
 
-                # Open the image from the response content
-                image = Image.open(BytesIO(response.content))
+    io_pool = ThreadPoolExecutor(max_workers=max_workers_io)
+    cpu_pool = ProcessPoolExecutor(max_workers=max_workers_cpu)
+    try:
+        def download_and_thumbnail(filename: str, url: str) -> tuple[int, Optional[str]]:
+            """runs in `io_pool`: the thumbnail is submitted as soon as its download is done."""
+            content = download_image(url)
+            if content is None:
+                return 0, None
+            return len(content), cpu_pool.submit(save_thumbnail, content, str(saving_dir / filename)).result()
+
+        futures = {
+            io_pool.submit(download_and_thumbnail, filename, url): filename
+            for filename, url in to_download.items()
+        }
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                n_bytes_image, saving_path = future.result()
+            except Exception as e:
+                print(e)
+                print(to_download[filename])
+                print(filename)
+                n_failed += 1
+                continue
+            n_bytes += n_bytes_image
+            if saving_path is None:
+                n_failed += 1
+                continue
+            n_saved += 1
+            if n_saved % 50 == 0:
+                print(f"\t\t{n_saved} / {len(to_download)} images saved")
+            yield Path(saving_path)
+    finally:
+        io_pool.shutdown(wait=True, cancel_futures=True)
+        cpu_pool.shutdown(wait=True, cancel_futures=True)
+        duration_s = time.monotonic() - t_start
+        print(
+            f"\timages of event {event_id}: {n_saved} saved, {n_skipped} already on disk, {n_failed} failed. "
+            f"{n_bytes / 1e6:.1f} MB in {duration_s:.1f}s ({n_saved / max(duration_s, 1e-6):.1f} images/s)"
+        )
 
-                # Define the maximum size
-                max_size = (600, 600)  # Example max size, you can change this
 
-                # Resize the image while maintaining aspect ratio
-                image.thumbnail(max_size, Image.LANCZOS)
+def save_images(
+        event_id: int,
+        event_title: str = "",
+        per_page: int = 1000
+) -> list:
+    return list(iter_event_images(event_id=event_id, event_title=event_title, per_page=per_page))
+
+
+# fields of `cache/events/{event_id}.json` read by `reduce_event_file()` and `utils_results`
+# bump the version when adding fields: the projections are then rebuilt from the event files
+event_projection_version = 1
+event_projection_prog_keys = [
+    "prog_name", "prog_gender", "prog_distance_category", "prog_notes",
+    "event_id", "event_title", "event_venue", "event_date", "event_country_noc", "event_listing",
+]
+event_projection_result_keys = [
+    "position", "start_num", "total_time", "splits",
+    "athlete_id", "athlete_first", "athlete_last", "athlete_title", "athlete_noc", "athlete_yob", "dob",
+]
+event_projections_dir = cache_dir / "events_projected"
+event_projections_dir.mkdir(parents=True, exist_ok=True)
+
+
+def project_event_dict(event_dict: dict) -> dict:
+    """`event_dict` without the fields that are never read, e.g. most of the 30 fields of each result."""
+    projection = {}
+    for prog_id, prog_data in event_dict.items():
+        prog_projection = {k: prog_data[k] for k in event_projection_prog_keys if k in prog_data}
+        if "event_categories" in prog_data:
+            prog_projection["event_categories"] = [{"cat_id": c["cat_id"]} for c in prog_data["event_categories"]]
+        if "headers" in prog_data:
+            prog_projection["headers"] = [
+                {k: header[k] for k in ["name", "distance"] if k in header} for header in prog_data["headers"]
+            ] if prog_data["headers"] is not None else None
+        if "results" in prog_data:
+            prog_projection["results"] = [
+                {k: r[k] for k in event_projection_result_keys if k in r} for r in prog_data["results"]
+            ] if prog_data["results"] is not None else None
+        projection[prog_id] = prog_projection
+    return projection
+
+
+def save_event_projection(event_id, event_dict: dict):
+    json_dump(
+        {"version": event_projection_version, "event": project_event_dict(event_dict)},
+        event_projections_dir / f"{event_id}.json",
+        atomic=True,
+        pretty=False
+    )
+
+
+def load_event(event_file: Path) -> dict:
+    """
+    the programs of `cache/events/{event_id}.json`, restricted to the projected fields.
+    read from the projection written at crawl time, built once from the full file if missing or outdated.
+    """
+    projection_file = event_projections_dir / event_file.name
+    if projection_file.exists() and projection_file.stat().st_mtime_ns >= event_file.stat().st_mtime_ns:
+        projection = json_load(projection_file)
+        if projection["version"] == event_projection_version:
+            return projection["event"]
+    event_dict = json_load(event_file)
+    save_event_projection(event_file.stem, event_dict)
+    return project_event_dict(event_dict)
+
+
+def build_program_dict(r: dict, listing: dict, prog_res: dict, results_res: dict) -> tuple[dict, list]:
+    """
+    merge the event listing `r`, the program info and the program results into the dict saved in `cache/events`.
+    returns the dict and the list of required keys that could not be filled.
+    """
+    saving_dict = {
+        "prog_name": listing['prog_name'],
+        "event_title": r["event_title"],
+        "event_id": r["event_id"],
+        "event_venue": r["event_venue"],
+        "event_date": r["event_date"],
+        "event_country_noc": r["event_country_noc"],
+        "event_listing": r["event_listing"],
+    }
 
-                # Save the resized image
-                image.save(str(saving_path))
+    saving_dict["prog_distances"] = prog_res["prog_distances"]
+
+    saving_dict["prog_distance_category"] = prog_res["prog_distance_category"]
+    saving_dict["prog_notes"] = prog_res["prog_notes"]
+
+    if saving_dict["prog_distance_category"] is None or saving_dict["prog_distance_category"] == "":
+        if (prog_res["prog_notes"] is not None) and ("750" in prog_res["prog_notes"]):
+            print("\t\tfallback: 750 -> sprint")
+            saving_dict["prog_distance_category"] = "sprint"
+        elif (prog_res["prog_notes"] is not None) and ("1500" in prog_res["prog_notes"]):
+            print("\t\tfallback: 1500 -> standard")
+            saving_dict["prog_distance_category"] = "standard"
+        elif saving_dict["prog_distances"] and saving_dict["prog_distances"][0]["distance"] == 750:
+            print("\t\tfallback2: 750 -> sprint")
+            saving_dict["prog_distance_category"] = "sprint"
+        elif saving_dict["prog_distances"] and saving_dict["prog_distances"][0]["distance"] == 1500:
+            print("\t\tfallback2: 1500 -> standard")
+            saving_dict["prog_distance_category"] = "standard"
+        else:
+            print("\t\tERROR: cannot detect distance")
+
+    saving_dict["results"] = results_res["results"]
+    saving_dict["prog_gender"] = results_res["prog_gender"]
+    saving_dict["event_categories"] = results_res["event"]["event_categories"]
+    # event_categories = saving_dict["event_categories"]
+    saving_dict["headers"] = results_res["headers"]
+    if not saving_dict["prog_distance_category"]:
+        if saving_dict["results"]:
+            winner_time = saving_dict['results'][0]['total_time']
+            print(f"\t\t\twinner time: {winner_time}")
+            if winner_time[:4] in ["00:4", "00:5", "01:0", "01:1"]:
+                print(f"\t\t\tfallback3: {winner_time} -> sprint")
+                saving_dict["prog_distance_category"] = "sprint"
+            elif winner_time[:4] in ["01:3", "01:4", "01:5", "02:0", "02:1"]:
+                print(f"\t\t\tfallback3: {winner_time} -> standard")
+                saving_dict["prog_distance_category"] = "standard"
+
+    required_keys = [
+        "headers",
+        "results",
+        "prog_gender",
+        "prog_distance_category",
+        # "prog_distances"
+    ]
+    missing_keys = [key for key in required_keys if not saving_dict.get(key)]
+    return saving_dict, missing_keys
+
+
+def crawl_event(r: dict, program_names: list) -> tuple[dict, Optional[str]]:
+    """
+    fetch the program tree of one event: listings, then program info and results of each program.
+    returns the programs to save (by prog_id) and the reason to ignore the event, if any.
+    """
+    event_id = r["event_id"]
+    event_title = r["event_title"]
+
+    listings = get_program_listings(event_id=event_id, program_names=program_names)
+    if not listings:
+        print(f"\nERROR: no listing found for {event_title} ({event_id})\n")
+        return {}, "no listing found"
+
+    saving_dicts = {}
+    ignored_txt = None
+    print(f"{event_title} ({event_id})")
+    for listing in listings:
+        print(f"\t{listing['prog_id']} {listing['prog_name']}")
+        prog_res = get_program_info(event_id=event_id, prog_id=listing['prog_id'])
+        results_res = get_request(url_suffix=f"events/{event_id}/programs/{listing['prog_id']}/results")
+        saving_dict, missing_keys = build_program_dict(r=r, listing=listing, prog_res=prog_res, results_res=results_res)
+        if missing_keys:
+            print(f"\t\tERROR: Skipping {event_title} (ID: {event_id})")
+            print(f"\t\t\tMissing keys: {', '.join(missing_keys)}")
+            ignored_txt = f"Missing keys: {', '.join(missing_keys)}"
+            continue
+        saving_dicts[listing['prog_id']] = saving_dict
+    return saving_dicts, ignored_txt
+
+
+async def crawl_event_async(r: dict, program_names: list, semaphore: asyncio.Semaphore) -> tuple[dict, Optional[str]]:
+    """
+    same as `crawl_event()`, but the programs of the event are fetched concurrently.
+    the dependency chain is only two requests deep: listings, then (info, results) of all programs at once.
+    """
+    event_id = r["event_id"]
+    event_title = r["event_title"]
+
+    async def _get(url_suffix: str):
+        async with semaphore:
+            return await async_get_request(url_suffix=url_suffix)
+
+    res_req = await _get(f"events/{event_id}/programs")
+    listings = [
+        {"prog_id": p["prog_id"], "prog_name": p["prog_name"]}
+        for p in (res_req or []) if p["prog_name"] in program_names
+    ]
+    if not listings:
+        print(f"\nERROR: no listing found for {event_title} ({event_id})\n")
+        return {}, "no listing found"
+
+    async def _crawl_program(listing: dict):
+        return await asyncio.gather(
+            _get(f"events/{event_id}/programs/{listing['prog_id']}"),
+            _get(f"events/{event_id}/programs/{listing['prog_id']}/results"),
+        )
 
-            else:
-                print(f"\tFailed to retrieve image. Status code: {response.status_code}")
-        except Exception as e:
-            print(e)
-            print(url)
-            print(filename)
+    programs_res = await asyncio.gather(*[_crawl_program(listing) for listing in listings])
+
+    saving_dicts = {}
+    ignored_txt = None
+    print(f"{event_title} ({event_id})")
+    for listing, (prog_res, results_res) in zip(listings, programs_res):
+        print(f"\t{listing['prog_id']} {listing['prog_name']}")
+        saving_dict, missing_keys = build_program_dict(r=r, listing=listing, prog_res=prog_res, results_res=results_res)
+        if missing_keys:
+            print(f"\t\tERROR: Skipping {event_title} (ID: {event_id})")
+            print(f"\t\t\tMissing keys: {', '.join(missing_keys)}")
+            ignored_txt = f"Missing keys: {', '.join(missing_keys)}"
+            continue
+        saving_dicts[listing['prog_id']] = saving_dict
+    return saving_dicts, ignored_txt
+
+
+async def crawl_events_async(events_to_crawl: list, program_names: list, max_concurrency: int):
+    """
+    yield `(r, saving_dicts, ignored_txt)` for each event, in order of completion.
+    at most `max_concurrency` requests are in flight at once.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = [
+        asyncio.create_task(_with_listing(r, crawl_event_async(r=r, program_names=program_names, semaphore=semaphore)))
+        for r in events_to_crawl
+    ]
+    for task in asyncio.as_completed(tasks):
+        r, (saving_dicts, ignored_txt) = await task
+        yield r, saving_dicts, ignored_txt
+
+
+async def _with_listing(r: dict, coro):
+    return r, await coro
 
 
-def save_race_results(events_config: dict):
+def save_race_results(events_config: dict, use_async: bool = None):
     ###
     program_names = events_config["program_names"]
     specification_ids = events_config["specification_ids"]
@@ -236,43 +579,42 @@ def save_race_results(events_config: dict):
     start_date = events_config["query"]["start_date"]
     end_date = events_config["query"]["end_date"]
     per_page = events_config["query"]["per_page"]
+
+    if use_async is None:
+        use_async = events_config["crawl"]["use_async"]
+    max_concurrency = events_config["crawl"]["max_concurrency"]
     ###
 
+    # `ignored_events.json` is the compacted ledger, rewritten once per run.
+    # new entries are appended to `ignored_events.jsonl`, which is replayed if the previous run was interrupted.
     ignored_event_file = cache_dir / "events" / "ignored_events.json"
+    ignored_event_log_file = cache_dir / "events" / "ignored_events.jsonl"
     ignored_event_file.parent.mkdir(parents=True, exist_ok=True)
     if ignored_event_file.exists():
         ignored_events = json_load(ignored_event_file)
     else:
         ignored_events = {}
+    for record in jsonl_load(ignored_event_log_file):
+        ignored_events[str(record.pop("event_id"))] = record
 
-    events_query_file = cache_dir / "events" / "events_query.json"
-    events_query_file.parent.mkdir(parents=True, exist_ok=True)
-    if events_query_file.exists():
-        events_queries = json_load(events_query_file)
-    else:
-        events_queries = {}
-
+    events_to_crawl = []
+    event_ids_to_crawl = set()
     for spec_id, spec_name in specification_ids:
         for cat_id, cat_name in category_ids.items():
             # https://developers.triathlon.org/reference/event-listings
             suffix = f"events?category_id={cat_id}&start_date={start_date}&end_date={end_date}"
             suffix += f"&specification_id={spec_id}"
             suffix += f"&per_page={per_page}"
-            if suffix in events_queries.keys():
-                res = events_queries[suffix]
-            else:
-                res = get_request(url_suffix=suffix)
-                if isinstance(res, dict) and (list(res.keys()) == ["errors"]):
-                    raise ValueError(f"ERROR: for {suffix}: no results: {res['errors']}. (Maybe the date does not exist, e.g. 31st of Sept?)")
-                events_queries[suffix] = res
-                json_dump(data=events_queries, p=events_query_file)
+            res = get_request(url_suffix=suffix)
+            if isinstance(res, dict) and (list(res.keys()) == ["errors"]):
+                response_cache.invalidate(key_prefix=suffix)
+                raise ValueError(f"ERROR: for {suffix}: no results: {res['errors']}. (Maybe the date does not exist, e.g. 31st of Sept?)")
 
             print(f"\n### ### ###\n{spec_name = } ({spec_id = }), {cat_name = } ({cat_id = }): {len(res) = }\n### ### ###")
             assert len(res) < per_page, f"More than {per_page = } results! Increase per_page"
             for r in res:
                 event_id = r["event_id"]
                 event_title = r["event_title"]
-                event_listing = r["event_listing"]
 
                 res_specification_ids = [s["cat_id"] for s in r["event_specifications"]]
                 assert spec_id in res_specification_ids, f"{event_title} ({event_id}): {spec_id = } not in {res_specification_ids = }"
@@ -309,103 +651,46 @@ def save_race_results(events_config: dict):
                     print(f"\t{event_title} ({event_id}): {res_specification_ids = }")
                     continue
 
-                listings = get_program_listings(event_id=event_id, program_names=program_names)
-                if not listings:
-                    print(f"\nERROR: no listing found for {event_title} ({event_id})\n")
-                    ignored_events[event_id] = {
-                        "event_title": event_title,
-                        "event_listing": event_listing,
-                        "txt": f"no listing found"
-                    }
-                    json_dump(ignored_events, p=ignored_event_file)
+                if event_id in event_ids_to_crawl:
                     continue
+                event_ids_to_crawl.add(event_id)
+                events_to_crawl.append(r)
+
+    def store_event(r: dict, saving_dicts: dict, ignored_txt: Optional[str]):
+        event_id = r["event_id"]
+        if ignored_txt is not None:
+            ignored_events[str(event_id)] = {
+                "event_title": r["event_title"],
+                "event_listing": r["event_listing"],
+                "txt": ignored_txt
+            }
+            jsonl_append({"event_id": event_id, **ignored_events[str(event_id)]}, p=ignored_event_log_file)
+        if saving_dicts:
+            # atomic: a truncated file would be skipped as "already processed" by the next runs
+            json_dump(data=saving_dicts, p=cache_dir / "events" / f"{event_id}.json", atomic=True, pretty=False)
+            save_event_projection(event_id, saving_dicts)
+
+    print(f"\ncrawling {len(events_to_crawl)} events ({'async' if use_async else 'serial'})\n")
+    if use_async:
+        async def _crawl():
+            async for r, saving_dicts, ignored_txt in crawl_events_async(
+                    events_to_crawl=events_to_crawl,
+                    program_names=program_names,
+                    max_concurrency=max_concurrency
+            ):
+                store_event(r=r, saving_dicts=saving_dicts, ignored_txt=ignored_txt)
+
+        run_async(_crawl(), max_workers=max_concurrency)
+    else:
+        for r in events_to_crawl:
+            saving_dicts, ignored_txt = crawl_event(r=r, program_names=program_names)
+            store_event(r=r, saving_dicts=saving_dicts, ignored_txt=ignored_txt)
+    rate_limiter.print_report()
 
-                saving_path.parent.mkdir(parents=True, exist_ok=True)
-                saving_dicts = {}
-
-                print(f"{event_title} ({event_id})")
-                for listing in listings:
-                    saving_dict = {
-                        "prog_name": listing['prog_name'],
-                        "event_title": event_title,
-                        "event_id": event_id,
-                        "event_venue": r["event_venue"],
-                        "event_date": r["event_date"],
-                        "event_country_noc": r["event_country_noc"],
-                        "event_listing": r["event_listing"],
-                    }
-
-                    print(f"\t{listing['prog_id']} {listing['prog_name']}")
-
-                    suffix = f"events/{event_id}/programs/{listing['prog_id']}"
-                    res = get_request(url_suffix=suffix)
-                    saving_dict["prog_distances"] = res["prog_distances"]
-
-                    saving_dict["prog_distance_category"] = res["prog_distance_category"]
-                    saving_dict["prog_notes"] = res["prog_notes"]
-
-                    if saving_dict["prog_distance_category"] is None or saving_dict["prog_distance_category"] == "":
-                        if (res["prog_notes"] is not None) and ("750" in res["prog_notes"]):
-                            print("\t\tfallback: 750 -> sprint")
-                            saving_dict["prog_distance_category"] = "sprint"
-                        elif (res["prog_notes"] is not None) and ("1500" in res["prog_notes"]):
-                            print("\t\tfallback: 1500 -> standard")
-                            saving_dict["prog_distance_category"] = "standard"
-                        elif saving_dict["prog_distances"] and saving_dict["prog_distances"][0]["distance"] == 750:
-                            print("\t\tfallback2: 750 -> sprint")
-                            saving_dict["prog_distance_category"] = "sprint"
-                        elif saving_dict["prog_distances"] and saving_dict["prog_distances"][0]["distance"] == 1500:
-                            print("\t\tfallback2: 1500 -> standard")
-                            saving_dict["prog_distance_category"] = "standard"
-                        else:
-                            print("\t\tERROR: cannot detect distance")
-
-                    suffix = f"events/{event_id}/programs/{listing['prog_id']}/results"
-                    res = get_request(url_suffix=suffix)
-                    saving_dict["results"] = res["results"]
-                    saving_dict["prog_gender"] = res["prog_gender"]
-                    saving_dict["event_categories"] = res["event"]["event_categories"]
-                    # event_categories = saving_dict["event_categories"]
-                    saving_dict["headers"] = res["headers"]
-                    if not saving_dict["prog_distance_category"]:
-                        if saving_dict["results"]:
-                            winner_time = saving_dict['results'][0]['total_time']
-                            print(f"\t\t\twinner time: {winner_time}")
-                            if winner_time[:4] in ["00:4", "00:5", "01:0", "01:1"]:
-                                print(f"\t\t\tfallback3: {winner_time} -> sprint")
-                                saving_dict["prog_distance_category"] = "sprint"
-                            elif winner_time[:4] in ["01:3", "01:4", "01:5", "02:0", "02:1"]:
-                                print(f"\t\t\tfallback3: {winner_time} -> standard")
-                                saving_dict["prog_distance_category"] = "standard"
-
-                    required_keys = [
-                        "headers",
-                        "results",
-                        "prog_gender",
-                        "prog_distance_category",
-                        # "prog_distances"
-                    ]
-                    missing_keys = [key for key in required_keys if not saving_dict.get(key)]
-                    if missing_keys:
-                        print(f"\t\tERROR: Skipping {event_title} (ID: {event_id})")
-                        print(f"\t\t\tMissing keys: {', '.join(missing_keys)}")
-                        ignored_events[event_id] = {
-                            "event_title": event_title,
-                            "event_listing": event_listing,
-                            "txt": f"Missing keys: {', '.join(missing_keys)}"
-                        }
-
-                        # Save ignored events to file
-                        json_dump(ignored_events, p=ignored_event_file)
-                        continue
-
-                    saving_dicts[listing['prog_id']] = saving_dict
-
-                if saving_dicts:
-                    json_dump(data=saving_dicts, p=saving_path)
-
+    # compaction
     ignored_events = {event_id: event_data for event_id, event_data in sorted(ignored_events.items(), key=lambda item: item[1]['txt'])}
-    json_dump(ignored_events, p=ignored_event_file)
+    json_dump(ignored_events, p=ignored_event_file, atomic=True)
+    ignored_event_log_file.unlink(missing_ok=True)
     # save as csv
     rows_dicts = [{
         "event_id": k,
@@ -444,29 +729,47 @@ def update_athlete_ids(r):
         athlete_nocs[athlete_id] = r["athlete_noc"]
         json_dump(athlete_nocs, athlete_nocs_file)
 
+
+@lru_cache(maxsize=4)
+def _load_ranking_index(json_path: Path, mtime_ns: int, size: int) -> dict:
+    index = {}
+    for year, year_id_rankings in json_load(json_path).items():
+        ranks = {}
+        for i_ranking, r in enumerate(year_id_rankings):
+            ranks.setdefault(int(r[0]), i_ranking + 1)  # first occurrence, as `list.index()`
+        index[year] = ranks
+    return index
+
+
+def get_ranking_index(gender: str) -> Optional[dict]:
+    """
+    {year: {athlete_id: rank}} built from `years_id_rankings_{gender}.json`.
+    the cache is process-wide, keyed by path, modification time and size of the file: parsed once per process,
+    and again only if the file (or `data_dir`) changes. `_load_ranking_index.cache_clear()` to force a reload.
+    the returned dicts are shared: not to be modified.
+    """
+    json_path = data_dir / f"years_id_rankings_{gender}.json"
+    if not json_path.exists():
+        return None
+    stat = json_path.stat()
+    return _load_ranking_index(json_path, stat.st_mtime_ns, stat.st_size)
+
+
 def get_level_for_year(
-        years_id_rankings: dict,
+        ranking_index: dict,
         prog_year: str,
         athletes_infos: list,
         n_top: int = 10,
         default_ranking: int = 50    # use 50 as default if not found because len(ranking) should be 50
 ) -> Optional[float]:
-    if prog_year not in years_id_rankings:
+    if prog_year not in ranking_index:
         return None
 
-    year_id_rankings = years_id_rankings[prog_year]
-    year_athlete_ids = [int(r[0]) for r in year_id_rankings]
-
-    rankings = []
-    for i_start_num, athlete_info in enumerate(athletes_infos):
-        if i_start_num > n_top:
-            break
-        if athlete_info["athlete_id"] in year_athlete_ids:
-            athlete_ranking = year_athlete_ids.index(athlete_info["athlete_id"]) + 1
-            rankings.append(athlete_ranking)
-        else:
-            # print(f"{athlete_info} not found")
-            rankings.append(default_ranking)
+    year_ranks = ranking_index[prog_year]
+    rankings = [
+        year_ranks.get(athlete_info["athlete_id"], default_ranking)
+        for athlete_info in athletes_infos[:n_top + 1]
+    ]
 
     # print(rankings)
     if len(rankings) == 0:
@@ -498,22 +801,21 @@ def get_level(prog_data: dict) -> Optional[float]:  # optional
         print(f"ERROR: {prog_gender} not in {list(gender_dict.keys())}")
         return None
     gender = gender_dict[prog_gender]
-    json_path = data_dir / f"years_id_rankings_{gender}.json"
-    if not json_path.exists():
-        print(f"ERROR: {json_path} not found")
+    ranking_index = get_ranking_index(gender)
+    if ranking_index is None:
+        print(f"ERROR: {data_dir / f'years_id_rankings_{gender}.json'} not found")
         return None
-    years_id_rankings = json_load(data_dir / f"years_id_rankings_{gender}.json")
 
     levels = [
         # using the order of start numbers
-        get_level_for_year(years_id_rankings, prog_year, athletes_infos_by_start_nums),
-        get_level_for_year(years_id_rankings, str(int(prog_year) - 1), athletes_infos_by_start_nums),
-        get_level_for_year(years_id_rankings, str(int(prog_year) + 1), athletes_infos_by_start_nums),
+        get_level_for_year(ranking_index, prog_year, athletes_infos_by_start_nums),
+        get_level_for_year(ranking_index, str(int(prog_year) - 1), athletes_infos_by_start_nums),
+        get_level_for_year(ranking_index, str(int(prog_year) + 1), athletes_infos_by_start_nums),
 
         # using the order of race results
-        get_level_for_year(years_id_rankings, prog_year, athletes_infos),
-        get_level_for_year(years_id_rankings, str(int(prog_year) - 1), athletes_infos),
-        get_level_for_year(years_id_rankings, str(int(prog_year) + 1), athletes_infos),
+        get_level_for_year(ranking_index, prog_year, athletes_infos),
+        get_level_for_year(ranking_index, str(int(prog_year) - 1), athletes_infos),
+        get_level_for_year(ranking_index, str(int(prog_year) + 1), athletes_infos),
     ]
     levels = [l for l in levels if l is not None]
     if len(levels) == 0:
@@ -521,51 +823,81 @@ def get_level(prog_data: dict) -> Optional[float]:  # optional
     return sum(levels) / len(levels)
 
 
-def get_prog_results_df(prog_data: dict) -> pd.DataFrame:
+non_finisher_positions = ["DNF", "DNS", "DSQ", "LAP"]
+
+
+def hms_to_seconds(hms_strings: list) -> np.ndarray:
+    """["h:m:s", ...] -> int32 seconds, all strings parsed at once."""
+    tokens = " ".join(hms_strings).replace(":", " ").split()
+    if len(tokens) != 3 * len(hms_strings):
+        raise ValueError(f"expected 'h:m:s' strings: {hms_strings}")
+    hms = np.array(tokens, dtype=np.int32).reshape(-1, 3)
+    return hms @ np.array([3600, 60, 1], dtype=np.int32)
+
+
+def parse_prog_results(prog_data: dict) -> dict:
+    """
+    typed columns of the finishers (DNF, DNS, DSQ and LAP are dropped) of a program, in the order of `results`:
+        "position" (int32, -1 if not a number), "athlete_id" (int64), "start_num" (int32, -1 if None), "athlete_noc" (str),
+        "age" (float64, nan if neither dob nor yob),
+        one int32 column of seconds per split header, e.g. "swim_s", "t1_s", "bike_s", "t2_s", "run_s"
+    """
     column_names = [header["name"] for header in prog_data["headers"]]
-    # create a dataframe from the results
-    df_list = []
+    results = [r for r in prog_data["results"] if r["position"] not in non_finisher_positions]
+    n_results = len(results)
+
+    columns = {
+        "position": np.array([int(r["position"]) if str(r["position"]).isdigit() else -1 for r in results], dtype=np.int32),
+        "athlete_id": np.array([r["athlete_id"] for r in results], dtype=np.int64),
+        "start_num": np.array([r["start_num"] if r["start_num"] is not None else -1 for r in results], dtype=np.int32),
+        "athlete_noc": np.array([r["athlete_noc"] for r in results], dtype=object),
+    }
+
+    # age at the event: from dob if known, else yob (on average, a person was born on July, 1st)
+    # todo: for accuracy in the age, prefer dob over yob - but it requires a lot of API calls for all athletes
+    has_dob = np.array([r.get("dob") is not None for r in results], dtype=bool)
+    birth_dates = np.array([
+        r["dob"] if r.get("dob") is not None else
+        f'{r["athlete_yob"]}-07-01' if r.get("athlete_yob") is not None else
+        "NaT"
+        for r in results
+    ], dtype="datetime64[D]")
+    days = (np.datetime64(prog_data["event_date"], "D") - birth_dates).astype(np.float64)
+    age = np.where(np.isnat(birth_dates), np.nan, days / 365.25)
+    columns["age"] = age
+
+    yobs = np.array([r.get("athlete_yob") if r.get("athlete_yob") is not None else np.nan for r in results], dtype=np.float64)
     prog_year = int(prog_data["event_date"][:4])
-    for r in prog_data["results"]:
-        # update_athlete_ids(r)
-        if r["position"] in ["DNF", "DNS", "DSQ", "LAP"]:
-            continue
-        di = dict(zip(column_names, r["splits"]))
-        # todo: for accuracy in the age, prefer dob over yob - but it requires a lot of API calls for all athletes
-        # if ("dob" not in r) or (r["dob"] is None):
-        #     athlete_id = r["athlete_id"]
-        #     athlete_info = get_athlete_info(athlete_id)
-        #     if (athlete_info is not None) and ("dob" in athlete_info):
-        #         r["dob"] = athlete_info["dob"]
-        #     else:
-        #         print(f"{athlete_id}: no 'dob' info ({r['athlete_first']} {r['athlete_last']} [{r['athlete_noc']}])")
-
-        di["age"] = None
-        if ("dob" not in r) or (r["dob"] is None):
-            if "athlete_yob" in r:
-                if r["athlete_yob"] is not None:
-                    di["age"] = compute_age_with_decimals(date_of_birth=f'{r["athlete_yob"]}-07-01', specific_date=prog_data["event_date"])  # on average, a person was born on July, 1st
-        else:
-            di["age"] = compute_age_with_decimals(date_of_birth=r["dob"], specific_date=prog_data["event_date"])
-            assert abs(prog_year - int(r["athlete_yob"]) - di["age"]) < 2
-
-        if di["age"] is None:
-            print(f"WARNING: no age for {r['athlete_id']}: {r['athlete_first']} {r['athlete_last']} [{r['athlete_noc']}]")
-        df_list.append(di)
-    df = pd.DataFrame(df_list)
-    if len(df) < 1:
-        print(f"{prog_data['event_title']}: only {len(df)} valid results")
-        return df
+    check_dob = has_dob & ~np.isnan(yobs)
+    assert (np.abs(prog_year - yobs[check_dob] - age[check_dob]) < 2).all(), f"dob and yob do not match in {prog_data['event_title']}"
+
+    for i_result in np.flatnonzero(np.isnan(age)):
+        r = results[i_result]
+        print(f"WARNING: no age for {r['athlete_id']}: {r['athlete_first']} {r['athlete_last']} [{r['athlete_noc']}]")
 
-    def str_to_seconds(x):
-        h, m, s = x.split(":")
-        return int(h) * 3600 + int(m) * 60 + int(s)
+    # one pass over all splits, then one column per header
+    n_columns = len(column_names)
+    if any(len(r["splits"]) < n_columns for r in results):
+        raise ValueError(f"fewer splits than {column_names = } in {prog_data['event_title']}")
+    seconds = hms_to_seconds([split for r in results for split in r["splits"][:n_columns]]).reshape(n_results, n_columns)
+    for i_column, column_name in enumerate(column_names):
+        columns[f"{column_name.lower()}_s"] = seconds[:, i_column]
 
-    for column_name in column_names:
-        df[f"{column_name.lower()}_s"] = df[column_name].apply(str_to_seconds)
+    return columns
 
-    # discard the column with name in headers
-    df = df.drop(columns=column_names)
+
+def get_prog_results_df(prog_data: dict) -> pd.DataFrame:
+    """columns: age, then seconds per split (swim_s, t1_s, bike_s, t2_s, run_s). index: rank among the finishers."""
+    columns = parse_prog_results(prog_data)
+    split_columns = [f"{header['name'].lower()}_s" for header in prog_data["headers"]]
+    if len(columns["age"]) < 1:
+        print(f"{prog_data['event_title']}: only 0 valid results")
+        return pd.DataFrame()
+
+    df = pd.DataFrame({
+        "age": columns["age"],
+        **{column: columns[column].astype(np.int64) for column in split_columns}
+    })
 
     # drop lines with 0 as run_s (DNF or DNS)
     df = df[(df["swim_s"] > 0) & (df["bike_s"] > 0) & (df["run_s"] > 0)]
@@ -634,7 +966,8 @@ def extract_air_water_and_wetsuit(
         prog_id: int,
         prog_data,
         suffix: str,
-        label_manually: bool
+        label_manually: bool,
+        conditions_logs: Optional[list] = None
 ) -> tuple[float|None, float|None, bool|None]:
     if prog_data["prog_name"] == "Elite Men":
         assert suffix == "_m"
@@ -655,24 +988,13 @@ def extract_air_water_and_wetsuit(
         "issues": []
     }
 
-    if conditions_logs_path.exists():
-        conditions_logs = json_load(conditions_logs_path)
-    else:
-        conditions_logs = []
-
     air_temperatures = []
     water_temperatures = []
     wetsuits = []
 
     # 1st method: should be the most reliable
     # url --request GET --url 'https://api.triathlon.org/v1/events/183774/programs/635344?per_page=10&order=asc' --header 'accept: application/json' --header 'apikey: 12345abcdefghijklmnopqrstuvwxyz'
-    prog_file_path = cache_dir / "prog_info" / f"{prog_data['event_id']}_{prog_id}.json"
-    if prog_file_path.exists():
-        prog_info = json_load(prog_file_path)
-    else:
-        prog_info = get_program_info(event_id=prog_data["event_id"], prog_id=prog_id)
-        prog_file_path.parent.mkdir(parents=True, exist_ok=True)
-        json_dump(prog_info, prog_file_path)
+    prog_info = get_program_info(event_id=prog_data["event_id"], prog_id=prog_id)
 
     try:
         air_temperatures.append(prog_info["meta"]["temperature_air"])
@@ -770,35 +1092,35 @@ def extract_air_water_and_wetsuit(
             print(prog_data["prog_notes"])
 
         if label_manually:
-            save_images(
+            # images are shown as soon as the first ones are downloaded
+            image_paths = iter_event_images(
                 event_id=prog_data["event_id"],
                 event_title=prog_data["event_title"],
                 per_page=1000
             )
 
-            images_dir = cache_dir / "images" / str(prog_data["event_id"])
+            n_images = 0
+            for image_file in image_paths:
+                n_images += 1
+                img = cv2.imread(str(image_file))
 
-            # glob png and jpg and jpeg
-            image_paths = list(images_dir.glob("*.[jpJP][npNP][egEG]*"))
-            if len(image_paths) == 0:
-                print(f"no images for manual wetsuit label: {wetsuit_key}")
-            else:
-                for image_file in image_paths:
-                    img = cv2.imread(str(image_file))
-
-                    # img = cv2.resize(img, (2000, 2000))
+                # img = cv2.resize(img, (2000, 2000))
 
-                    # resize if shape too big
-                    shape = img.shape
-                    if shape[0] > 2000 or shape[1] > 2000:
-                        img = cv2.resize(img, (2000, 2000))
+                # resize if shape too big
+                shape = img.shape
+                if shape[0] > 2000 or shape[1] > 2000:
+                    img = cv2.resize(img, (2000, 2000))
 
-                    cv2.imshow(f'{prog_data["event_id"]} - {prog_data["event_title"]}', img)
-                    k = cv2.waitKey(0)
-                    if k in [ord("q"), 27]:
-                        cv2.destroyAllWindows()
-                        break
+                cv2.imshow(f'{prog_data["event_id"]} - {prog_data["event_title"]}', img)
+                k = cv2.waitKey(0)
+                if k in [ord("q"), 27]:
+                    cv2.destroyAllWindows()
+                    break
+            image_paths.close()
 
+            if n_images == 0:
+                print(f"no images for manual wetsuit label: {wetsuit_key}")
+            else:
                 # input, ask for wetsuit
                 response = input(f"wetsuit for {prog_data['prog_name']}? (y/n/?)")
                 if response == "y":
@@ -820,17 +1142,123 @@ def extract_air_water_and_wetsuit(
     log_dict["wetsuit"] = wetsuit
 
     if len(log_dict["issues"]) > 0:
-        conditions_logs.append(log_dict)
-        json_dump(data=conditions_logs, p=conditions_logs_path)
+        if conditions_logs is not None:
+            conditions_logs.append(log_dict)
+        else:
+            append_conditions_log(log_dict)
 
     return air_temperature, water_temperature, wetsuit
 
 
-def get_events_results(events_config: dict) -> pd.DataFrame:
-    ###
+def iter_event_files(events_dir: Path = None):
+    """`cache/events/{event_id}.json` files, sorted by event_id (`events_query.json` and `ignored_events.json` excluded)."""
+    if events_dir is None:
+        events_dir = cache_dir / "events"
+    yield from sorted(
+        (p for p in events_dir.glob("*.json") if p.stem.isnumeric()),
+        key=lambda p: int(p.stem)
+    )
+
+
+def validate_event(event_dict: dict, events_config: dict, event_name: str = "") -> tuple[bool, list]:
+    """
+    event-level checks: date range, modified races, number of programs. the programs are checked by `reduce_event()`.
+    returns (valid, entries for `update_log_file()`, starting with the "loaded" one).
+    """
     start_date = events_config["query"]["start_date"]
     end_date = events_config["query"]["end_date"]
 
+    ledger_entries = []
+
+    def log_entry(**kwargs):
+        ledger_entries.append(kwargs)
+
+    _event_id = 0
+    try:
+        _event_id = set([prog_data["event_id"] for prog_data in event_dict.values()])
+        assert len(_event_id) == 1
+        _event_id = _event_id.pop()
+    except Exception as e:
+        print(f"cannot find single event_id: {event_name} - {e}")
+
+    _event_title = ""
+    try:
+        _event_title = set([prog_data["event_title"] for prog_data in event_dict.values()])
+        assert len(_event_title) == 1
+        _event_title = _event_title.pop()
+    except Exception as e:
+        print(f"cannot find single event_title: {event_name} - {e}")
+
+    _event_listing = ""
+    try:
+        _event_listing = set([prog_data["event_listing"] for prog_data in event_dict.values()])
+        assert len(_event_listing) == 1
+        _event_listing = _event_listing.pop()
+    except Exception as e:
+        print(f"cannot find single event_listing: {event_name} - {e}")
+    log_entry(
+        category="loaded",
+        event_id=_event_id,
+        event_title=_event_title,
+        event_listing=_event_listing
+    )
+
+    if len(event_dict) < 2:
+        print(f"{event_name}\n\tnot enough data: {list(event_dict.keys())}")
+        log_entry(
+            category="ignored",
+            event_id=_event_id,
+            event_title=_event_title,
+            event_listing=_event_listing,
+            txt=f"not enough data: {[prog_data['prog_name'] for prog_data in event_dict.values()]}"
+        )
+        return False, ledger_entries
+
+    valid = True
+    for prog_id, prog_data in event_dict.items():
+        if prog_data["event_date"] < start_date or prog_data["event_date"] > end_date:
+            print(f"{prog_id} - {prog_data['prog_name']} - {prog_data['prog_distance_category']} - "
+                  f"{len(prog_data['results'])} results ({prog_data['event_title']})")
+            print(f"\tskipped because date ({prog_data['event_date']}) not in range [{start_date}, {end_date}]")
+            valid = False
+            log_entry(
+                category="ignored",
+                event_id=prog_data["event_id"],
+                event_title=prog_data["event_title"],
+                event_listing=prog_data["event_listing"],
+                txt=f"date ({prog_data['event_date']}) not in range [{start_date}, {end_date}] for {prog_data['prog_name']}"
+            )
+    if not valid:
+        return False, ledger_entries
+
+    valid = True
+    for prog_id, prog_data in event_dict.items():
+        if prog_data["prog_notes"] is not None:
+            if any(substring in prog_data["prog_notes"].lower() for substring in [
+                "race was modified to a",
+                "race modified  to",
+                "swim was shortened",
+                "swim distance was reduced from 1500 m to 750m"  # Cape Town 2015
+            ]):
+                print(f"\tskipping {prog_data['prog_name']}:\n###\n{prog_data['prog_notes']}\n###\n")
+                valid = False
+                prog_notes = prog_data['prog_notes'].replace('\n', '\n\t\t')
+                log_entry(
+                    category="ignored",
+                    event_id=prog_data["event_id"],
+                    event_title=prog_data["event_title"],
+                    event_listing=prog_data["event_listing"],
+                    txt=f"prog_notes for {prog_data['prog_name']}: {prog_notes}"
+                )
+    return valid, ledger_entries
+
+
+def reduce_event(event_dict: dict, events_config: dict) -> tuple[Optional[dict], list, list]:
+    """
+    one row of `get_events_results()` from the programs of a validated event.
+    returns (events_result, or None if a program is invalid; entries for `update_log_file()`; records for `append_conditions_log()`).
+    """
+    ###
     sports = events_config["sports"]
     category_ids = events_config["category_ids"]
 
@@ -844,326 +1272,418 @@ def get_events_results(events_config: dict) -> pd.DataFrame:
     i_first = events_config["mean_computation"]["i_first"]
     i_last = events_config["mean_computation"]["i_last"]
     use_best_in_each_sport = events_config["mean_computation"]["use_best_in_each_sport"]
-
-    per_page = events_config["query"]["per_page"]
     ###
 
-    print("\nget_events_results\n")
+    ledger_entries = []
+    conditions_logs = []
+
+    def log_entry(**kwargs):
+        ledger_entries.append(kwargs)
+
+    events_result = {}
+    prog_ids = list(event_dict.keys())
+
+    # check that all dicts in event_dict have same values for the keys [event_venue, event_date]
+    for shared_key in ["event_id", "event_title", "event_venue", "event_listing", "event_country_noc"]:
+        if len(set([d[shared_key] for d in event_dict.values()])) != 1:
+            raise ValueError(f"{event_dict.values() = }")
+        events_result[shared_key] = event_dict[prog_ids[0]][shared_key]
+        if shared_key == "event_venue":
+            # remove space as last char, if the case
+            events_result[shared_key] = events_result[shared_key].rstrip()
+
+    program_name_cat = "Elite"  # todo: implement U23 and Junior
+    for prog_id, prog_data in event_dict.items():
+        if prog_data["prog_name"] == f"{program_name_cat} Men":
+            suffix = "_m"
+        elif prog_data["prog_name"] == f"{program_name_cat} Women":
+            suffix = "_w"
+        else:
+            raise NotImplemented(f"{prog_data['prog_name'] = }. Only supporting '{program_name_cat}'.")
 
-    events_dir = cache_dir / "events"
-    events_results = []
+        if prog_data["prog_distance_category"] not in distance_categories:
+            print(f"prog_distance_category '{prog_data['prog_distance_category']}' not in {distance_categories = }")
+            log_entry(
+                category="ignored",
+                event_id=prog_data["event_id"],
+                event_title=prog_data["event_title"],
+                event_listing=prog_data["event_listing"],
+                txt=f"prog_distance_category for {prog_data['prog_name']}: '{prog_data['prog_distance_category']}' not in {distance_categories = }"
+            )
+            events_result["invalid"] = True
+            continue
 
-    for event_file in events_dir.glob("*.json"):
-        if not event_file.stem.isnumeric():  # ignore `events_query.json` and `ignored_events.json`
+        print(f"{prog_id} - {prog_data['prog_name']} - {prog_data['prog_distance_category']} - "
+              f"{len(prog_data['results'])} results ({prog_data['event_title']})")
+        events_result[f"event_date{suffix}"] = prog_data["event_date"]
+        events_result[f"prog_distance_category{suffix}"] = prog_data["prog_distance_category"]
+        events_result[f"prog_notes{suffix}"] = prog_data["prog_notes"] if prog_data[
+                                                                              "prog_notes"] is not None else ""
+        events_result[f"event_category_ids{suffix}"] = [e['cat_id'] for e in prog_data["event_categories"]]
+        if not set(events_result[f"event_category_ids{suffix}"]).intersection(set(category_ids.keys())):
+            print(f"\tevent_category_ids {events_result[f'event_category_ids{suffix}']} not in {list(category_ids.keys())}")
+            log_entry(
+                category="ignored",
+                event_id=prog_data["event_id"],
+                event_title=prog_data["event_title"],
+                event_listing=prog_data["event_listing"],
+                txt=f"event_category_ids for {prog_data['prog_name']}: {events_result[f'event_category_ids{suffix}']} not in {category_ids.keys()}"
+            )
+            events_result["invalid"] = True
             continue
-        event_dict = json_load(event_file)
-        _event_id = 0
-        try:
-            _event_id = set([prog_data["event_id"] for prog_data in event_dict.values()])
-            assert len(_event_id) == 1
-            _event_id = _event_id.pop()
-        except Exception as e:
-            print(f"cannot find single event_id: {event_file.stem} - {e}")
 
-        _event_title = ""
-        try:
-            _event_title = set([prog_data["event_title"] for prog_data in event_dict.values()])
-            assert len(_event_title) == 1
-            _event_title = _event_title.pop()
-        except Exception as e:
-            print(f"cannot find single event_title: {event_file.stem} - {e}")
+        expected_distances = events_config["expected_distances"]
+        if prog_data["headers"] is not None:
+            if len(prog_data["headers"]):
+                for i_distance, i_header in enumerate([0, 2, 4]):
+                    if "distance" in prog_data["headers"][i_header]:
+                        distance = prog_data["headers"][i_header]["distance"]
+                        print(f"\t\t{distance = } {prog_data['prog_distance_category'] = }")
+                        if prog_data['prog_distance_category'] in expected_distances:
+                            d_min, d_max = expected_distances[prog_data['prog_distance_category']][i_distance]
+                            is_distance_correct = d_min <= distance <= d_max
+                            if not is_distance_correct:
+                                print(f"\t\t\t{distance = } not in {d_min = }, {d_max = }")
+                                events_result["invalid"] = True
+                                log_entry(
+                                    category="ignored",
+                                    event_id=prog_data["event_id"],
+                                    event_title=prog_data["event_title"],
+                                    event_listing=prog_data["event_listing"],
+                                    txt=f"distance #{i_distance} for {prog_data['prog_name']}: `{distance}` not in {d_min = }, {d_max = }"
+                                )
+                                break
+                if "invalid" in events_result:
+                    break
 
-        _event_listing = ""
-        try:
-            _event_listing = set([prog_data["event_listing"] for prog_data in event_dict.values()])
-            assert len(_event_listing) == 1
-            _event_listing = _event_listing.pop()
-        except Exception as e:
-            print(f"cannot find single event_listing: {event_file.stem} - {e}")
-        update_log_file(
-            category="loaded",
-            event_id=_event_id,
-            event_title=_event_title,
-            event_listing=_event_listing
-        )
+        level = get_level(prog_data=prog_data)
+        events_result[f"level{suffix}"] = level
 
-        if len(event_dict) < 2:
-            print(f"{event_file.stem}\n\tnot enough data: {list(event_dict.keys())}")
-            update_log_file(
+        df_results = get_prog_results_df(prog_data=prog_data)
+        n_results = len(df_results)
+        if n_results < n_results_min:
+            print(f"\t\tSkipping - only {n_results} results")
+            events_result["invalid"] = True
+            log_entry(
                 category="ignored",
-                event_id=_event_id,
-                event_title=_event_title,
-                event_listing=_event_listing,
-                txt=f"not enough data: {[prog_data['prog_name'] for prog_data in event_dict.values()]}"
+                event_id=prog_data["event_id"],
+                event_title=prog_data["event_title"],
+                event_listing=prog_data["event_listing"],
+                txt=f"only {n_results = } for {prog_data['prog_name']}"
             )
-            continue
+            break
 
-        valid = True
-        for prog_id, prog_data in event_dict.items():
-            if prog_data["event_date"] < start_date or prog_data["event_date"] > end_date:
-                print(f"{prog_id} - {prog_data['prog_name']} - {prog_data['prog_distance_category']} - "
-                      f"{len(prog_data['results'])} results ({prog_data['event_title']})")
-                print(f"\tskipped because date ({prog_data['event_date']}) not in range [{start_date}, {end_date}]")
-                valid = False
-                update_log_file(
-                    category="ignored",
-                    event_id=prog_data["event_id"],
-                    event_title=prog_data["event_title"],
-                    event_listing=prog_data["event_listing"],
-                    txt=f"date ({prog_data['event_date']}) not in range [{start_date}, {end_date}] for {prog_data['prog_name']}"
-                )
-        if not valid:
-            continue
+        if use_best_in_each_sport:
+            for column in df_results.columns:
+                if column == "age":
+                    continue
+                column_results = df_results[column]
+                # drop all value=0 in column_results
+                len_before = len(column_results)
+                column_results = column_results[column_results != 0]
+                len_after = len(column_results)
+                if len_before - len_after > 0:
+                    print(f"dropped {len_before - len_after} values for column {column}. Remaining: {len_after}")
+                if len(column_results) < n_results_min:
+                    print(f"\t\tSkipping - only {len(column_results)} results for {column}")
+                    if column in [f"{s}_s" for s in sports]:  # ignore missing t1 and t2
+                        events_result["invalid"] = True
+                        log_entry(
+                            category="ignored",
+                            event_id=prog_data["event_id"],
+                            event_title=prog_data["event_title"],
+                            event_listing=prog_data["event_listing"],
+                            txt=f"only {len(column_results) = } for {prog_data['prog_name']} for {column}"
+                        )
+                        break
+                times = np.array(sorted(list(column_results))[i_first:i_last])
+                if column in [f"{s}_s" for s in sports]:
+                    assert times[0] > 1, times
+                events_result[f"{column.replace('_s', '')}_mean{suffix}"] = times.mean() if len(times) > 0 else 0
+                events_result[f"{column.replace('_s', '')}_std{suffix}"] = times.std() if len(times) > 0 else 0
+                events_result[f"{column.replace('_s', '')}_all{suffix}"] = column_results.to_list()
+
+                times_last = np.array(sorted(list(column_results))[-i_last: -i_first if i_first > 0 else None]) if len(column_results) > 0 else np.array([])
+                # times_last = np.array(sorted(list(column_results))[19: 24])
+                if column in [f"{s}_s" for s in sports]:
+                    assert times_last[0] > 1, times_last
+                events_result[f"{column.replace('_s', '')}_mean{suffix}_last"] = times_last.mean() if len(times_last) > 0 else 0
+                events_result[f"{column.replace('_s', '')}_std{suffix}_last"] = times_last.std() if len(times_last) > 0 else 0
+
+                # first_advance = events_result[f"{column.replace('_s', '')}_mean{suffix}_last"] - events_result[
+                #     f"{column.replace('_s', '')}_mean{suffix}"]
+                # if column in [f"{s}_s" for s in sports]:
+                #     assert first_advance > 0, f"{events_result['event_title']}: {first_advance}"
+            if "invalid" in events_result:
+                break
 
-        valid = True
-        for prog_id, prog_data in event_dict.items():
-            if prog_data["prog_notes"] is not None:
-                if any(substring in prog_data["prog_notes"].lower() for substring in [
-                    "race was modified to a",
-                    "race modified  to",
-                    "swim was shortened",
-                    "swim distance was reduced from 1500 m to 750m"  # Cape Town 2015
-                ]):
-                    print(f"\tskipping {prog_data['prog_name']}:\n###\n{prog_data['prog_notes']}\n###\n")
-                    valid = False
-                    prog_notes = prog_data['prog_notes'].replace('\n', '\n\t\t')
-                    update_log_file(
-                        category="ignored",
-                        event_id=prog_data["event_id"],
-                        event_title=prog_data["event_title"],
-                        event_listing=prog_data["event_listing"],
-                        txt=f"prog_notes for {prog_data['prog_name']}: {prog_notes}"
-                    )
-        if not valid:
-            continue
+            df_age = df_results["age"].iloc[i_first:i_last]
+            if df_age.isnull().values.any():
+                # usually happens for games (olympics, commonwealth, etc.)
+                n_null = df_age.isnull().values.sum()
+                print(f"\t\tAge: {n_null} null values for event {prog_data['event_title']}:\n{df_age}")
+            age_mean_std = df_age.agg(["mean", "std"])
+            for k, v in age_mean_std.items():
+                events_result[f"age_{k.replace('_s', '')}{suffix}"] = v
+        else:
+            df_results = df_results.iloc[i_first:i_last]
+            # compute the mean for each column
+            mean_std = df_results.agg(["mean", "std"])
+            for k, v in mean_std.items():
+                for _k, _v in dict(v).items():
+                    events_result[f"{k.replace('_s', '')}_{_k}{suffix}"] = _v
+        df_results["start_to_t2_s"] = df_results["swim_s"] + df_results["t1_s"] + df_results["bike_s"]
+
+        events_result[f"n_finishers{suffix}"] = len(df_results)
+
+        time_max_s = min(df_results["start_to_t2_s"]) + pack_duration_s
+        events_result[f"pack_size{suffix}"] = int((df_results["start_to_t2_s"] <= time_max_s).sum())
+        events_result[f"is_winner_in_front_pack{suffix}"] = df_results["start_to_t2_s"].iloc[0] <= time_max_s
+        id_best_runner = df_results.run_s.idxmin()
+        events_result[f"is_best_runner_in_front_pack{suffix}"] = df_results["start_to_t2_s"].iloc[
+                                                                     id_best_runner] <= time_max_s
+        # print(f"\tpack_size{suffix} = {events_result[f'pack_size{suffix}']}. Winner in: {events_result[f'is_winner_in_front_pack{suffix}']}")
+
+        df_results["total_s"] = df_results["swim_s"] + df_results["t1_s"] + df_results["bike_s"] + df_results[
+            "t2_s"] + df_results["run_s"]
+
+        # get name of best runner
+        id_best_runner = df_results.run_s.idxmin()
+        id_winner = df_results.total_s.idxmin()
+        events_result[f"best_runner_wins{suffix}"] = id_best_runner == id_winner
+
+        if prog_data["results"][0]["total_time"] is not None:
+            def str_to_seconds(x):
+                h, m, s = x.split(":")
+                return int(h) * 3600 + int(m) * 60 + int(s)
+
+            df_tmp = pd.DataFrame(prog_data["results"])
+            # drop rows with postion in ["DNF", "DNS", "DSQ", "LAP"]
+            df_tmp = df_tmp[~df_tmp["position"].isin(["DNF", "DNS", "DSQ", "LAP"])]
+            # drop rows with total time in ["DNF", "DNS", "DSQ", "LAP"]
+            df_tmp = df_tmp[~df_tmp["total_time"].isin(["DNF", "DNS", "DSQ", "LAP"])]
+
+            # set position as int
+            df_tmp["position"] = df_tmp["position"].astype(int)
+            # sort by position
+            df_tmp.sort_values("position", inplace=True)
+
+            assert df_tmp["position"].iloc[0] == 1
+            assert df_tmp["position"].iloc[1] == 2
+
+            first_s = str_to_seconds(df_tmp["total_time"].iloc[0])
+            second_s = str_to_seconds(df_tmp["total_time"].iloc[1])
+            events_result[f"second_delay{suffix}"] = int(second_s - first_s)
+        else:
+            print("\tno total time")
+            events_result[f"second_delay{suffix}"] = df_results["total_s"].iloc[1] - df_results["total_s"].iloc[0]
+
+        events_result[f"winner{suffix}"] = prog_data["results"][0]["athlete_title"]
+        events_result[f"winner_country{suffix}"] = prog_data["results"][0]["athlete_noc"]
+        events_result[f"second{suffix}"] = prog_data["results"][1]["athlete_title"]
+        events_result[f"second_country{suffix}"] = prog_data["results"][1]["athlete_noc"]
+
+        assert "invalid" not in events_result
+        if "invalid" not in events_result:
+            air_temperature, water_temperature, wetsuit = extract_air_water_and_wetsuit(
+                prog_id=prog_id,
+                prog_data=prog_data,
+                label_manually=label_manually,
+                suffix=suffix,
+                conditions_logs=conditions_logs
+            )
+            events_result[f"air_temperature{suffix}"] = air_temperature
+            events_result[f"water_temperature{suffix}"] = water_temperature
+            events_result[f"wetsuit{suffix}"] = wetsuit
 
-        events_result = {}
-        prog_ids = list(event_dict.keys())
-
-        # check that all dicts in event_dict have same values for the keys [event_venue, event_date]
-        for shared_key in ["event_id", "event_title", "event_venue", "event_listing", "event_country_noc"]:
-            if len(set([d[shared_key] for d in event_dict.values()])) != 1:
-                raise ValueError(f"{event_dict.values() = }")
-            events_result[shared_key] = event_dict[prog_ids[0]][shared_key]
-            if shared_key == "event_venue":
-                # remove space as last char, if the case
-                events_result[shared_key] = events_result[shared_key].rstrip()
-
-        program_name_cat = "Elite"  # todo: implement U23 and Junior
-        for prog_id, prog_data in event_dict.items():
-            if prog_data["prog_name"] == f"{program_name_cat} Men":
-                suffix = "_m"
-            elif prog_data["prog_name"] == f"{program_name_cat} Women":
-                suffix = "_w"
-            else:
-                raise NotImplemented(f"{prog_data['prog_name'] = }. Only supporting '{program_name_cat}'.")
+    if "invalid" in events_result:
+        return None, ledger_entries, conditions_logs
 
-            if prog_data["prog_distance_category"] not in distance_categories:
-                print(f"prog_distance_category '{prog_data['prog_distance_category']}' not in {distance_categories = }")
-                update_log_file(
-                    category="ignored",
-                    event_id=prog_data["event_id"],
-                    event_title=prog_data["event_title"],
-                    event_listing=prog_data["event_listing"],
-                    txt=f"prog_distance_category for {prog_data['prog_name']}: '{prog_data['prog_distance_category']}' not in {distance_categories = }"
-                )
-                events_result["invalid"] = True
-                continue
+    return events_result, ledger_entries, conditions_logs
 
-            print(f"{prog_id} - {prog_data['prog_name']} - {prog_data['prog_distance_category']} - "
-                  f"{len(prog_data['results'])} results ({prog_data['event_title']})")
-            events_result[f"event_date{suffix}"] = prog_data["event_date"]
-            events_result[f"prog_distance_category{suffix}"] = prog_data["prog_distance_category"]
-            events_result[f"prog_notes{suffix}"] = prog_data["prog_notes"] if prog_data[
-                                                                                  "prog_notes"] is not None else ""
-            events_result[f"event_category_ids{suffix}"] = [e['cat_id'] for e in prog_data["event_categories"]]
-            if not set(events_result[f"event_category_ids{suffix}"]).intersection(set(category_ids.keys())):
-                print(f"\tevent_category_ids {events_result[f'event_category_ids{suffix}']} not in {list(category_ids.keys())}")
-                update_log_file(
-                    category="ignored",
-                    event_id=prog_data["event_id"],
-                    event_title=prog_data["event_title"],
-                    event_listing=prog_data["event_listing"],
-                    txt=f"event_category_ids for {prog_data['prog_name']}: {events_result[f'event_category_ids{suffix}']} not in {category_ids.keys()}"
-                )
-                events_result["invalid"] = True
-                continue
 
-            expected_distances = events_config["expected_distances"]
-            if prog_data["headers"] is not None:
-                if len(prog_data["headers"]):
-                    for i_distance, i_header in enumerate([0, 2, 4]):
-                        if "distance" in prog_data["headers"][i_header]:
-                            distance = prog_data["headers"][i_header]["distance"]
-                            print(f"\t\t{distance = } {prog_data['prog_distance_category'] = }")
-                            if prog_data['prog_distance_category'] in expected_distances:
-                                d_min, d_max = expected_distances[prog_data['prog_distance_category']][i_distance]
-                                is_distance_correct = d_min <= distance <= d_max
-                                if not is_distance_correct:
-                                    print(f"\t\t\t{distance = } not in {d_min = }, {d_max = }")
-                                    events_result["invalid"] = True
-                                    update_log_file(
-                                        category="ignored",
-                                        event_id=prog_data["event_id"],
-                                        event_title=prog_data["event_title"],
-                                        event_listing=prog_data["event_listing"],
-                                        txt=f"distance #{i_distance} for {prog_data['prog_name']}: `{distance}` not in {d_min = }, {d_max = }"
-                                    )
-                                    break
-                    if "invalid" in events_result:
-                        break
 
-            level = get_level(prog_data=prog_data)
-            events_result[f"level{suffix}"] = level
 
-            df_results = get_prog_results_df(prog_data=prog_data)
-            n_results = len(df_results)
-            if n_results < n_results_min:
-                print(f"\t\tSkipping - only {n_results} results")
-                events_result["invalid"] = True
-                update_log_file(
-                    category="ignored",
-                    event_id=prog_data["event_id"],
-                    event_title=prog_data["event_title"],
-                    event_listing=prog_data["event_listing"],
-                    txt=f"only {n_results = } for {prog_data['prog_name']}"
-                )
-                break
+def reduce_event_file(event_file: Path, events_config: dict) -> tuple[Optional[dict], list, list]:
+    """
+    load -> validate -> reduce one `cache/events/{event_id}.json` file.
+    nothing is written: the caller merges the entries, so that events can be reduced in worker processes.
+    """
+    event_dict = load_event(event_file)
+    valid, ledger_entries = validate_event(event_dict, events_config, event_name=event_file.stem)
+    if not valid:
+        return None, ledger_entries, []
+    events_result, reduce_ledger_entries, conditions_logs = reduce_event(event_dict, events_config)
+    return events_result, ledger_entries + reduce_ledger_entries, conditions_logs
 
-            if use_best_in_each_sport:
-                for column in df_results.columns:
-                    if column == "age":
-                        continue
-                    column_results = df_results[column]
-                    # drop all value=0 in column_results
-                    len_before = len(column_results)
-                    column_results = column_results[column_results != 0]
-                    len_after = len(column_results)
-                    if len_before - len_after > 0:
-                        print(f"dropped {len_before - len_after} values for column {column}. Remaining: {len_after}")
-                    if len(column_results) < n_results_min:
-                        print(f"\t\tSkipping - only {len(column_results)} results for {column}")
-                        if column in [f"{s}_s" for s in sports]:  # ignore missing t1 and t2
-                            events_result["invalid"] = True
-                            update_log_file(
-                                category="ignored",
-                                event_id=prog_data["event_id"],
-                                event_title=prog_data["event_title"],
-                                event_listing=prog_data["event_listing"],
-                                txt=f"only {len(column_results) = } for {prog_data['prog_name']} for {column}"
-                            )
-                            break
-                    times = np.array(sorted(list(column_results))[i_first:i_last])
-                    if column in [f"{s}_s" for s in sports]:
-                        assert times[0] > 1, times
-                    events_result[f"{column.replace('_s', '')}_mean{suffix}"] = times.mean() if len(times) > 0 else 0
-                    events_result[f"{column.replace('_s', '')}_std{suffix}"] = times.std() if len(times) > 0 else 0
-                    events_result[f"{column.replace('_s', '')}_all{suffix}"] = column_results.to_list()
-
-                    times_last = np.array(sorted(list(column_results))[-i_last: -i_first if i_first > 0 else None]) if len(column_results) > 0 else np.array([])
-                    # times_last = np.array(sorted(list(column_results))[19: 24])
-                    if column in [f"{s}_s" for s in sports]:
-                        assert times_last[0] > 1, times_last
-                    events_result[f"{column.replace('_s', '')}_mean{suffix}_last"] = times_last.mean() if len(times_last) > 0 else 0
-                    events_result[f"{column.replace('_s', '')}_std{suffix}_last"] = times_last.std() if len(times_last) > 0 else 0
-
-                    # first_advance = events_result[f"{column.replace('_s', '')}_mean{suffix}_last"] - events_result[
-                    #     f"{column.replace('_s', '')}_mean{suffix}"]
-                    # if column in [f"{s}_s" for s in sports]:
-                    #     assert first_advance > 0, f"{events_result['event_title']}: {first_advance}"
-                if "invalid" in events_result:
-                    break
 
-                df_age = df_results["age"].iloc[i_first:i_last]
-                if df_age.isnull().values.any():
-                    # usually happens for games (olympics, commonwealth, etc.)
-                    n_null = df_age.isnull().values.sum()
-                    print(f"\t\tAge: {n_null} null values for event {prog_data['event_title']}:\n{df_age}")
-                age_mean_std = df_age.agg(["mean", "std"])
-                for k, v in age_mean_std.items():
-                    events_result[f"age_{k.replace('_s', '')}{suffix}"] = v
-            else:
-                df_results = df_results.iloc[i_first:i_last]
-                # compute the mean for each column
-                mean_std = df_results.agg(["mean", "std"])
-                for k, v in mean_std.items():
-                    for _k, _v in dict(v).items():
-                        events_result[f"{k.replace('_s', '')}_{_k}{suffix}"] = _v
-            df_results["start_to_t2_s"] = df_results["swim_s"] + df_results["t1_s"] + df_results["bike_s"]
-
-            events_result[f"n_finishers{suffix}"] = len(df_results)
-
-            time_max_s = min(df_results["start_to_t2_s"]) + pack_duration_s
-            events_result[f"pack_size{suffix}"] = int((df_results["start_to_t2_s"] <= time_max_s).sum())
-            events_result[f"is_winner_in_front_pack{suffix}"] = df_results["start_to_t2_s"].iloc[0] <= time_max_s
-            id_best_runner = df_results.run_s.idxmin()
-            events_result[f"is_best_runner_in_front_pack{suffix}"] = df_results["start_to_t2_s"].iloc[
-                                                                         id_best_runner] <= time_max_s
-            # print(f"\tpack_size{suffix} = {events_result[f'pack_size{suffix}']}. Winner in: {events_result[f'is_winner_in_front_pack{suffix}']}")
-
-            df_results["total_s"] = df_results["swim_s"] + df_results["t1_s"] + df_results["bike_s"] + df_results[
-                "t2_s"] + df_results["run_s"]
-
-            # get name of best runner
-            id_best_runner = df_results.run_s.idxmin()
-            id_winner = df_results.total_s.idxmin()
-            events_result[f"best_runner_wins{suffix}"] = id_best_runner == id_winner
-
-            if prog_data["results"][0]["total_time"] is not None:
-                def str_to_seconds(x):
-                    h, m, s = x.split(":")
-                    return int(h) * 3600 + int(m) * 60 + int(s)
-
-                df_tmp = pd.DataFrame(prog_data["results"])
-                # drop rows with postion in ["DNF", "DNS", "DSQ", "LAP"]
-                df_tmp = df_tmp[~df_tmp["position"].isin(["DNF", "DNS", "DSQ", "LAP"])]
-                # drop rows with total time in ["DNF", "DNS", "DSQ", "LAP"]
-                df_tmp = df_tmp[~df_tmp["total_time"].isin(["DNF", "DNS", "DSQ", "LAP"])]
-
-                # set position as int
-                df_tmp["position"] = df_tmp["position"].astype(int)
-                # sort by position
-                df_tmp.sort_values("position", inplace=True)
-
-                assert df_tmp["position"].iloc[0] == 1
-                assert df_tmp["position"].iloc[1] == 2
-
-                first_s = str_to_seconds(df_tmp["total_time"].iloc[0])
-                second_s = str_to_seconds(df_tmp["total_time"].iloc[1])
-                events_result[f"second_delay{suffix}"] = int(second_s - first_s)
+# bump when the logic of `reduce_event_file()` changes: all stored rows are then recomputed
+reduction_version = 2
+
+
+def get_reduction_config_hash(events_config: dict) -> str:
+    """hash of everything `reduce_event_file()` depends on, apart from the event file itself."""
+    used_config = {
+        "reduction_version": reduction_version,
+        "start_date": events_config["query"]["start_date"],
+        "end_date": events_config["query"]["end_date"],
+        "sports": events_config["sports"],
+        "category_ids": events_config["category_ids"],
+        "pack_duration_s": events_config["pack_duration_s"],
+        "n_results_min": events_config["cleaning"]["n_results_min"],
+        "distance_categories": events_config["distance_categories"],
+        "expected_distances": events_config["expected_distances"],
+        "mean_computation": events_config["mean_computation"],
+    }
+    h = hashlib.sha256(json.dumps(used_config, sort_keys=True, default=str).encode())
+    # read by `get_level()` and `extract_air_water_and_wetsuit()`
+    for p in [
+        data_dir / "years_id_rankings_m.json",
+        data_dir / "years_id_rankings_w.json",
+        data_dir / "manual_labelled_wetsuit.json",
+    ]:
+        h.update(p.name.encode())
+        h.update(p.read_bytes() if p.exists() else b"")
+    return h.hexdigest()
+
+
+def _init_reduce_worker(n_workers: int):
+    # the ledger of a worker is never flushed: its entries are returned to the parent
+    event_ledger.p = None
+    # the workers share the api budget of the parent, which does not request while they run
+    rate_limiter.split(n_workers)
+
+
+def _reduce_event_file_in_worker(event_file: Path, events_config: dict) -> tuple[tuple, dict]:
+    """`reduce_event_file()` and the api requests and cache lookups it made in this worker."""
+    counts_start = get_local_api_counts()
+    reduced = reduce_event_file(event_file, events_config)
+    counts_end = get_local_api_counts()
+    return reduced, {k: counts_end[k] - counts_start[k] for k in counts_end}
+
+
+def iter_reduced_events(event_files, events_config: dict):
+    """
+    yields (event_file, output of `reduce_event_file()`), in the order of `event_files`.
+    chunk by chunk: only the rows of one chunk are in memory, whatever the number of files.
+    only the new or modified event files are reduced, the other rows are read from the store.
+    """
+    label_manually = events_config["label_manually"]
+    reduction_config = events_config["reduction"]
+    chunk_size = reduction_config["chunk_size"]
+
+    # manual labelling asks for the events without wetsuit info: everything is reduced again
+    reduction_store = None
+    config_hash = ""
+    if reduction_config["incremental"] and not label_manually:
+        reduction_store = ReductionStore(db_path=cache_dir / reduction_config["store_file_name"])
+        config_hash = get_reduction_config_hash(events_config)
+
+    # manual labelling needs the terminal and the opencv windows: stay in the main process
+    executor = None
+    max_workers = reduction_config["max_workers"] or os.cpu_count()
+    if reduction_config["use_processes"] and not label_manually:
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_reduce_worker, initargs=(max_workers,))
+
+    n_files = 0
+    n_reduced = 0
+    event_files = iter(event_files)
+    try:
+        while chunk := list(islice(event_files, chunk_size)):
+            keys = {}
+            reduced = {}
+            if reduction_store is not None:
+                keys = {
+                    event_file.stem: f"{hashlib.sha256(event_file.read_bytes()).hexdigest()}-{config_hash}"
+                    for event_file in chunk
+                }
+                reduced = reduction_store.get_many(keys)
+            files_to_reduce = [event_file for event_file in chunk if event_file.stem not in reduced]
+
+            if executor is not None and len(files_to_reduce) > 1:
+                newly_reduced = []
+                for r, worker_counts in executor.map(
+                    _reduce_event_file_in_worker,
+                    files_to_reduce,
+                    [events_config] * len(files_to_reduce),
+                    chunksize=max(1, len(files_to_reduce) // (4 * max_workers))
+                ):
+                    newly_reduced.append(r)
+                    add_worker_api_counts(worker_counts)
             else:
-                print("\tno total time")
-                events_result[f"second_delay{suffix}"] = df_results["total_s"].iloc[1] - df_results["total_s"].iloc[0]
-
-            events_result[f"winner{suffix}"] = prog_data["results"][0]["athlete_title"]
-            events_result[f"winner_country{suffix}"] = prog_data["results"][0]["athlete_noc"]
-            events_result[f"second{suffix}"] = prog_data["results"][1]["athlete_title"]
-            events_result[f"second_country{suffix}"] = prog_data["results"][1]["athlete_noc"]
-
-            assert "invalid" not in events_result
-            if "invalid" not in events_result:
-                air_temperature, water_temperature, wetsuit = extract_air_water_and_wetsuit(
-                    prog_id=prog_id,
-                    prog_data=prog_data,
-                    label_manually=label_manually,
-                    suffix=suffix
-                )
-                events_result[f"air_temperature{suffix}"] = air_temperature
-                events_result[f"water_temperature{suffix}"] = water_temperature
-                events_result[f"wetsuit{suffix}"] = wetsuit
+                newly_reduced = [reduce_event_file(event_file, events_config) for event_file in files_to_reduce]
+
+            if reduction_store is not None and files_to_reduce:
+                reduction_store.put_many([
+                    (event_file.stem, keys[event_file.stem], r) for event_file, r in zip(files_to_reduce, newly_reduced)
+                ])
+            reduced.update({event_file.stem: r for event_file, r in zip(files_to_reduce, newly_reduced)})
+
+            n_files += len(chunk)
+            n_reduced += len(files_to_reduce)
+            for event_file in chunk:
+                yield event_file, reduced[event_file.stem]
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        print(
+            f"{n_files - n_reduced} / {n_files} event files already reduced, {n_reduced} reduced"
+            f"{f' with {max_workers} processes' if executor is not None else ''}"
+        )
 
-        if "invalid" in events_result:
-            continue
 
-        events_results.append(events_result)
+class ColumnarBuilder:
+    """
+    rows appended one at a time to one list per column, instead of keeping all the row dicts until the end.
+    like `pd.DataFrame(rows)`: columns in order of first appearance, missing values are NaN.
+    all rows are expected to have the same keys: a row with missing or new keys is padded, and reported.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.n_rows = 0
+
+    def append(self, row: dict):
+        if self.n_rows > 0 and row.keys() != self.columns.keys():
+            missing_keys = [k for k in self.columns if k not in row]
+            new_keys = [k for k in row if k not in self.columns]
+            print(
+                f"row {self.n_rows} ({row.get('event_id', '?')}) padded with NaN:"
+                f"\n\tmissing keys: {missing_keys}\n\tnew keys: {new_keys}"
+            )
+        for k, v in row.items():
+            if k not in self.columns:
+                # key not seen before: NaN for the previous rows
+                self.columns[k] = [np.nan] * self.n_rows
+            self.columns[k].append(v)
+        self.n_rows += 1
+        for values in self.columns.values():
+            if len(values) < self.n_rows:
+                values.append(np.nan)
 
-    # assert that the dicts of events_results have all same length, and same keys
-    if len(events_results) > 1:
-        keys = events_results[0].keys()
-        for events_result in events_results[1:]:
-            assert events_result.keys() == keys, f"{events_result.keys()} != {keys}"
+    def __len__(self) -> int:
+        return self.n_rows
 
-    df = pd.DataFrame(events_results)
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns)
+
+
+def get_events_results(events_config: dict) -> pd.DataFrame:
+    """
+    streaming pipeline: discover (`iter_event_files()`) -> load (`load_event()`) -> validate (`validate_event()`)
+    -> reduce (`reduce_event()`, possibly in worker processes, or read from the store) -> columnar builder.
+    """
+    print("\nget_events_results\n")
+
+    builder = ColumnarBuilder()
+    for event_file, (events_result, ledger_entries, conditions_logs) in iter_reduced_events(iter_event_files(), events_config):
+        for entry in ledger_entries:
+            update_log_file(**entry)
+        append_conditions_logs(conditions_logs)
+        if events_result is not None:
+            builder.append(events_result)
+
+    df = builder.to_frame()
 
     df = df.dropna(subset=['swim_mean_m', 'bike_mean_m', 'run_mean_m'])
     df.reset_index(drop=True, inplace=True)
@@ -1183,7 +1703,7 @@ def get_events_results(events_config: dict) -> pd.DataFrame:
     # save df for faster access
     df.to_csv(str(tmp_results_file_path), index=False)
 
-    log_data = json_load(log_file_path)
+    log_data = event_ledger.data
     assert len(df) == len(log_data['loaded']) - len(log_data['ignored']), f"missing logs of ignored: {len(log_data['loaded']) - len(log_data['ignored'])}"
 
     return df
@@ -1323,7 +1843,54 @@ def drop_outliers(data, i_sport: int, sport_outliers: list):
     return data
 
 
-def get_events_df(events_config: dict = None):
+def get_events_df_fingerprint(events_config: dict) -> str:
+    """
+    hash of the effective config and of all inputs of `get_events_df()`: the crawled event files and the data files.
+    to be computed after crawling.
+    """
+    # parameters that do not change the result
+    ignored_keys = ["crawl", "reduction", "memoization", "instrumentation", "analyses"]
+    h = hashlib.sha256(json.dumps(
+        {k: v for k, v in events_config.items() if k not in ignored_keys}, sort_keys=True, default=str
+    ).encode())
+    h.update(get_reduction_config_hash(events_config).encode())
+    events_dir = cache_dir / "events"
+    for event_file in sorted(events_dir.glob("*.json")):
+        if event_file.stem.isnumeric():
+            h.update(event_file.name.encode())
+            h.update(hashlib.sha256(event_file.read_bytes()).digest())
+    return h.hexdigest()
+
+
+def load_memoized_events_df(memo_path: Path) -> pd.DataFrame:
+    table = pq.read_table(memo_path)
+    all_columns = get_all_columns(table.column_names)
+    df = table.drop_columns(all_columns).to_pandas()
+    # other list columns (`event_category_ids_*`) are read as numpy arrays
+    for column in df.columns[df.dtypes == object]:
+        if len(df) and isinstance(df[column].iloc[0], np.ndarray):
+            df[column] = df[column].map(lambda v: v.tolist())
+    # `*_all_*` columns: views into the buffers read from the file
+    for column in all_columns:
+        df[column] = RaggedArray.from_arrow(table[column]).to_series(index=df.index)
+    return df[table.column_names]
+
+
+def prune_memoized_events_dfs(memo_dir: Path, max_entries: int):
+    """keep the `max_entries` most recently written frames (and their logs), delete the older ones."""
+    memo_paths = sorted(memo_dir.glob("events_df_*.parquet"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for memo_path in memo_paths[max_entries:]:
+        memo_path.unlink(missing_ok=True)
+        memo_path.with_suffix(".logs.json").unlink(missing_ok=True)
+    if len(memo_paths) > max_entries:
+        print(f"deleted {len(memo_paths) - max_entries} older memoized events df from {memo_dir}")
+
+
+def get_events_df(events_config: dict = None, use_memo: bool = None):
+    """
+    `use_memo`: return the frame saved by a previous call with the same config and inputs, if any.
+    default: `events.memoization.enabled`. always off with `events.label_manually`.
+    """
     clean_up_log_file()
     clean_up_conditions_log_file()
 
@@ -1331,6 +1898,16 @@ def get_events_df(events_config: dict = None):
         config = load_config()
         events_config = config["events"]
 
+    memoization_config = events_config["memoization"]
+    if use_memo is None:
+        use_memo = memoization_config["enabled"]
+    # manual labelling asks for the events without wetsuit info: a memoized frame would skip it
+    if events_config["label_manually"]:
+        use_memo = False
+
+    instrumentation_config = events_config["instrumentation"]
+    run_report = RunReport("get_events_df", use_tracemalloc=instrumentation_config["tracemalloc"], use_memo=use_memo)
+
     ###
     distance_categories = events_config["distance_categories"]
     sports = events_config["sports"]
@@ -1343,23 +1920,70 @@ def get_events_df(events_config: dict = None):
     min_duration_s = events_config["cleaning"]["min_duration_s"]
     ###
 
-    save_race_results(events_config=events_config)
+    with run_report.stage("save_race_results") as stage:
+        save_race_results(events_config=events_config)
+        stage["rows_out"] = sum(1 for _ in iter_event_files())
+
+    # after crawling: new event files change the fingerprint
+    memo_dir = cache_dir / memoization_config["dir_name"]
+    memo_dir.mkdir(parents=True, exist_ok=True)
+    with run_report.stage("fingerprint"):
+        fingerprint = get_events_df_fingerprint(events_config)
+    memo_path = memo_dir / f"events_df_{fingerprint[:16]}.parquet"
+    # saved with the logs, since the analyses read `conditions_inconsistencies.jsonl`
+    memo_logs_path = memo_path.with_suffix(".logs.json")
+    if use_memo and memo_path.exists() and memo_logs_path.exists():
+        print(f"loading memoized events df: {memo_path}")
+        with run_report.stage("load_memoized") as stage:
+            df = load_memoized_events_df(memo_path)
+            memo_logs = json_load(memo_logs_path)
+            event_ledger.data = memo_logs["ledger"]
+            append_conditions_logs(memo_logs["conditions_logs"])
+            stage["rows_out"] = len(df)
+        event_ledger.flush()
+        print_log_file()
+        if instrumentation_config["enabled"]:
+            run_report.save()
+        return df
+
+    with run_report.stage("get_events_results") as stage:
+        df = get_events_results(events_config=events_config)
+        # df = pd.read_csv(str(tmp_results_file_path))
+        stage["rows_out"] = len(df)
 
-    df = get_events_results(events_config=events_config)
-    # df = pd.read_csv(str(tmp_results_file_path))
+    with run_report.stage("clean_results", rows_in=len(df)) as stage:
+        df = clean_results(df, min_duration_s=min_duration_s, sports=sports, distance_categories=distance_categories)
+        stage["rows_out"] = len(df)
+    with run_report.stage("compute_diff", rows_in=len(df)) as stage:
+        df = compute_diff(df, sports=sports, distance_categories=distance_categories, remove_extreme_diffs=remove_extreme_diffs, quantile_min=quantile_min, quantile_max=quantile_max)
+        stage["rows_out"] = len(df)
+    with run_report.stage("add_year_and_event_cat", rows_in=len(df)) as stage:
+        df = add_year_and_event_cat(df, event_category_mapping=event_category_mapping)
 
-    df = clean_results(df, min_duration_s=min_duration_s, sports=sports, distance_categories=distance_categories)
-    df = compute_diff(df, sports=sports, distance_categories=distance_categories, remove_extreme_diffs=remove_extreme_diffs, quantile_min=quantile_min, quantile_max=quantile_max)
-    df = add_year_and_event_cat(df, event_category_mapping=event_category_mapping)
+        # sort df by date and reset index
+        df = df.sort_values("event_date_m").reset_index(drop=True)
 
-    # sort df by date and reset index
-    df = df.sort_values("event_date_m").reset_index(drop=True)
+        df = to_ragged_columns(df)
+        stage["rows_out"] = len(df)
 
     for event_id in df['event_id'].tolist():
         update_log_file(category="returned", event_id=event_id)
 
+    event_ledger.flush()
     print_log_file()
 
+    with run_report.stage("save_memoized", rows_in=len(df)):
+        df.to_parquet(memo_path, index=False)
+        json_dump(
+            {"ledger": event_ledger.data, "conditions_logs": jsonl_load(conditions_logs_path)},
+            memo_logs_path,
+            atomic=True
+        )
+        prune_memoized_events_dfs(memo_dir, max_entries=memoization_config["max_entries"])
+
+    if instrumentation_config["enabled"]:
+        run_report.save()
+
     return df
 
 if __name__ == '__main__':
@@ -0,0 +1,161 @@
+"""
+skips building and rendering the figures whose inputs did not change.
+
+`CachedFigure(path, inputs, **savefig_kwargs)`: the png stores a fingerprint of
+    the inputs given by the caller (typically `get_fingerprint(locals())` at the start of the plotting function)
+    the source code of the calling function, and of the helper modules (`figure_helper_modules`)
+    `figures_version`, the file name and the `savefig` arguments
+`up_to_date()` is checked before building the figure, once the printed stats and the checks are done:
+    figure_inputs = get_fingerprint(locals())
+    ...
+    figure = CachedFigure(res_dir / "x.png", inputs=[figure_inputs], dpi=300)
+    if figure.up_to_date():
+        return
+    fig, ax = plt.subplots()
+    ...
+    figure.save()
+    plt.show()
+figures in the middle of a function are built by a `plot_*()` helper, which returns early the same way.
+
+`--force` in the command line, or `TRI_STATS_FORCE=1`: render all figures again.
+`forced_rendering()`: the same, for a block of code, e.g. while profiling the analyses.
+"""
+
+from contextlib import contextmanager
+from functools import lru_cache
+import hashlib
+import inspect
+import os
+from pathlib import Path
+import sys
+
+import matplotlib
+from matplotlib import pyplot as plt
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+force_env_var = "TRI_STATS_FORCE"
+fingerprint_key = "tri_stats_fingerprint"  # in the text chunks of the png
+
+
+def force_requested(argv: list = None) -> bool:
+    argv = sys.argv[1:] if argv is None else argv
+    return "--force" in argv or os.environ.get(force_env_var, "0") not in ["", "0"]
+
+
+@contextmanager
+def forced_rendering():
+    """the `CachedFigure`s created in the block are rendered, whatever their png."""
+    previous = os.environ.get(force_env_var)
+    os.environ[force_env_var] = "1"
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ[force_env_var]
+        else:
+            os.environ[force_env_var] = previous
+
+
+def _update_hash(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(repr(list(value.columns)).encode())
+        for _, column in value.items():
+            _update_hash(h, column)
+    elif isinstance(value, pd.Series):
+        h.update(f"{value.name} {value.dtype}".encode())
+        h.update(pd.util.hash_pandas_object(value.index).to_numpy().tobytes())
+        if value.dtype == object:
+            # lists, ragged arrays, mixed types: not hashable by pandas
+            for v in value:
+                _update_hash(h, v)
+        else:
+            h.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(f"{value.dtype} {value.shape}".encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for k in sorted(value, key=repr):
+            _update_hash(h, k)
+            _update_hash(h, value[k])
+    elif isinstance(value, (list, tuple, set)):
+        h.update(type(value).__name__.encode())
+        for v in (sorted(value, key=repr) if isinstance(value, set) else value):
+            _update_hash(h, v)
+    else:
+        h.update(repr(value).encode())
+    h.update(b"|")
+
+
+def get_fingerprint(*inputs) -> str:
+    """hash of frames, arrays, containers and scalars (by `repr`)."""
+    h = hashlib.sha256()
+    for value in inputs:
+        _update_hash(h, value)
+    return h.hexdigest()
+
+
+def get_png_fingerprint(path: Path):
+    try:
+        with Image.open(path) as im:
+            return im.text.get(fingerprint_key)
+    except (FileNotFoundError, OSError):
+        return None
+
+
+# bump to render all figures again, e.g. after a change that the fingerprints do not cover
+figures_version = 1
+
+# source files in the fingerprint of every figure: the helpers called by the plotting functions
+figure_helper_modules = ["utils", "utils_countries", "utils_events", "utils_figures"]
+
+
+@lru_cache(maxsize=None)
+def get_helpers_fingerprint() -> str:
+    scripts_dir = Path(__file__).parent
+    return get_fingerprint(
+        figures_version,
+        matplotlib.__version__,
+        *[(scripts_dir / f"{module}.py").read_text() for module in figure_helper_modules]
+    )
+
+
+class CachedFigure:
+    """
+    one png of `res_dir`, to be created in the function that builds the figure: its source is part of the fingerprint.
+    `path` without extension: the `savefig` format is added, as `plt.savefig()` does.
+    """
+
+    def __init__(self, path, inputs: list = (), force: bool = None, **savefig_kwargs):
+        path = Path(path)
+        if not path.suffix:
+            path = path.with_suffix(f".{savefig_kwargs.get('format') or plt.rcParams['savefig.format']}")
+        self.path = path
+        self.force = force_requested() if force is None else force
+        self.savefig_kwargs = savefig_kwargs
+
+        caller = inspect.currentframe().f_back.f_code
+        try:
+            caller_source = inspect.getsource(caller)
+        except OSError:
+            caller_source = caller.co_name
+        self.fingerprint = get_fingerprint(
+            get_helpers_fingerprint(), path.name, savefig_kwargs, caller_source, *inputs
+        )
+
+    def up_to_date(self) -> bool:
+        """True if the png was saved from the same fingerprint: nothing to build."""
+        if self.force or self.path.suffix.lower() != ".png":
+            return False
+        if get_png_fingerprint(self.path) != self.fingerprint:
+            return False
+        print(f"{self.path.name}: inputs unchanged, not rendered again (--force to render it)")
+        return True
+
+    def save(self, fig=None):
+        """`plt.savefig()` (or `fig.savefig()`), storing the fingerprint in the png."""
+        savefig_kwargs = dict(self.savefig_kwargs)
+        if self.path.suffix.lower() == ".png":
+            savefig_kwargs["metadata"] = {**savefig_kwargs.get("metadata", {}), fingerprint_key: self.fingerprint}
+        (plt if fig is None else fig).savefig(self.path, **savefig_kwargs)
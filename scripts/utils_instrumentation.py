@@ -0,0 +1,230 @@
+"""
+per-stage measurements of a run, e.g. of `get_events_df()`:
+    wall and cpu time, memory, rows in / out, api requests and response cache hits / misses
+
+the report is printed, written to `ignored/run_report.json` and appended to `ignored/run_reports.jsonl`,
+to compare runs after a config change.
+
+`AnalysisProfiler`: opt-in cProfile of each analysis of `main_events.py`, see `profiling_requested()`.
+"""
+
+from contextlib import contextmanager
+import cProfile
+from datetime import datetime
+import os
+from pathlib import Path
+import pstats
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+try:
+    import resource  # not available on windows
+except ImportError:
+    resource = None
+
+from utils import ignored_dir, json_dump, jsonl_append
+from utils_figures import forced_rendering
+from utils_itu import rate_limiter, response_cache
+
+
+def _max_rss_mb() -> float:
+    """peak resident set size of the process since start."""
+    if resource is None:
+        return float("nan")
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1e6 if sys.platform == "darwin" else max_rss / 1e3  # bytes on macos, kB on linux
+
+
+def _children_cpu_s() -> float:
+    """cpu time of the terminated child processes, e.g. a process pool shut down during the stage."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+# counts returned by worker processes, see `add_worker_api_counts()`
+worker_api_counts = {"api_requests": 0, "cache_hits": 0, "cache_misses": 0}
+
+
+def get_local_api_counts() -> dict:
+    """api requests and response cache lookups of this process since start."""
+    return {"api_requests": rate_limiter.report()["n_requests"], **response_cache.counts()}
+
+
+def add_worker_api_counts(counts: dict):
+    """counts of a worker process (difference of `get_local_api_counts()` around its task), to be sent to the parent."""
+    for k, v in counts.items():
+        worker_api_counts[k] += v
+
+
+def _api_counts() -> dict:
+    local_api_counts = get_local_api_counts()
+    return {k: local_api_counts[k] + worker_api_counts[k] for k in local_api_counts}
+
+
+class RunReport:
+    """
+    `use_tracemalloc`: also measure the peak of python allocations in each stage (slows down the run).
+    api requests and cache lookups include the ones of worker processes that report them with `add_worker_api_counts()`.
+    """
+
+    def __init__(self, name: str, use_tracemalloc: bool = False, **metadata):
+        self.name = name
+        self.use_tracemalloc = use_tracemalloc
+        self.report = {
+            "name": name,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            **metadata,
+            "stages": []
+        }
+        self.t_start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = None):
+        """yields a dict, in which the caller can set "rows_out" and other values."""
+        stage = {"stage": name, "rows_in": rows_in, "rows_out": None}
+        if self.use_tracemalloc:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        api_counts_start = _api_counts()
+        cpu_start = time.process_time()
+        children_cpu_start = _children_cpu_s()
+        t_start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage["wall_s"] = round(time.perf_counter() - t_start, 3)
+            stage["cpu_s"] = round(time.process_time() - cpu_start, 3)
+            stage["children_cpu_s"] = round(_children_cpu_s() - children_cpu_start, 3)
+            stage["max_rss_mb"] = round(_max_rss_mb(), 1)
+            if self.use_tracemalloc:
+                stage["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+            api_counts_end = _api_counts()
+            stage.update({k: api_counts_end[k] - api_counts_start[k] for k in api_counts_end})
+            self.report["stages"].append(stage)
+
+    def print(self):
+        print(f"\n### {self.name}: {self.report['wall_s']:.1f}s ###")
+        for stage in self.report["stages"]:
+            rows = f"{stage['rows_in'] if stage['rows_in'] is not None else '-'} -> {stage['rows_out'] if stage['rows_out'] is not None else '-'}"
+            memory = f"{stage['max_rss_mb']:.0f} MB rss"
+            if "tracemalloc_peak_mb" in stage:
+                memory += f", {stage['tracemalloc_peak_mb']:.0f} MB traced peak"
+            print(
+                f"{stage['stage']:<24} {stage['wall_s']:7.2f}s wall {stage['cpu_s'] + stage['children_cpu_s']:7.2f}s cpu"
+                f"  rows {rows:<12} {memory}"
+                f"  api: {stage['api_requests']} requests, {stage['cache_hits']} hits, {stage['cache_misses']} misses"
+            )
+
+    def save(self, file_name: str = "run_report"):
+        self.report["wall_s"] = round(time.perf_counter() - self.t_start, 3)
+        if self.use_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        json_dump(self.report, ignored_dir / f"{file_name}.json", atomic=True)
+        jsonl_append(self.report, ignored_dir / f"{file_name}s.jsonl")
+        self.print()
+
+
+profile_env_var = "TRI_STATS_PROFILE"
+
+# libraries whose own time (`tottime`) is summed per analysis. checked in this order, on the file and function names
+profiled_libraries = {
+    "matplotlib": ["matplotlib", "seaborn", "PIL"],
+    "pandas": ["pandas"],
+    "numpy": ["numpy"],
+}
+
+
+def profiling_requested(argv: list = None) -> bool:
+    """`--profile` in the command line, or `TRI_STATS_PROFILE=1`."""
+    argv = sys.argv[1:] if argv is None else argv
+    return "--profile" in argv or os.environ.get(profile_env_var, "0") not in ["", "0"]
+
+
+def get_library_times(stats: pstats.Stats) -> dict:
+    """own time of the functions of each of `profiled_libraries`, the rest is "other"."""
+    times = {library: 0.0 for library in profiled_libraries}
+    times["other"] = 0.0
+    for (file_name, _, function_name), (_, _, tottime, _, _) in stats.stats.items():
+        location = f"{file_name} {function_name}"
+        library = next(
+            (library for library, names in profiled_libraries.items() if any(name in location for name in names)),
+            "other"
+        )
+        times[library] += tottime
+    return times
+
+
+class AnalysisProfiler:
+    """
+    `run(func, *args, **kwargs)` calls `func`, profiled if `enabled`:
+        cProfile stats in `ignored/profiles/{func name}.prof` (e.g. for `snakeviz`) and the top functions in `.txt`,
+        wall and cpu time, time in matplotlib (incl. seaborn) vs pandas vs numpy, peak of python allocations.
+    `save_summary()`: the analyses ranked by wall time, printed and saved as `ignored/profiles/summary.md`.
+
+    times are measured under the profiler, i.e. slower than normal runs. `plt.show()` blocks in interactive backends:
+    the waiting time counts as matplotlib time.
+    all figures are rendered while profiling, as with `--force`: pngs skipped by `CachedFigure` would hide the matplotlib time.
+    """
+
+    def __init__(self, enabled: bool = None, profiles_dir: Path = None, n_top: int = 30):
+        self.enabled = profiling_requested() if enabled is None else enabled
+        self.profiles_dir = ignored_dir / "profiles" if profiles_dir is None else profiles_dir
+        self.n_top = n_top
+        self.rows = []
+        if self.enabled:
+            self.profiles_dir.mkdir(parents=True, exist_ok=True)
+            print(f"profiling the analyses to {self.profiles_dir} (all figures rendered)")
+
+    def run(self, func, *args, **kwargs):
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        name = func.__name__
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        cpu_start = time.process_time()
+        t_start = time.perf_counter()
+        try:
+            with forced_rendering():
+                return profiler.runcall(func, *args, **kwargs)
+        finally:
+            wall_s = time.perf_counter() - t_start
+            cpu_s = time.process_time() - cpu_start
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+            if not was_tracing:
+                tracemalloc.stop()
+
+            profiler.dump_stats(self.profiles_dir / f"{name}.prof")
+            with open(self.profiles_dir / f"{name}.txt", "w") as f:
+                stats = pstats.Stats(profiler, stream=f)
+                stats.sort_stats("cumulative").print_stats(self.n_top)
+            library_times = get_library_times(stats)
+            profiled_s = sum(library_times.values()) or 1.0
+            self.rows.append({
+                "analysis": name,
+                "wall_s": round(wall_s, 2),
+                "cpu_s": round(cpu_s, 2),
+                **{f"{library}_%": round(100 * t / profiled_s, 1) for library, t in library_times.items()},
+                "peak_mb": round(peak_mb, 1),
+            })
+            print(f"[profile] {name}: {wall_s:.1f}s")
+
+    def save_summary(self) -> pd.DataFrame:
+        if not self.enabled or not self.rows:
+            return None
+        summary_df = pd.DataFrame(self.rows).sort_values("wall_s", ascending=False).reset_index(drop=True)
+        summary_df.insert(2, "wall_%", (100 * summary_df["wall_s"] / summary_df["wall_s"].sum()).round(1))
+        txt = summary_df.to_markdown(index=False)
+        with open(self.profiles_dir / "summary.md", "w") as f:
+            f.write(txt + "\n")
+        print(f"\n### profiles of the analyses ###\n{txt}\n")
+        return summary_df
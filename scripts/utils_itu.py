@@ -1,7 +1,18 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import json
 from pathlib import Path
+import threading
+import time
 
+import pandas as pd
 import requests  # pip install requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils import load_config, cache_dir
+from utils_cache import ResponseCache
 
 url_prefix = "https://api.triathlon.org/v1/"
 
@@ -9,38 +20,245 @@ url_prefix = "https://api.triathlon.org/v1/"
 api_file = Path(__file__).parent.parent / "api_key.txt"
 assert api_file.exists(), f"{api_file = } does not exist"
 with open(api_file, "r") as f:
-    api_key = f.readline()
+    api_key = f.readline().strip()
 
 headers = {
     "accept": "application/json",
+    "accept-encoding": "gzip, deflate",
     "apikey": api_key
 }
 
+api_config = load_config()["api"]
+
+
+def create_session(session_headers: dict = None) -> requests.Session:
+    """
+    Session with keep-alive connection pooling and retries (exponential backoff on 429 and 5xx).
+    `Retry-After` headers sent by the API on 429 are respected.
+    """
+    retry = Retry(
+        total=api_config["retries"],
+        backoff_factor=api_config["backoff_factor"],
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+        raise_on_status=False,  # the last response is returned, callers check `data`
+    )
+    adapter = HTTPAdapter(
+        pool_connections=api_config["pool_connections"],
+        pool_maxsize=api_config["pool_maxsize"],
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if session_headers is not None:
+        session.headers.update(session_headers)
+    return session
+
+
+# shared by all callers: one TCP+TLS handshake per pooled connection instead of one per request
+session = create_session(session_headers=headers)
+
+
+class RateLimiter:
+    """
+    process-wide token bucket (`requests_per_s` refill, `burst` capacity) plus a cap on requests in flight.
+    thread-safe. asyncio callers go through `async_get_request()`, i.e. wait in executor threads, not in the loop.
+    each process has its own copy: worker processes call `split()` so that together they stay within the limits.
+    """
+
+    def __init__(self, requests_per_s: float, burst: int, max_concurrency: int):
+        self.requests_per_s = requests_per_s
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+
+        self.n_requests = 0
+        self.n_throttled = 0
+        self.throttled_s = 0.0
+
+    def _reserve(self) -> float:
+        """take one token, possibly in advance. returns how long to wait until it is actually available."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.requests_per_s)
+            self.last_refill = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.requests_per_s)
+
+    def split(self, n_processes: int):
+        """
+        keep 1 / `n_processes` of the budget, in each of `n_processes` worker processes.
+        a static split rather than a limiter shared between processes: no inter-process call per request,
+        at the cost of unused budget when only some of the workers request.
+        """
+        with self.lock:
+            if self.requests_per_s:
+                self.requests_per_s = self.requests_per_s / n_processes
+            self.burst = max(1, self.burst // n_processes)
+            self.tokens = min(self.tokens, float(self.burst))
+            self.max_concurrency = max(1, self.max_concurrency // n_processes)
+            self.slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    @contextmanager
+    def acquire(self):
+        t_start = time.monotonic()
+        self.slots.acquire()
+        try:
+            if self.requests_per_s:
+                time.sleep(self._reserve())
+            waited_s = time.monotonic() - t_start
+            with self.lock:
+                self.n_requests += 1
+                if waited_s > 0.001:
+                    self.n_throttled += 1
+                    self.throttled_s += waited_s
+            yield
+        finally:
+            self.slots.release()
+
+    def report(self) -> dict:
+        with self.lock:
+            return {
+                "n_requests": self.n_requests,
+                "n_throttled": self.n_throttled,
+                "throttled_s": round(self.throttled_s, 3),
+            }
+
+    def print_report(self):
+        r = self.report()
+        print(f"rate limiter: {r['n_requests']} requests, {r['n_throttled']} throttled, {r['throttled_s']:.1f}s spent throttled (summed over callers)")
+
+
+rate_limiter = RateLimiter(
+    requests_per_s=api_config["rate_limit"]["requests_per_s"],
+    burst=api_config["rate_limit"]["burst"],
+    max_concurrency=api_config["rate_limit"]["max_concurrency"]
+)
+
+
+response_cache = ResponseCache(db_path=cache_dir / api_config["cache"]["file_name"])
+
+
+def _default_max_age_s():
+    max_age_days = api_config["cache"]["max_age_days"]
+    return None if max_age_days is None else max_age_days * 24 * 3600
+
+
+def _default_max_age_none_s():
+    none_max_age_days = api_config["cache"]["none_max_age_days"]
+    return None if none_max_age_days is None else none_max_age_days * 24 * 3600
+
+
+def get_request(url_suffix, params="", refresh: bool = False, max_age_s: float = None):
+    """
+    `data` field of the response, served from `response_cache` when possible.
+    `None` if the request failed: cached as well, stale after `api.cache.none_max_age_days`.
+    `refresh`: ignore the cached value, request again and update the cache.
+    `max_age_s`: cached values older than that are stale (default: `api.cache.max_age_days`).
+    """
+    key = ResponseCache.make_key(url_suffix, params)
+    if max_age_s is None:
+        max_age_s = _default_max_age_s()
+    if not refresh:
+        hit, d = response_cache.get(key, max_age_s=max_age_s, max_age_none_s=_default_max_age_none_s())
+        if hit:
+            return d
 
-def get_request(url_suffix, params=""):
     url = url_prefix + url_suffix
     # print(url)
-    response = requests.request("GET", url, headers=headers, params=params)
-    d = json.loads(response.text)
-    d = d["data"]
+    with rate_limiter.acquire():
+        response = session.get(
+            url,
+            params=params,
+            timeout=(api_config["connect_timeout_s"], api_config["read_timeout_s"])
+        )
+    if response.status_code == 200:
+        d = json.loads(response.text)["data"]
+    else:
+        d = None
+    # failed requests are cached as `None`, not to request them again at each run
+    response_cache.put(key, url_suffix=url_suffix, params=params, data=d)
     return d
 
 
+async def async_get_request(url_suffix, params=""):
+    """`get_request()` for asyncio callers: runs in the loop's executor, sharing the pooled session."""
+    return await asyncio.to_thread(get_request, url_suffix, params)
+
+
+def run_async(coro, max_workers: int):
+    """run `coro` with an executor of `max_workers` threads, used by `async_get_request()`."""
+    async def _run():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max_workers))
+        return await coro
+
+    return asyncio.run(_run())
+
+
 def get_athlete_info(athlete_id: int):
-    saving_path = Path(__file__).parent / "data" / "athletes" / f"{athlete_id}.json"
-    saving_path.parent.mkdir(parents=True, exist_ok=True)
-    # check if athlete_id has already been retrieved and saved
-    if saving_path.exists():
-        with open(saving_path) as f:
-            res = json.load(f)
-        if res is None:
-            print(f"ERROR: no data found for {athlete_id = } in {saving_path = }")
-        return res
     url_suffix = f"athletes/{athlete_id}"
-    print(f"requesting {url_suffix = }")
     res = get_request(url_suffix=url_suffix)
     if res is None:
         print(f"ERROR: no data found for {athlete_id = } request = {url_prefix + url_suffix}")
-    with open(saving_path, "w") as f:
-        json.dump(res, f)
     return res
+
+
+def get_athletes_info(athlete_ids, max_workers: int = None) -> pd.DataFrame:
+    """
+    `get_athlete_info()` for many athletes at once: ids are deduplicated, cached ones are read with one query
+    and the missing ones are requested concurrently.
+    returns one row per athlete with data, joinable on `athlete_id`.
+    """
+    if max_workers is None:
+        max_workers = api_config["rate_limit"]["max_concurrency"]
+    athlete_ids = sorted(set(int(a_id) for a_id in athlete_ids))
+    cached = response_cache.get_many(
+        [f"athletes/{a_id}" for a_id in athlete_ids], max_age_s=_default_max_age_s(), max_age_none_s=_default_max_age_none_s()
+    )
+    infos = {a_id: cached[f"athletes/{a_id}"] for a_id in athlete_ids if f"athletes/{a_id}" in cached}
+    missing_ids = [a_id for a_id in athlete_ids if a_id not in infos]
+    print(f"athlete infos: {len(infos)} cached, {len(missing_ids)} to request")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        infos.update(zip(missing_ids, executor.map(get_athlete_info, missing_ids)))
+
+    rows = [
+        {**infos[a_id], "athlete_id": a_id}
+        for a_id in athlete_ids if infos[a_id] is not None
+    ]
+    return pd.DataFrame(rows, columns=None if rows else ["athlete_id"])
+
+
+def get_athlete_results(athlete_id, overwrite: bool = False):
+    url_suffix = f"athletes/{athlete_id}/results?per_page=1000"
+    return get_request(url_suffix, refresh=overwrite)
+
+
+def prefetch_athlete_results(athlete_ids, overwrite: bool = False, max_workers: int = None):
+    """
+    warm the cache of `athletes/{id}/results` for all `athlete_ids` with a pool of threads. returns once all are saved.
+    the rate limiter of `get_request()` still applies.
+    """
+    if max_workers is None:
+        max_workers = api_config["rate_limit"]["max_concurrency"]
+    athlete_ids = sorted(set(str(a_id) for a_id in athlete_ids))
+    if overwrite:
+        missing_ids = athlete_ids
+    else:
+        cached_keys = response_cache.contains_many(
+            [f"athletes/{a_id}/results?per_page=1000" for a_id in athlete_ids],
+            max_age_s=_default_max_age_s(), max_age_none_s=_default_max_age_none_s()
+        )
+        missing_ids = [a_id for a_id in athlete_ids if f"athletes/{a_id}/results?per_page=1000" not in cached_keys]
+    print(f"prefetching results of {len(missing_ids)} / {len(athlete_ids)} athletes")
+    if not missing_ids:
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for a_id, res in zip(missing_ids, executor.map(lambda _a_id: get_athlete_results(_a_id, overwrite=overwrite), missing_ids)):
+            if res is None:
+                print(f"ERROR: no data found for athlete_id = {a_id}")
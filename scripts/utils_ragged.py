@@ -0,0 +1,84 @@
+"""
+variable-length rows, e.g. the times of all finishers of each event (`swim_all_m`, `bike_all_w`, ...)
+    stored as one contiguous array of values and an array of offsets: row i is values[offsets[i]:offsets[i + 1]]
+
+instead of one python list per DataFrame cell: a few bytes per value instead of ~36,
+and parquet stores it the same way (list columns), so that loading is zero-copy.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+class RaggedArray:
+    def __init__(self, values: np.ndarray, offsets: np.ndarray):
+        assert offsets[0] == 0 and offsets[-1] == len(values), f"{offsets[0] = } {offsets[-1] = } {len(values) = }"
+        self.values = np.asarray(values)
+        self.values.flags.writeable = False  # rows are shared views
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @classmethod
+    def from_lists(cls, lists, dtype=np.int32) -> "RaggedArray":
+        lists = list(lists)
+        lengths = np.fromiter((len(li) for li in lists), dtype=np.int64, count=len(lists))
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        values = np.fromiter((v for li in lists for v in li), dtype=dtype, count=offsets[-1])
+        return cls(values, offsets)
+
+    @classmethod
+    def from_arrow(cls, array) -> "RaggedArray":
+        """from a pyarrow list array or chunked array, without copying the values when possible."""
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        offsets = array.offsets.to_numpy().astype(np.int64)
+        values = array.values.to_numpy(zero_copy_only=False)[offsets[0]: offsets[-1]]
+        return cls(values, offsets - offsets[0])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        """read-only view of row i."""
+        return self.values[self.offsets[i]: self.offsets[i + 1]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def to_lists(self) -> list:
+        return [row.tolist() for row in self]
+
+    def to_series(self, index=None) -> pd.Series:
+        """one view per cell: `df.copy()` only copies the references."""
+        return pd.Series(list(self), index=index, dtype=object)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.offsets.nbytes
+
+
+def get_all_columns(columns) -> list:
+    """the `{sport}_all_{m|w}` columns among `columns`."""
+    return [column for column in columns if re.fullmatch(r"\w+_all_[mw]", column)]
+
+
+def to_ragged_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """replace the python lists of the `*_all_*` columns by views into one `RaggedArray` per column."""
+    for column in get_all_columns(df.columns):
+        df[column] = RaggedArray.from_lists(df[column]).to_series(index=df.index)
+    return df
+
+
+def get_ragged(df: pd.DataFrame, column: str) -> RaggedArray:
+    """
+    the rows of `column` packed again (after filtering or sorting `df`), e.g. to compute on all events at once:
+        np.add.reduceat(r.values, r.offsets[:-1]) / r.lengths()
+    """
+    return RaggedArray.from_lists(df[column])
@@ -0,0 +1,124 @@
+"""
+long-format table of all results of the cached events: one row per (event, program, finisher)
+    built from `cache/events/*.json` (their projections, see `load_event()`) with `parse_prog_results()`, stored as parquet with categorical columns
+
+the per-event aggregates of `get_events_results()` (windowed means, pack sizes, best runner) can be computed
+for the whole corpus at once with the grouped functions below.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils import cache_dir
+from utils_events import iter_event_files, load_event, parse_prog_results
+
+results_table_path = cache_dir / "results_table.parquet"
+
+split_columns = ["swim_s", "t1_s", "bike_s", "t2_s", "run_s"]
+program_keys = ["event_id", "prog_id"]
+
+
+def get_prog_results_table(prog_id: str, prog_data: dict) -> pd.DataFrame:
+    columns = parse_prog_results(prog_data)
+    n_results = len(columns["position"])
+    df = pd.DataFrame({
+        "event_id": np.full(n_results, prog_data["event_id"], dtype=np.int64),
+        "prog_id": np.full(n_results, int(prog_id), dtype=np.int64),
+        "event_date": np.full(n_results, np.datetime64(prog_data["event_date"], "D")),
+        "gender": {"male": "m", "female": "w"}.get(prog_data["prog_gender"]),
+        "prog_distance_category": prog_data["prog_distance_category"],
+        # order of the results (finishers only): 0 for the winner
+        "i_finisher": np.arange(n_results, dtype=np.int32),
+        **columns
+    })
+    # 0 for the splits missing in the headers, as in the api for missing timings
+    for column in split_columns:
+        if column not in df.columns:
+            df[column] = np.zeros(n_results, dtype=np.int32)
+    return df
+
+
+def build_results_table() -> pd.DataFrame:
+    """one pass over the event files. programs that cannot be parsed are skipped."""
+    event_files = list(iter_event_files())
+    dfs = []
+    for event_file in event_files:
+        for prog_id, prog_data in load_event(event_file).items():
+            if not prog_data.get("results") or not prog_data.get("headers"):
+                continue
+            try:
+                dfs.append(get_prog_results_table(prog_id=prog_id, prog_data=prog_data))
+            except (ValueError, AssertionError) as e:
+                print(f"cannot parse results of {event_file.stem}/{prog_id}: {e}")
+
+    df = pd.concat(dfs, ignore_index=True)
+    df = df[program_keys + ["event_date", "gender", "prog_distance_category", "i_finisher", "position",
+                            "athlete_id", "start_num", "athlete_noc", "age"] + split_columns]
+    for column in ["gender", "prog_distance_category", "athlete_noc"]:
+        df[column] = df[column].astype("category")
+    print(f"results table: {len(df)} results of {df.groupby(program_keys).ngroups} programs from {len(event_files)} event files")
+    return df
+
+
+def get_results_table(overwrite: bool = False) -> pd.DataFrame:
+    """read the stored table, rebuilt when an event file is more recent."""
+    events_dir = cache_dir / "events"
+    last_crawl = max((p.stat().st_mtime for p in events_dir.glob("*.json") if p.stem.isnumeric()), default=0)
+    if overwrite or not results_table_path.exists() or results_table_path.stat().st_mtime < last_crawl:
+        df = build_results_table()
+        df.to_parquet(results_table_path, index=False)
+        return df
+    return pd.read_parquet(results_table_path)
+
+
+def drop_incomplete(df: pd.DataFrame) -> pd.DataFrame:
+    """as in `get_prog_results_df()`: drop lines with 0 as swim, bike or run time."""
+    return df[(df["swim_s"] > 0) & (df["bike_s"] > 0) & (df["run_s"] > 0)]
+
+
+def get_window_means(df: pd.DataFrame, i_first: int, i_last: int, columns: list = None) -> pd.DataFrame:
+    """
+    per program: mean and std of the [i_first:i_last] best times of each column, as with `use_best_in_each_sport`
+    i.e. each column is sorted on its own, 0 (missing) times excluded.
+    """
+    if columns is None:
+        columns = split_columns
+    df = drop_incomplete(df)
+    res = []
+    for column in columns:
+        df_column = df.loc[df[column] > 0, program_keys + [column]].sort_values(program_keys + [column])
+        rank = df_column.groupby(program_keys, sort=False).cumcount()
+        df_column = df_column[(rank >= i_first) & (rank < i_last)]
+        agg = df_column.groupby(program_keys)[column].agg(["mean", lambda x: x.std(ddof=0)])
+        agg.columns = [f"{column.replace('_s', '')}_mean", f"{column.replace('_s', '')}_std"]
+        res.append(agg)
+    return pd.concat(res, axis=1)
+
+
+def get_pack_sizes(df: pd.DataFrame, pack_duration_s: float) -> pd.DataFrame:
+    """
+    per program: number of athletes starting the run within `pack_duration_s` of the first one,
+    and whether the winner and the best runner are part of this front pack.
+    """
+    df = drop_incomplete(df)
+    start_to_t2_s = df["swim_s"] + df["t1_s"] + df["bike_s"]
+    time_max_s = start_to_t2_s.groupby([df[k] for k in program_keys]).transform("min") + pack_duration_s
+    in_front_pack = start_to_t2_s <= time_max_s
+
+    groups = in_front_pack.groupby([df[k] for k in program_keys])
+    i_winner = df.groupby(program_keys)["i_finisher"].idxmin()
+    i_best_runner = df.groupby(program_keys)["run_s"].idxmin()
+    res = pd.DataFrame({
+        "pack_size": groups.sum().astype(int),
+        "is_winner_in_front_pack": in_front_pack.loc[i_winner].to_numpy(),
+        "is_best_runner_in_front_pack": in_front_pack.loc[i_best_runner].to_numpy(),
+        "best_runner_wins": (i_best_runner == i_winner).to_numpy(),
+    }, index=groups.sum().index)
+    return res
+
+
+if __name__ == '__main__':
+    _df = get_results_table(overwrite=True)
+    print(_df.info(memory_usage="deep"))
+    print(get_window_means(_df, i_first=4, i_last=9).head())
+    print(get_pack_sizes(_df, pack_duration_s=10).head())
@@ -0,0 +1,97 @@
+"""
+runs the independent analyses of `main_events.py` in a pool of processes.
+
+each analysis gets a `frozen_view()` of the frame, prints tables and saves figures, and shares no state with the others.
+in the workers:
+    the matplotlib backend is Agg (no window, `plt.show()` does nothing)
+    the stdout of each analysis is captured, and printed by the parent in the order of the analyses
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import io
+import os
+import time
+import traceback
+import warnings
+
+import pandas as pd
+
+from utils_instrumentation import AnalysisProfiler
+
+# set by `_init_analysis_worker()`, to send the frame once per worker and not once per analysis
+_worker_df = None
+
+
+def enable_copy_on_write():
+    """always enabled with pandas >= 3."""
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
+def frozen_view(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    shallow copy sharing the data of `df`, instead of a deep copy per analysis.
+    with copy-on-write, the columns an analysis modifies (in place or not) are copied at that moment, `df` never changes.
+    the `*_all_*` values are read-only views into the ragged buffers.
+    """
+    enable_copy_on_write()
+    return df.copy(deep=False)
+
+
+def _init_analysis_worker(df):
+    global _worker_df
+    _worker_df = df
+
+    from matplotlib import pyplot as plt
+    plt.switch_backend("Agg")
+    warnings.filterwarnings("ignore", message=".*non-interactive.*")
+
+
+def _run_analysis(func, kwargs: dict) -> tuple[str, float, str]:
+    """returns (captured stdout, wall time, traceback or None)."""
+    from matplotlib import pyplot as plt
+
+    stdout = io.StringIO()
+    error = None
+    t_start = time.perf_counter()
+    with redirect_stdout(stdout):
+        try:
+            func(frozen_view(_worker_df), **kwargs)
+        except Exception:
+            error = traceback.format_exc()
+        finally:
+            plt.close("all")
+    return stdout.getvalue(), time.perf_counter() - t_start, error
+
+
+def run_analyses(df, analyses: list, use_processes: bool = True, max_workers: int = None, profiler: AnalysisProfiler = None):
+    """
+    `analyses`: list of (func, kwargs), called as `func(frozen_view(df), **kwargs)`.
+    runs them one after the other when `use_processes` is False or when profiling: the profiles are taken in this process.
+    """
+    if profiler is None:
+        profiler = AnalysisProfiler(enabled=False)
+
+    if not use_processes or profiler.enabled or len(analyses) < 2:
+        for func, kwargs in analyses:
+            profiler.run(func, frozen_view(df), **kwargs)
+        return
+
+    max_workers = min(len(analyses), max_workers or os.cpu_count())
+    print(f"running {len(analyses)} analyses with {max_workers} processes")
+    t_start = time.perf_counter()
+    failed = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_analysis_worker, initargs=(df,)) as executor:
+        futures = [executor.submit(_run_analysis, func, kwargs) for func, kwargs in analyses]
+        # results are printed in order, as soon as the previous analyses are done
+        for (func, _), future in zip(analyses, futures):
+            output, wall_s, error = future.result()
+            print(f"\n######## {func.__name__} ({wall_s:.1f}s) ########\n")
+            print(output, end="")
+            if error is not None:
+                print(error)
+                failed.append(func.__name__)
+    print(f"\n{len(analyses)} analyses done in {time.perf_counter() - t_start:.1f}s")
+    if failed:
+        raise RuntimeError(f"{len(failed)} analyses failed: {failed}")
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# the scripts import each other as top-level modules (`from utils import ...`)
+repo_dir = Path(__file__).parent.parent
+sys.path[:0] = [str(repo_dir / "scripts"), str(repo_dir)]
@@ -0,0 +1,37 @@
+import time
+
+from utils_cache import ResponseCache
+
+
+def test_response_cache_params_key(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    key = ResponseCache.make_key("events", {"per_page": 100, "category_id": 341})
+    assert key == ResponseCache.make_key("events", {"category_id": 341, "per_page": 100}) == "events?category_id=341&per_page=100"
+    assert ResponseCache.make_key("events?a=1", {"b": 2}) == "events?a=1&b=2"
+    assert ResponseCache.make_key("events") == "events"
+
+    cache.put(key, url_suffix="events", params={"per_page": 100, "category_id": 341}, data=[1, 2])
+    assert cache.get(ResponseCache.make_key("events", {"category_id": 341, "per_page": 100})) == (True, [1, 2])
+    params, = cache._connection().execute("SELECT params FROM responses").fetchone()
+    assert params == "category_id=341&per_page=100"
+
+
+def test_response_cache_none_max_age(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    fetched_at = time.time() - 100
+    cache.put_many([("a", "a", "", {"x": 1}), ("b", "b", "", None)], fetched_at=fetched_at)
+
+    # a cached None is a hit, as long as it is not older than `max_age_none_s`
+    assert cache.get("b") == (True, None)
+    assert cache.get("b", max_age_none_s=1000) == (True, None)
+    assert cache.get("b", max_age_none_s=10) == (False, None)
+    assert cache.get("a", max_age_none_s=10) == (True, {"x": 1})
+
+    # `max_age_s` applies to both
+    assert cache.get("b", max_age_s=10, max_age_none_s=1000) == (False, None)
+    assert cache.get("a", max_age_s=10) == (False, None)
+
+    assert cache.get_many(["a", "b", "c"], max_age_none_s=10) == {"a": {"x": 1}}
+    assert cache.get_many(["a", "b", "c"]) == {"a": {"x": 1}, "b": None}
+    assert cache.contains_many(["a", "b", "c"], max_age_none_s=10) == {"a"}
+    assert cache.contains_many(["a", "b", "c"], max_age_s=1000) == {"a", "b"}
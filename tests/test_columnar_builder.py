@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from utils_events import ColumnarBuilder
+
+
+def test_columnar_builder_matches_list_of_dicts(capsys):
+    rows = [
+        {"event_id": 1, "swim_mean_m": 1100.0, "wetsuit_m": True},
+        {"event_id": 2, "swim_mean_m": 1150.0},  # missing key
+        {"event_id": 3, "wetsuit_m": False, "level_m": 12.5, "swim_all_m": [1, 2]},  # new keys
+    ]
+    builder = ColumnarBuilder()
+    for row in rows:
+        builder.append(row)
+
+    assert len(builder) == 3
+    df = builder.to_frame()
+    pd.testing.assert_frame_equal(df, pd.DataFrame(rows))
+    assert np.isnan(df.loc[0, "level_m"])
+    assert np.isnan(df.loc[2, "swim_mean_m"])
+
+    # padded rows are reported, with the differing keys
+    out = capsys.readouterr().out
+    assert "row 0" not in out
+    assert "row 1 (2) padded with NaN:\n\tmissing keys: ['wetsuit_m']\n\tnew keys: []" in out
+    assert "row 2 (3) padded with NaN:\n\tmissing keys: ['swim_mean_m']\n\tnew keys: ['level_m', 'swim_all_m']" in out
+
+
+def test_columnar_builder_same_keys_not_reported(capsys):
+    builder = ColumnarBuilder()
+    builder.append({"event_id": 1, "swim_mean_m": 1100.0})
+    builder.append({"swim_mean_m": 1150.0, "event_id": 2})  # same keys, other order
+    assert capsys.readouterr().out == ""
+    pd.testing.assert_frame_equal(builder.to_frame(), pd.DataFrame({"event_id": [1, 2], "swim_mean_m": [1100.0, 1150.0]}))
+
+
+def test_columnar_builder_empty():
+    builder = ColumnarBuilder()
+    assert len(builder) == 0
+    assert builder.to_frame().empty
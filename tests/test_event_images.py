@@ -0,0 +1,68 @@
+from io import BytesIO
+import time
+
+from PIL import Image
+
+import utils_events
+from utils import json_dump, json_load
+
+
+def test_iter_event_images_yields_before_slowest_download(tmp_path, monkeypatch):
+    n_images = 10
+    delays_s = {f"im{i}.png": 0.2 + 0.2 * i for i in range(n_images)}  # 0.2s .. 2.0s
+    buffer = BytesIO()
+    Image.new("RGB", (1200, 900), (10, 20, 30)).save(buffer, "PNG")
+    content = buffer.getvalue()
+
+    def fake_download_image(url):
+        time.sleep(delays_s[url])
+        return content
+
+    monkeypatch.setattr(utils_events, "cache_dir", tmp_path)
+    monkeypatch.setattr(utils_events, "download_image", fake_download_image)
+    (tmp_path / "images").mkdir()
+    json_dump(
+        [{"image_filename": filename, "image_url": filename, "thumbnail": filename} for filename in delays_s],
+        tmp_path / "images" / "1.json"
+    )
+
+    t_start = time.monotonic()
+    yield_times_s = []
+    paths = []
+    for path in utils_events.iter_event_images(event_id=1, max_workers_io=n_images, max_workers_cpu=2):
+        yield_times_s.append(time.monotonic() - t_start)
+        paths.append(path)
+
+    assert sorted(p.name for p in paths) == sorted(delays_s)
+    assert all(p.exists() for p in paths)
+    assert yield_times_s[0] < max(delays_s.values())
+    assert paths[0].name == "im0.png"
+
+
+def test_iter_event_images_failed_listing_not_saved(tmp_path, monkeypatch):
+    listings = [None, []]  # failed request, then no images
+    requests = []
+
+    def fake_get_request(url_suffix):
+        requests.append(url_suffix)
+        return listings[len(requests) - 1]
+
+    monkeypatch.setattr(utils_events, "cache_dir", tmp_path)
+    monkeypatch.setattr(utils_events, "get_request", fake_get_request)
+    listing_path = tmp_path / "images" / "1.json"
+
+    assert list(utils_events.iter_event_images(event_id=1)) == []
+    assert not listing_path.exists()
+
+    # requested again: saved once successful
+    assert list(utils_events.iter_event_images(event_id=1)) == []
+    assert json_load(listing_path) == []
+    assert list(utils_events.iter_event_images(event_id=1)) == []
+    assert len(requests) == 2
+
+    # failed listing saved by a previous version
+    json_dump(None, listing_path)
+    listings.append([])
+    assert list(utils_events.iter_event_images(event_id=1)) == []
+    assert len(requests) == 3
+    assert json_load(listing_path) == []
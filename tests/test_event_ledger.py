@@ -0,0 +1,32 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from utils import json_load
+
+scripts_dir = Path(__file__).parent.parent / "scripts"
+
+
+def test_event_ledger_flushed_at_exit_on_exception(tmp_path):
+    """a run aborted by an exception still writes the ledger, from the `atexit` handler."""
+    log_path = tmp_path / "events_log.json"
+    run = subprocess.run(
+        [sys.executable, "-c", f"""
+from pathlib import Path
+from utils_events import event_ledger
+
+event_ledger.p = Path({str(log_path)!r})
+event_ledger.add(category="loaded", event_id=1, txt="loaded", event_title="event 1")
+event_ledger.add(category="ignored", event_id=2, txt="not enough data")
+event_ledger.add(category="ignored", event_id=2, txt="no wetsuit info")
+raise RuntimeError("aborted")
+"""],
+        cwd=scripts_dir, capture_output=True, text=True
+    )
+    assert run.returncode != 0
+    assert "RuntimeError: aborted" in run.stderr
+    assert json_load(log_path) == {
+        "loaded": {"1": {"txt": "loaded", "event_title": "event 1", "event_listing": ""}},
+        "ignored": {"2": {"txt": "not enough data\nno wetsuit info", "event_title": "", "event_listing": ""}},
+        "returned": {},
+    }
@@ -0,0 +1,48 @@
+import matplotlib
+from matplotlib import pyplot as plt
+
+from utils_figures import CachedFigure, force_env_var, forced_rendering
+from utils_instrumentation import AnalysisProfiler
+
+matplotlib.use("Agg")
+
+
+def build(path, inputs, force: bool = False) -> bool:
+    """returns whether the figure was built."""
+    figure = CachedFigure(path, inputs=inputs, force=force, dpi=50)
+    if figure.up_to_date():
+        return False
+    plt.plot(inputs)
+    figure.save()
+    plt.close("all")
+    return True
+
+
+def test_cached_figure_is_built_once_per_inputs(tmp_path):
+    path = tmp_path / "x.png"
+    assert build(path, [1, 2, 3])
+    assert not build(path, [1, 2, 3])
+    assert build(path, [1, 2, 4])
+    assert not build(path, [1, 2, 4])
+
+
+def test_cached_figure_adds_extension(tmp_path):
+    assert build(tmp_path / "x", [1])
+    assert (tmp_path / "x.png").exists()
+    assert not build(tmp_path / "x", [1])
+
+
+def test_cached_figure_rendered_while_profiling(tmp_path, monkeypatch):
+    monkeypatch.delenv(force_env_var, raising=False)
+    path = tmp_path / "x.png"
+    assert build(path, [1, 2, 3], force=None)
+    assert not build(path, [1, 2, 3], force=None)
+    with forced_rendering():
+        assert build(path, [1, 2, 3], force=None)
+    assert not build(path, [1, 2, 3], force=None)
+
+    # the matplotlib time of the profiles is the time of the rendering, also when the pngs are up to date
+    profiler = AnalysisProfiler(enabled=True, profiles_dir=tmp_path / "profiles")
+    assert profiler.run(build, path, [1, 2, 3], force=None)
+    assert not AnalysisProfiler(enabled=False).run(build, path, [1, 2, 3], force=None)
+    assert profiler.rows[0]["matplotlib_%"] > 0
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from utils_events import compute_age_with_decimals, get_prog_results_df, parse_prog_results
+
+headers = [{"name": name} for name in ["Swim", "T1", "Bike", "T2", "Run"]]
+
+
+def result(position, athlete_id, splits, dob=None, yob=None, start_num=1) -> dict:
+    r = {
+        "position": position, "athlete_id": athlete_id, "start_num": start_num, "splits": splits,
+        "athlete_first": "first", "athlete_last": "last", "athlete_noc": "FRA",
+    }
+    if dob is not None:
+        r["dob"] = dob
+    r["athlete_yob"] = yob
+    return r
+
+
+def get_prog_data(results: list) -> dict:
+    return {"event_title": "test event", "event_date": "2023-06-17", "headers": headers, "results": results}
+
+
+def get_prog_results_df_rows(prog_data: dict) -> pd.DataFrame:
+    """previous implementation: one dict per result."""
+    column_names = [header["name"] for header in prog_data["headers"]]
+    df_list = []
+    prog_year = int(prog_data["event_date"][:4])
+    for r in prog_data["results"]:
+        if r["position"] in ["DNF", "DNS", "DSQ", "LAP"]:
+            continue
+        di = dict(zip(column_names, r["splits"]))
+        di["age"] = None
+        if ("dob" not in r) or (r["dob"] is None):
+            if "athlete_yob" in r:
+                if r["athlete_yob"] is not None:
+                    di["age"] = compute_age_with_decimals(date_of_birth=f'{r["athlete_yob"]}-07-01', specific_date=prog_data["event_date"])
+        else:
+            di["age"] = compute_age_with_decimals(date_of_birth=r["dob"], specific_date=prog_data["event_date"])
+            assert abs(prog_year - int(r["athlete_yob"]) - di["age"]) < 2
+        df_list.append(di)
+    df = pd.DataFrame(df_list)
+    if len(df) < 1:
+        return df
+
+    def str_to_seconds(x):
+        h, m, s = x.split(":")
+        return int(h) * 3600 + int(m) * 60 + int(s)
+
+    for column_name in column_names:
+        df[f"{column_name.lower()}_s"] = df[column_name].apply(str_to_seconds)
+    df = df.drop(columns=column_names)
+    df = df[(df["swim_s"] > 0) & (df["bike_s"] > 0) & (df["run_s"] > 0)]
+    return df
+
+
+results = [
+    result(1, 101, ["00:19:02", "00:00:41", "01:01:12", "00:00:25", "00:33:10"], dob="1995-03-02", yob=1995),
+    result("DNF", 102, ["00:19:30", "00:00:45", "01:02:00", "00:00:00", "00:00:00"], yob=1990),
+    result(2, 103, ["00:19:10", "00:00:40", "01:01:30", "00:00:26", "00:33:40"], yob=1998, start_num=None),
+    result("DNS", 104, ["00:00:00", "00:00:00", "00:00:00", "00:00:00", "00:00:00"], yob=2000),
+    result(3, 105, ["00:00:00", "00:00:43", "01:01:20", "00:00:24", "00:34:00"], dob="2001-12-31", yob=2001),  # missing swim
+    result("DSQ", 106, ["00:19:05", "00:00:42", "01:01:15", "00:00:25", "00:33:20"], yob=1997),
+    result(4, 107, ["00:20:00", "00:00:50", "01:03:00", "00:00:30", "00:35:00"]),  # neither dob nor yob
+    result(5, 108, ["00:20:10", "00:00:51", "01:03:10", "00:00:31", "00:00:00"], yob=1993),  # missing run
+    result("LAP", 109, ["00:22:00", "00:00:55", "00:00:00", "00:00:00", "00:00:00"], yob=1999),
+]
+
+
+def test_prog_results_df_matches_rows():
+    prog_data = get_prog_data(results)
+    df = get_prog_results_df(prog_data)
+    df_rows = get_prog_results_df_rows(prog_data)
+
+    # same columns, index, values and dtypes (a missing age was None, in a float64 column anyway)
+    pd.testing.assert_frame_equal(df, df_rows)
+    assert list(df.columns) == ["age", "swim_s", "t1_s", "bike_s", "t2_s", "run_s"]
+    assert list(df.index) == [0, 1, 3]  # rank among the finishers, rows with a missing split dropped
+    assert (df.dtypes.iloc[1:] == np.int64).all()
+    assert df["age"].dtype == np.float64
+    assert np.isnan(df.loc[3, "age"])
+
+
+def test_prog_results_columns():
+    columns = parse_prog_results(get_prog_data(results))
+    assert {c: v.dtype for c, v in columns.items()} == {
+        "position": np.int32, "athlete_id": np.int64, "start_num": np.int32, "athlete_noc": object, "age": np.float64,
+        "swim_s": np.int32, "t1_s": np.int32, "bike_s": np.int32, "t2_s": np.int32, "run_s": np.int32,
+    }
+    assert list(columns["position"]) == [1, 2, 3, 4, 5]
+    assert list(columns["athlete_id"]) == [101, 103, 105, 107, 108]
+    assert list(columns["start_num"]) == [1, -1, 1, 1, 1]
+    assert list(columns["swim_s"]) == [1142, 1150, 0, 1200, 1210]
+    assert list(columns["run_s"]) == [1990, 2020, 2040, 2100, 0]
+
+    # dob, then yob (July, 1st), then NaT
+    age = columns["age"]
+    assert age[0] == compute_age_with_decimals("1995-03-02", "2023-06-17")
+    assert age[1] == compute_age_with_decimals("1998-07-01", "2023-06-17")
+    assert age[2] == compute_age_with_decimals("2001-12-31", "2023-06-17")
+    assert np.isnan(age[3])
+
+
+def test_prog_results_no_finisher():
+    prog_data = get_prog_data([r for r in results if r["position"] in ["DNF", "DNS", "DSQ", "LAP"]])
+    assert get_prog_results_df(prog_data).empty
+    assert get_prog_results_df_rows(prog_data).empty
+    assert all(len(v) == 0 for v in parse_prog_results(prog_data).values())
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from utils_events import load_memoized_events_df
+from utils_ragged import RaggedArray, get_ragged, to_ragged_columns
+
+lists = [[3, 1, 2], [], [7], [], [4, 5, 6, 8]]  # empty rows, also first and last
+float_lists = [[1.5, np.nan], [], [np.nan], [2.0, 3.0, np.nan]]
+
+
+def assert_rows_equal(ragged: RaggedArray, expected: list):
+    assert len(ragged) == len(expected)
+    assert list(ragged.lengths()) == [len(row) for row in expected]
+    for row, expected_row in zip(ragged, expected):
+        np.testing.assert_array_equal(row, np.array(expected_row, dtype=row.dtype))  # NaN == NaN
+
+
+def test_ragged_from_lists():
+    ragged = RaggedArray.from_lists(lists)
+    assert ragged.values.dtype == np.int32
+    assert list(ragged.offsets) == [0, 3, 3, 4, 4, 8]
+    assert_rows_equal(ragged, lists)
+    assert ragged.to_lists() == lists
+    assert not ragged[0].flags.writeable
+
+    ragged = RaggedArray.from_lists(float_lists, dtype=np.float64)
+    assert_rows_equal(ragged, float_lists)
+    assert np.isnan(ragged[2][0])
+
+    assert len(RaggedArray.from_lists([])) == 0
+    assert RaggedArray.from_lists([[], []]).to_lists() == [[], []]
+
+
+def test_ragged_from_arrow():
+    for values, arrow_type, dtype in [(lists, pa.int32(), np.int32), (float_lists, pa.float64(), np.float64)]:
+        array = pa.array(values, type=pa.list_(arrow_type))
+        ragged = RaggedArray.from_arrow(array)
+        assert ragged.values.dtype == dtype
+        assert_rows_equal(ragged, values)
+
+        # chunks, and slices with an offset into the values
+        assert_rows_equal(RaggedArray.from_arrow(pa.chunked_array([array[:2], array[2:]])), values)
+        assert_rows_equal(RaggedArray.from_arrow(array[1:]), values[1:])
+        assert_rows_equal(RaggedArray.from_arrow(pa.chunked_array([array[2:]])), values[2:])
+
+
+def test_ragged_columns_parquet_round_trip(tmp_path):
+    df = pd.DataFrame({
+        "event_id": [1, 2, 3, 4, 5],
+        "swim_all_m": lists,
+        "run_all_w": [row[::-1] for row in lists],
+        "event_category_ids_m": [[1], [2, 3], [], [4], [5]],  # not a `*_all_*` column: kept as lists
+    })
+    df_lists = df.copy()
+    df = to_ragged_columns(df)
+    for column in ["swim_all_m", "run_all_w"]:
+        assert all(isinstance(v, np.ndarray) for v in df[column])
+        assert get_ragged(df, column).to_lists() == df_lists[column].tolist()
+        # views into one buffer
+        assert df[column].iloc[0].base is df[column].iloc[4].base
+    assert df["event_category_ids_m"].tolist() == df_lists["event_category_ids_m"].tolist()
+
+    # filtering and sorting, then packed again
+    df_filtered = df[df["event_id"] != 1].sort_values("event_id", ascending=False)
+    assert get_ragged(df_filtered, "swim_all_m").to_lists() == [[4, 5, 6, 8], [], [7], []]
+
+    memo_path = tmp_path / "df.parquet"
+    df.to_parquet(memo_path, index=False)
+    df_loaded = load_memoized_events_df(memo_path)
+    assert list(df_loaded.columns) == list(df.columns)
+    for column in ["swim_all_m", "run_all_w"]:
+        assert df_loaded[column].map(np.ndarray.tolist).tolist() == df_lists[column].tolist()
+        assert df_loaded[column].iloc[0].dtype == np.int32
+    assert df_loaded["event_category_ids_m"].tolist() == df_lists["event_category_ids_m"].tolist()
@@ -0,0 +1,58 @@
+import os
+import random
+
+import utils_events
+from utils import json_dump
+from utils_events import _load_ranking_index, get_level_for_year, get_ranking_index
+
+
+def get_level_for_year_linear(years_id_rankings: dict, prog_year: str, athletes_infos: list, n_top: int = 10, default_ranking: int = 50):
+    """previous implementation: linear scan of the ranking of the year."""
+    if prog_year not in years_id_rankings:
+        return None
+    year_athlete_ids = [int(r[0]) for r in years_id_rankings[prog_year]]
+    rankings = []
+    for i_start_num, athlete_info in enumerate(athletes_infos):
+        if i_start_num > n_top:
+            break
+        if athlete_info["athlete_id"] in year_athlete_ids:
+            rankings.append(year_athlete_ids.index(athlete_info["athlete_id"]) + 1)
+        else:
+            rankings.append(default_ranking)
+    if len(rankings) == 0:
+        return None
+    return sum(rankings) / len(rankings)
+
+
+def test_ranking_index_matches_linear_scan(tmp_path, monkeypatch):
+    rng = random.Random(0)
+    years_id_rankings = {
+        # ids as strings, as in the json files, and some athletes twice in a ranking
+        str(year): [(str(rng.randint(1, 120)), "first", "last") for _ in range(50)]
+        for year in range(2010, 2024)
+    }
+    monkeypatch.setattr(utils_events, "data_dir", tmp_path)
+    json_dump(years_id_rankings, tmp_path / "years_id_rankings_m.json")
+    _load_ranking_index.cache_clear()
+    ranking_index = get_ranking_index("m")
+    assert get_ranking_index("w") is None
+
+    for _ in range(500):
+        prog_year = str(rng.randint(2008, 2025))  # also years without ranking
+        athletes_infos = [{"athlete_id": rng.randint(1, 150)} for _ in range(rng.randint(0, 30))]
+        n_top = rng.choice([0, 3, 10])
+        assert get_level_for_year(ranking_index, prog_year, athletes_infos, n_top=n_top) == \
+            get_level_for_year_linear(years_id_rankings, prog_year, athletes_infos, n_top=n_top)
+
+
+def test_ranking_index_reloaded_when_modified(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils_events, "data_dir", tmp_path)
+    json_path = tmp_path / "years_id_rankings_w.json"
+    json_dump({"2020": [("1", "a", "b"), ("2", "c", "d")]}, json_path)
+    _load_ranking_index.cache_clear()
+    assert get_ranking_index("w") == {"2020": {1: 1, 2: 2}}
+    assert get_ranking_index("w") is get_ranking_index("w")  # parsed once
+
+    json_dump({"2020": [("2", "c", "d"), ("1", "a", "b")]}, json_path)
+    os.utime(json_path, ns=(0, 0))
+    assert get_ranking_index("w") == {"2020": {2: 1, 1: 2}}
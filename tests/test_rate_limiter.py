@@ -0,0 +1,114 @@
+import pytest
+
+import utils_itu
+from utils_itu import RateLimiter
+
+
+class FakeClock:
+    """`time.monotonic()` and `time.sleep()`: sleeping moves the clock forward, without waiting."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, s: float):
+        self.sleeps.append(s)
+        self.now += s
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(utils_itu, "time", fake_clock)
+    return fake_clock
+
+
+def request(limiter: RateLimiter):
+    with limiter.acquire():
+        pass
+
+
+def test_rate_limiter_burst_then_refill_rate(clock):
+    limiter = RateLimiter(requests_per_s=10, burst=5, max_concurrency=2)
+
+    # the burst goes through without waiting
+    for _ in range(5):
+        request(limiter)
+    assert clock.sleeps == [0.0] * 5
+    assert clock.now == 1000.0
+
+    # then one request every 1 / requests_per_s
+    for _ in range(10):
+        request(limiter)
+    assert clock.sleeps[5:] == pytest.approx([0.1] * 10)
+    assert clock.now == pytest.approx(1001.0)
+    assert limiter.report() == {"n_requests": 15, "n_throttled": 10, "throttled_s": pytest.approx(1.0)}
+
+
+def test_rate_limiter_refills_up_to_burst(clock):
+    limiter = RateLimiter(requests_per_s=10, burst=5, max_concurrency=2)
+    for _ in range(5):
+        request(limiter)
+    assert limiter.tokens == pytest.approx(0.0)
+
+    # 0.2s idle: 2 tokens back
+    clock.now += 0.2
+    request(limiter)
+    request(limiter)
+    assert clock.sleeps[-2:] == [0.0, 0.0]
+
+    # long idle: never more than `burst` tokens
+    clock.now += 60
+    for _ in range(5):
+        request(limiter)
+    assert clock.sleeps[-5:] == [0.0] * 5
+    request(limiter)
+    assert clock.sleeps[-1] == pytest.approx(0.1)
+
+
+def test_rate_limiter_reservations_in_advance(clock):
+    """concurrent callers reserve tokens before they are available: the bucket goes negative, the waits add up."""
+    limiter = RateLimiter(requests_per_s=10, burst=2, max_concurrency=8)
+    waits_s = [limiter._reserve() for _ in range(5)]
+    assert waits_s == pytest.approx([0.0, 0.0, 0.1, 0.2, 0.3])
+    assert limiter.tokens == pytest.approx(-3.0)
+
+    # the debt is paid back by the refill before new tokens are available
+    clock.now += 0.3
+    assert limiter._reserve() == pytest.approx(0.1)
+    clock.now += 1.0
+    assert limiter._reserve() == 0.0
+    assert limiter.tokens == pytest.approx(1.0)  # capped at `burst`, minus the one taken
+
+
+def test_rate_limiter_split(clock):
+    limiter = RateLimiter(requests_per_s=10, burst=20, max_concurrency=8)
+    limiter.split(4)
+    assert limiter.requests_per_s == pytest.approx(2.5)
+    assert limiter.burst == 5
+    assert limiter.tokens == pytest.approx(5.0)
+    assert limiter.max_concurrency == 2
+
+    for _ in range(5 + 10):
+        request(limiter)
+    assert clock.sleeps[:5] == [0.0] * 5
+    assert clock.sleeps[5:] == pytest.approx([0.4] * 10)  # 1 / 2.5 requests per s
+
+    # never below one request and one slot
+    limiter = RateLimiter(requests_per_s=10, burst=3, max_concurrency=2)
+    limiter.split(8)
+    assert limiter.requests_per_s == pytest.approx(1.25)
+    assert limiter.burst == 1
+    assert limiter.max_concurrency == 1
+
+
+def test_rate_limiter_without_rate(clock):
+    limiter = RateLimiter(requests_per_s=None, burst=1, max_concurrency=1)
+    for _ in range(10):
+        request(limiter)
+    assert clock.sleeps == []
+    limiter.split(2)
+    assert limiter.requests_per_s is None
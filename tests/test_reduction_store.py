@@ -0,0 +1,95 @@
+import copy
+
+import pytest
+
+import utils_events
+from utils import load_config
+from utils_events import iter_reduced_events
+
+
+@pytest.fixture
+def reduce_calls(tmp_path, monkeypatch):
+    """fake `reduce_event_file()`, which records its calls. the store and the data files are in `tmp_path`."""
+    calls = []
+
+    def fake_reduce_event_file(event_file, events_config):
+        calls.append(event_file.stem)
+        return {"event_id": event_file.stem, "content": event_file.read_text(), "pack": events_config["pack_duration_s"]}, [], []
+
+    monkeypatch.setattr(utils_events, "reduce_event_file", fake_reduce_event_file)
+    monkeypatch.setattr(utils_events, "cache_dir", tmp_path)
+    monkeypatch.setattr(utils_events, "data_dir", tmp_path / "data")
+    (tmp_path / "data").mkdir()
+    return calls
+
+
+@pytest.fixture
+def events_config():
+    events_config = copy.deepcopy(load_config()["events"])
+    events_config["label_manually"] = False
+    events_config["reduction"].update({"use_processes": False, "incremental": True, "chunk_size": 2})
+    return events_config
+
+
+def reduce(event_files, events_config) -> dict:
+    return {event_file.stem: r[0] for event_file, r in iter_reduced_events(event_files, events_config)}
+
+
+def test_reduction_store_recomputes_on_changes(tmp_path, reduce_calls, events_config, monkeypatch):
+    event_files = []
+    for event_id in range(1, 6):
+        event_files.append(tmp_path / f"{event_id}.json")
+        event_files[-1].write_text(f"v1 of {event_id}")
+
+    rows = reduce(event_files, events_config)
+    assert reduce_calls == ["1", "2", "3", "4", "5"]
+
+    # nothing changed: all read from the store
+    reduce_calls.clear()
+    assert reduce(event_files, events_config) == rows
+    assert reduce_calls == []
+
+    # modified event file: only this one
+    event_files[2].write_text("v2 of 3")
+    assert reduce(event_files, events_config)["3"]["content"] == "v2 of 3"
+    assert reduce_calls == ["3"]
+
+    # reduction config
+    reduce_calls.clear()
+    events_config["pack_duration_s"] += 1
+    rows = reduce(event_files, events_config)
+    assert reduce_calls == ["1", "2", "3", "4", "5"]
+    assert rows["1"]["pack"] == events_config["pack_duration_s"]
+    reduce_calls.clear()
+    reduce(event_files, events_config)
+    assert reduce_calls == []
+
+    # config keys that the reduction does not read: still a hit
+    events_config["memoization"]["enabled"] = not events_config["memoization"]["enabled"]
+    reduce(event_files, events_config)
+    assert reduce_calls == []
+
+    # data file read by the reduction
+    (tmp_path / "data" / "manual_labelled_wetsuit.json").write_text("{}")
+    reduce(event_files, events_config)
+    assert reduce_calls == ["1", "2", "3", "4", "5"]
+
+    # `reduction_version`
+    reduce_calls.clear()
+    monkeypatch.setattr(utils_events, "reduction_version", utils_events.reduction_version + 1)
+    reduce(event_files, events_config)
+    assert reduce_calls == ["1", "2", "3", "4", "5"]
+    reduce_calls.clear()
+    reduce(event_files, events_config)
+    assert reduce_calls == []
+
+
+def test_reduction_store_not_used(tmp_path, reduce_calls, events_config):
+    event_file = tmp_path / "1.json"
+    event_file.write_text("v1 of 1")
+
+    events_config["reduction"]["incremental"] = False
+    reduce([event_file], events_config)
+    reduce([event_file], events_config)
+    assert reduce_calls == ["1", "1"]
+    assert not (tmp_path / events_config["reduction"]["store_file_name"]).exists()